@@ -1,8 +1,10 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.uic import loadUi
+import os
 import socket
-import netifaces
+import json
+import time
+from interface import carregar_interface
 
 class ClientWindow(QMainWindow):
     """
@@ -11,20 +13,26 @@ class ClientWindow(QMainWindow):
     Métodos:
         get_local_ip(): Obtém o endereço IP da máquina na rede local.
         iniciar_calculos(): Inicia o processo de cálculos e comunicação com o servidor.
+        executar_tarefa(atribuicao, fases, inicios): Calcula e envia o bloco de uma tarefa atribuída pelo servidor.
+        registrar_tempos(fases): Registra o tempo gasto em cada fase da requisição.
         decode_server_message(socket): Decodifica mensagens recebidas do servidor.
         conectar_ao_servidor(host, porta): Conecta-se ao servidor.
         receber_intervalo(mensagem): Extrai o intervalo recebido do servidor.
+        receber_trace_id(mensagem): Extrai o identificador de rastreamento enviado junto com o intervalo.
+        calcular_em_etapas(intervalo, cancelado, fases): Calcula as somas e PI em etapas que podem ser canceladas.
         calcular_soma_pares(intervalo): Calcula a soma dos números pares dentro do intervalo.
         calcular_soma_impares(intervalo): Calcula a soma dos números ímpares dentro do intervalo.
         calcular_pi(intervalo): Calcula o valor de PI utilizando a fórmula de Leibniz.
-        enviar_resultados(client_socket, soma_pares, soma_impares, pi): Envia os resultados dos cálculos para o servidor.
+        enviar_resultados(client_socket, soma_pares, soma_impares, pi, trace_id, concluido): Envia os resultados dos cálculos para o servidor.
     """
     def __init__(self):
         super(ClientWindow, self).__init__()
-        loadUi("client.ui", self)
+        carregar_interface(self, "client")
 
         self.startButton.clicked.connect(self.iniciar_calculos)
         self.client_socket = None
+        # Criado nos primeiros cálculos (ver iniciar_calculos)
+        self.rastreador = None
 
     def get_local_ip(self):
         """
@@ -33,6 +41,8 @@ class ClientWindow(QMainWindow):
         Retorna:
             Endereço IP da máquina na rede local.
         """
+        import netifaces
+
         interfaces = netifaces.interfaces()
         for interface in interfaces:
             addresses = netifaces.ifaddresses(interface)
@@ -47,18 +57,31 @@ class ClientWindow(QMainWindow):
         """
         Inicia o processo de cálculos e comunicação com o servidor.
         """
+        # Tarefas e rastreamento só são carregados ao iniciar os cálculos, não ao abrir a janela
+        from rastreamento import Rastreador
+        import tarefas
+
+        if self.rastreador is None:
+            # Defina CLIENTE_ARQUIVO_TRACE para gravar os spans dos intervalos rastreados pelo servidor
+            self.rastreador = Rastreador(os.environ.get("CLIENTE_ARQUIVO_TRACE"), "cliente")
         HOST = self.get_local_ip()
         if HOST:
             print("Endereço IP da máquina na rede local:", HOST)
         PORTA = 12345
 
+        fases = {}
+        inicios = {}
         self.operationLogTextEdit.append("Conectando ao servidor...")
+        inicio = inicios["conexao"] = time.perf_counter_ns()
         self.client_socket = self.conectar_ao_servidor(HOST, PORTA)
         if self.client_socket is None:
             self.operationLogTextEdit.append("Falha ao conectar ao servidor.")
             return
+        marca = inicios["primeiro_byte"] = time.perf_counter_ns()
+        fases["conexao"] = marca - inicio
         
         mensagem = self.decode_server_message(self.client_socket)
+        fases["primeiro_byte"] = time.perf_counter_ns() - marca
         
         if mensagem.startswith("Conexão negada:"):
             self.operationLogTextEdit.append("Conexão negada: número máximo de conexões atingido.")
@@ -66,6 +89,11 @@ class ClientWindow(QMainWindow):
             return
         self.operationLogTextEdit.append("\nConexão estabelecida com sucesso.")
 
+        atribuicao = tarefas.interpretar_atribuicao(mensagem)
+        if atribuicao is not None:
+            self.executar_tarefa(atribuicao, fases, inicios)
+            return
+
         self.operationLogTextEdit.append("Recebendo intervalo do servidor...")
         intervalo = self.receber_intervalo(mensagem)
 
@@ -74,20 +102,107 @@ class ClientWindow(QMainWindow):
             self.client_socket.close()
             return
 
+        trace_id = self.receber_trace_id(mensagem)
         self.operationLogTextEdit.append(f"Intervalo recebido: {intervalo}")
 
         self.operationLogTextEdit.append("Calculando resultados...")
-        soma_pares = self.calcular_soma_pares(intervalo)
-        soma_impares = self.calcular_soma_impares(intervalo)
-        pi = self.calcular_pi(intervalo)
+        # O servidor pode cancelar o cálculo pela conexão; nesse caso vai o resultado do que já foi calculado
+        cancelado = tarefas.vigiar_cancelamento(self.client_socket)
+        marca = inicios["calculo"] = time.perf_counter_ns()
+        soma_pares, soma_impares, pi, ultimo = self.calcular_em_etapas(intervalo, cancelado, fases)
+        envio = inicios["envio"] = time.perf_counter_ns()
+        fases["calculo"] = envio - marca
+        concluido = None
+        if ultimo < intervalo[1]:
+            concluido = (intervalo[0], ultimo)
+            self.operationLogTextEdit.append(f"Cálculo cancelado pelo servidor; enviando os resultados de {concluido}.")
         self.operationLogTextEdit.append(f"Soma dos números pares: {soma_pares}")
         self.operationLogTextEdit.append(f"Soma dos números ímpares: {soma_impares}")
         self.operationLogTextEdit.append(f"Cálculo de PI com o intervalo: {pi}")
 
         self.operationLogTextEdit.append("Enviando resultados para o servidor...")
-        self.enviar_resultados(self.client_socket, soma_pares, soma_impares, pi)
-        self.operationLogTextEdit.append(self.decode_server_message(self.client_socket))
+        self.enviar_resultados(self.client_socket, soma_pares, soma_impares, pi, trace_id, concluido)
+        marca = inicios["ack"] = time.perf_counter_ns()
+        fases["envio"] = marca - envio
+        self.operationLogTextEdit.append(tarefas.receber_confirmacao(self.client_socket))
+        fases["ack"] = time.perf_counter_ns() - marca
+        self.client_socket.close()
+        self.registrar_tempos(fases, inicios, trace_id)
+
+    def executar_tarefa(self, atribuicao, fases, inicios):
+        """
+        Calcula o bloco de uma tarefa atribuída pelo servidor (ver tarefas.py),
+        envia o resultado parcial e registra os tempos de cada fase.
+
+        Parâmetros:
+            atribuicao: dicionário retornado por tarefas.interpretar_atribuicao.
+            fases: dicionário {fase: nanossegundos} com as fases já medidas.
+            inicios: dicionário {fase: instante de início em time.perf_counter_ns}.
+        """
+        import tarefas
+
+        inicio, fim = atribuicao["intervalo"]
+        self.operationLogTextEdit.append(f"Tarefa recebida: {atribuicao['tarefa']} v{atribuicao['versao']}, bloco {atribuicao['bloco']} [{inicio}, {fim})")
+
+        self.operationLogTextEdit.append("Calculando resultados...")
+        marca = inicios["calculo"] = time.perf_counter_ns()
+        resposta, duracao = tarefas.executar_atribuicao(atribuicao, tarefas.vigiar_cancelamento(self.client_socket))
+        envio = inicios["envio"] = time.perf_counter_ns()
+        fases["calculo"] = envio - marca
+        fases[f"calculo_{atribuicao['tarefa']}"] = duracao
+        if "intervalo" in resposta:
+            self.operationLogTextEdit.append(f"Cálculo cancelado pelo servidor; enviando o resultado de [{resposta['intervalo'][0]}, {resposta['intervalo'][1]}).")
+        if "erro" in resposta:
+            self.operationLogTextEdit.append(f"Falha no cálculo: {resposta['erro']}")
+        else:
+            resultado = str(resposta["resultado"])
+            # Parciais de pi_chudnovsky são inteiros enormes em hexadecimal
+            if len(resultado) > 200:
+                resultado = f"{resultado[:200]}... ({len(resultado)} caracteres)"
+            self.operationLogTextEdit.append(f"Resultado parcial: {resultado}")
+
+        self.operationLogTextEdit.append("Enviando resultados para o servidor...")
+        try:
+            self.client_socket.sendall(tarefas.codificar_resposta(resposta))
+        except BrokenPipeError:
+            print("Erro ao enviar dados para o servidor. A conexão foi fechada pelo servidor antes do término do envio.")
+        marca = inicios["ack"] = time.perf_counter_ns()
+        fases["envio"] = marca - envio
+        self.operationLogTextEdit.append(tarefas.receber_confirmacao(self.client_socket))
+        fases["ack"] = time.perf_counter_ns() - marca
         self.client_socket.close()
+        self.registrar_tempos(fases, inicios, atribuicao.get("trace_id"))
+
+    def registrar_tempos(self, fases, inicios, trace_id=None):
+        """
+        Registra o tempo gasto em cada fase da requisição.
+
+        Um resumo em milissegundos vai para o log da interface. Se a variável de
+        ambiente CLIENTE_FASES_JSON estiver definida, o registro estruturado (JSON,
+        em nanossegundos, com as mesmas fases usadas pelos testes de carga) também
+        vai para a saída padrão. Se o servidor enviou um trace_id, cada fase
+        também é gravada como span no arquivo de trace do cliente; os tempos por
+        kernel (fases "calculo_<kernel>") vão como o atributo kernels_ns do span
+        "calculo", já que são somas de etapas intercaladas dentro dele.
+
+        Parâmetros:
+            fases: dicionário {fase: nanossegundos}.
+            inicios: dicionário {fase: instante de início em time.perf_counter_ns}.
+            trace_id: identificador de rastreamento recebido do servidor.
+        """
+        if os.environ.get("CLIENTE_FASES_JSON"):
+            print(json.dumps({"trace_id": trace_id, "fases_ns": fases}))
+        if trace_id:
+            # Converte os instantes do relógio monotônico para o relógio de parede usado nos spans
+            deslocamento = time.time_ns() - time.perf_counter_ns()
+            kernels = {fase[len("calculo_"):]: duracao for fase, duracao in fases.items() if fase.startswith("calculo_")}
+            for fase, duracao in fases.items():
+                if fase.startswith("calculo_"):
+                    continue
+                atributos = {"kernels_ns": kernels} if fase == "calculo" and kernels else {}
+                self.rastreador.registrar(trace_id, fase, inicios[fase] + deslocamento, duracao, **atributos)
+        resumo = ", ".join(f"{fase}={duracao / 1e6:.3f}" for fase, duracao in fases.items())
+        self.operationLogTextEdit.append(f"Tempos por fase (ms): {resumo}")
 
     def decode_server_message(self, socket):
         """
@@ -133,13 +248,63 @@ class ClientWindow(QMainWindow):
         if not mensagem:
             return None
 
+        # O servidor pode enviar um terceiro campo com o trace_id
         intervalo = mensagem.split()
-        if len(intervalo) != 2:
+        if len(intervalo) not in (2, 3):
             return None
 
         a, b = int(intervalo[0]), int(intervalo[1])
         return a, b
 
+    def receber_trace_id(self, mensagem):
+        """
+        Extrai o identificador de rastreamento enviado junto com o intervalo.
+
+        Parâmetros:
+            mensagem: mensagem recebida do servidor.
+
+        Retorna:
+            O trace_id ou None se o intervalo não estiver sendo rastreado.
+        """
+        partes = mensagem.split()
+        return partes[2] if len(partes) == 3 else None
+
+
+    def calcular_em_etapas(self, intervalo, cancelado, fases):
+        """
+        Calcula as somas e PI em etapas (ver tarefas.etapas), consultando
+        cancelado entre uma etapa e outra, e acumula o tempo de cada cálculo em fases.
+
+        Parâmetros:
+            intervalo: tupla contendo os limites do intervalo.
+            cancelado: função que retorna True quando o servidor cancelou o cálculo.
+            fases: dicionário {fase: nanossegundos}.
+
+        Retorna:
+            Soma dos pares, soma dos ímpares, PI e o último número calculado
+            (o fim do intervalo, se o cálculo não foi cancelado).
+        """
+        import tarefas
+
+        a, b = intervalo
+        soma_pares = soma_impares = 0
+        pi = 0
+        ultimo = a - 1
+        for fase in ("calculo_soma_pares", "calculo_soma_impares", "calculo_pi"):
+            fases[fase] = 0
+        for inicio, fim in tarefas.etapas(a, b + 1, cancelado):
+            etapa = (inicio, fim - 1)
+            marca = time.perf_counter_ns()
+            soma_pares += self.calcular_soma_pares(etapa)
+            meio = time.perf_counter_ns()
+            soma_impares += self.calcular_soma_impares(etapa)
+            fim_impares = time.perf_counter_ns()
+            pi += self.calcular_pi(etapa)
+            fases["calculo_soma_pares"] += meio - marca
+            fases["calculo_soma_impares"] += fim_impares - meio
+            fases["calculo_pi"] += time.perf_counter_ns() - fim_impares
+            ultimo = fim - 1
+        return soma_pares, soma_impares, pi, ultimo
 
     def calcular_soma_pares(self, intervalo):
         """
@@ -188,7 +353,7 @@ class ClientWindow(QMainWindow):
             pi += termo
         return pi*4
     
-    def enviar_resultados(self, client_socket, soma_pares, soma_impares, pi):
+    def enviar_resultados(self, client_socket, soma_pares, soma_impares, pi, trace_id=None, concluido=None):
         """
         Envia os resultados dos cálculos para o servidor.
 
@@ -197,11 +362,20 @@ class ClientWindow(QMainWindow):
             soma_pares: soma dos números pares.
             soma_impares: soma dos números ímpares.
             pi: valor de PI calculado.
+            trace_id: identificador de rastreamento a ser ecoado ao servidor.
+            concluido: (a, último número calculado) se o cálculo foi cancelado.
         """
+        from rastreamento import PREFIXO_TRACE
+        import tarefas
+
         try:
             mensagem = f"Soma dos números pares: {soma_pares}\n"
             mensagem += f"Soma dos números ímpares: {soma_impares}\n"
             mensagem += f"Cálculo de PI com o intervalo: {pi}\n"
+            if trace_id:
+                mensagem += f"{PREFIXO_TRACE} {trace_id}\n"
+            if concluido:
+                mensagem += f"{tarefas.PREFIXO_CONCLUIDO} {concluido[0]} {concluido[1]}\n"
             client_socket.send(mensagem.encode())
         except BrokenPipeError as e:
             print("Erro ao enviar dados para o servidor. A conexão foi fechada pelo servidor antes do término do envio.")
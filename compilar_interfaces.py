@@ -0,0 +1,30 @@
+import argparse
+import glob
+import os
+
+from PyQt5.uic import compileUi
+
+from interface import DIRETORIO, modulo_gerado
+
+def compilar(caminho_ui):
+    """
+    Gera o módulo Python de um arquivo .ui (o mesmo que pyuic5 produz), ao lado dele.
+
+    Parâmetros:
+        caminho_ui (str): Arquivo .ui.
+
+    Retorna:
+        caminho (str): O módulo gerado.
+    """
+    nome = os.path.splitext(os.path.basename(caminho_ui))[0]
+    caminho = os.path.join(os.path.dirname(os.path.abspath(caminho_ui)), modulo_gerado(nome) + ".py")
+    with open(caminho_ui, encoding="utf-8") as origem, open(caminho, "w", encoding="utf-8") as destino:
+        compileUi(origem, destino)
+    return caminho
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os módulos Python das interfaces (.ui) usados por client.py e server.py.")
+    parser.add_argument("arquivos", nargs="*", help="arquivos .ui (padrão: todos os .ui do repositório)")
+    args = parser.parse_args()
+    for caminho_ui in args.arquivos or sorted(glob.glob(os.path.join(DIRETORIO, "*.ui"))):
+        print(f"{caminho_ui} -> {compilar(caminho_ui)}")
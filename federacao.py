@@ -0,0 +1,486 @@
+import argparse
+import json
+import socket
+import threading
+import time
+
+import tarefas
+
+# Segundos que um nó espera por uma resposta do coordenador antes de reconectar
+TEMPO_LIMITE_COORDENADOR = 10.0
+
+# Uma mensagem JSON por linha, nos dois sentidos: {"op": ...} do nó e a resposta do coordenador
+def _enviar(conexao, mensagem):
+    conexao.sendall((json.dumps(mensagem, separators=(",", ":")) + "\n").encode())
+
+class Coordenador:
+    """
+    Serviço que reparte um trabalho entre vários servidores (nós).
+
+    O trabalho é dividido em blocos grandes, arrendados aos nós; cada nó os
+    subdivide entre seus próprios clientes (ver TrabalhoFederado) e devolve o
+    resultado já combinado do bloco arrendado. Os blocos arrendados por uma
+    conexão que cai sem concluí-los voltam para a fila, então nenhum intervalo
+    é atribuído a dois nós ao mesmo tempo nem se perde.
+
+    O protocolo é JSON, uma linha por mensagem. Cada pedido é {"op": ...}:
+        descrever: tarefa, versao, params, inicio, fim e tamanho_bloco.
+        arrendar: {"bloco", "intervalo"}, ou {"bloco": None, "terminado"} se
+            não houver bloco pendente agora.
+        concluir (bloco, resultado): {"ok": True, "terminado"} ou {"erro"}. Um
+            nó que reconectou pode concluir um bloco arrendado pela conexão
+            anterior, se ele ainda não foi concluído por outro nó.
+        devolver (bloco): {"ok": True}.
+        progresso: Trabalho.progresso() do trabalho inteiro.
+
+    Parâmetros:
+        trabalho: tarefas.Trabalho completo; seu tamanho_bloco é o tamanho dos arrendamentos.
+        host: endereço em que o coordenador escuta.
+        porta: porta; 0 deixa o sistema escolher (a efetiva fica em self.porta).
+        log_callback: função de callback para registrar mensagens de log.
+
+    Métodos:
+        start(): Começa a aceitar nós em uma thread própria.
+        stop(): Para de aceitar nós e fecha as conexões.
+    """
+    def __init__(self, trabalho, host="127.0.0.1", porta=0, log_callback=None):
+        self.trabalho = trabalho
+        self.host = host
+        self.porta = porta
+        self.log_callback = log_callback or (lambda mensagem: None)
+        self.server_socket = None
+        self.conexoes = set()
+        self.running = True
+        self.lock = threading.Lock()
+        self.escutando = threading.Event()
+
+    def start(self):
+        """
+        Abre o socket e começa a aceitar nós em uma thread própria.
+        """
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.porta))
+        self.server_socket.listen()
+        self.porta = self.server_socket.getsockname()[1]
+        self.escutando.set()
+        self.log_callback(f"Coordenador escutando em {self.host}:{self.porta}.")
+        threading.Thread(target=self.aceitar, daemon=True).start()
+
+    def aceitar(self):
+        """
+        Aceita nós, cada um atendido em sua própria thread.
+        """
+        while self.running:
+            try:
+                conexao, endereco = self.server_socket.accept()
+            except OSError:
+                break
+            with self.lock:
+                self.conexoes.add(conexao)
+            threading.Thread(target=self.atender, args=(conexao, endereco), daemon=True).start()
+
+    def atender(self, conexao, endereco):
+        """
+        Responde aos pedidos de um nó até a conexão fechar; os blocos que ele
+        arrendou e não concluiu voltam para a fila.
+        """
+        origem = f"{endereco[0]}:{endereco[1]}"
+        arrendados = set()
+        self.log_callback(f"Nó conectado: {origem}.")
+        try:
+            with conexao.makefile("rb") as leitor:
+                for linha in leitor:
+                    try:
+                        pedido = json.loads(linha)
+                    except ValueError:
+                        _enviar(conexao, {"erro": "pedido inválido"})
+                        continue
+                    _enviar(conexao, self.responder(pedido, arrendados, origem))
+        except OSError:
+            pass
+        finally:
+            for indice in arrendados:
+                self.trabalho.devolver(self.trabalho.bloco(indice))
+            if arrendados:
+                self.log_callback(f"Nó {origem} desconectou; {len(arrendados)} bloco(s) arrendado(s) voltaram para a fila.")
+            with self.lock:
+                self.conexoes.discard(conexao)
+            conexao.close()
+
+    def responder(self, pedido, arrendados, origem):
+        """
+        Executa um pedido de um nó.
+
+        Parâmetros:
+            pedido: dicionário recebido do nó.
+            arrendados: índices dos blocos arrendados pela conexão.
+            origem: endereço do nó, para os logs.
+
+        Retorna:
+            Dicionário da resposta.
+        """
+        operacao = pedido.get("op")
+        if operacao == "descrever":
+            return {
+                "tarefa": self.trabalho.tarefa.nome,
+                "versao": self.trabalho.tarefa.versao,
+                "params": self.trabalho.params,
+                "inicio": self.trabalho.inicio,
+                "fim": self.trabalho.fim,
+                "tamanho_bloco": self.trabalho.tamanho_bloco,
+            }
+        if operacao == "arrendar":
+            bloco = self.trabalho.proximo_bloco()
+            if bloco is None:
+                return {"bloco": None, "terminado": self.trabalho.terminado.is_set()}
+            arrendados.add(bloco["indice"])
+            self.log_callback(f"Bloco {bloco['indice']} [{bloco['inicio']}, {bloco['fim']}) arrendado para {origem}.")
+            return {"bloco": bloco["indice"], "intervalo": [bloco["inicio"], bloco["fim"]]}
+        if operacao in ("concluir", "devolver"):
+            indice = pedido.get("bloco")
+            if indice not in arrendados:
+                reentrega = operacao == "concluir" and isinstance(indice, int) and 0 <= indice < self.trabalho.total_blocos
+                if not reentrega:
+                    return {"erro": f"bloco {indice} não está arrendado para este nó"}
+                self.log_callback(f"Bloco {indice} reentregue por {origem} depois de uma reconexão.")
+            arrendados.discard(indice)
+            if operacao == "devolver":
+                self.trabalho.devolver(self.trabalho.bloco(indice))
+                return {"ok": True}
+            try:
+                situacao = self.trabalho.concluir(self.trabalho.bloco(indice), pedido.get("resultado"))
+            except ValueError as e:
+                self.trabalho.devolver(self.trabalho.bloco(indice))
+                return {"erro": str(e)}
+            if situacao == tarefas.CONCLUSAO_ACEITA:
+                self.log_callback(f"Bloco {indice} concluído pelo nó {origem}.")
+            else:
+                self.log_callback(f"Resultado do nó {origem} para o bloco {indice} ignorado ({situacao}).")
+            return {"ok": True, "situacao": situacao, "terminado": self.trabalho.terminado.is_set()}
+        if operacao == "progresso":
+            return self.trabalho.progresso()
+        return {"erro": f"operação desconhecida: {operacao}"}
+
+    def stop(self):
+        """
+        Para de aceitar nós e fecha as conexões abertas.
+        """
+        self.running = False
+        if self.server_socket:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server_socket.close()
+        with self.lock:
+            conexoes = list(self.conexoes)
+        for conexao in conexoes:
+            try:
+                conexao.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+class TrabalhoFederado:
+    """
+    Lado do nó: um trabalho com a mesma interface de tarefas.Trabalho
+    (proximo_bloco, concluir, devolver, progresso, terminado), que o Server usa
+    no lugar do trabalho local.
+
+    Os intervalos são arrendados do coordenador em blocos grandes e
+    subdivididos aqui, em um tarefas.Trabalho parcial por arrendamento. Quando
+    todos os sub-blocos de um arrendamento terminam, o resultado combinado é
+    enviado ao coordenador; se a entrega falhar, ele fica guardado e é
+    reenviado na próxima chamada a proximo_bloco ou concluir. Até max_arrendamentos ficam abertos ao mesmo
+    tempo, para que o nó não fique ocioso enquanto os últimos sub-blocos de um
+    arrendamento terminam.
+
+    Os sub-blocos recebem índices globais no nó (arrendamento * blocos por
+    arrendamento + sub-bloco), então respostas de clientes nunca se confundem
+    entre arrendamentos.
+
+    Parâmetros:
+        endereco (str): "host:porta" do coordenador.
+        tamanho_bloco (int): Índices por sub-bloco entregue aos clientes; padrão
+            é 1/64 do arrendamento.
+        max_arrendamentos (int): Arrendamentos abertos ao mesmo tempo.
+        log_callback (callable): Recebe mensagens de progresso.
+        espera_arrendamento (float): Segundos sem pedir novo arrendamento depois
+            que o coordenador não tinha nenhum para dar.
+        tempo_limite (float): Segundos de espera por cada resposta do
+            coordenador; depois disso a conexão é refeita.
+    """
+    def __init__(self, endereco, tamanho_bloco=None, max_arrendamentos=2, log_callback=None, espera_arrendamento=1.0,
+                 tempo_limite=TEMPO_LIMITE_COORDENADOR):
+        host, porta = endereco.rsplit(":", 1)
+        self.endereco = (host, int(porta))
+        self.tempo_limite = tempo_limite
+        self.conexao = None
+        self.leitor = None
+        self.lock_conexao = threading.Lock()
+        # Só um pedido de arrendamento por vez, fora de self.lock
+        self.lock_arrendar = threading.Lock()
+        self.log_callback = log_callback or (lambda mensagem: None)
+        descricao = self.requisitar({"op": "descrever"})
+        self.tarefa = tarefas.obter_tarefa(descricao["tarefa"], descricao["versao"])
+        if self.tarefa is None:
+            raise ValueError(f"tarefa desconhecida: {descricao['tarefa']} v{descricao['versao']}")
+        self.params = descricao["params"]
+        self.tamanho_arrendamento = descricao["tamanho_bloco"]
+        self.tamanho_bloco = tamanho_bloco or max(1, self.tamanho_arrendamento // 64)
+        self.blocos_por_arrendamento = -(-self.tamanho_arrendamento // self.tamanho_bloco)
+        self.max_arrendamentos = max_arrendamentos
+        self.espera_arrendamento = espera_arrendamento
+        self.arrendamentos = {}
+        # Arrendamentos terminados -> resultado combinado, até o coordenador confirmar
+        self.entregas_pendentes = {}
+        self.lock_entregas = threading.Lock()
+        self.concluidos = 0
+        self.sem_arrendamento_ate = 0.0
+        self.terminado = threading.Event()
+        self.lock = threading.Lock()
+
+    def _conectar(self):
+        # Chamado com self.lock_conexao
+        self.conexao = socket.create_connection(self.endereco, self.tempo_limite)
+        self.leitor = self.conexao.makefile("rb")
+
+    def _desconectar(self):
+        # Chamado com self.lock_conexao. Com o leitor de makefile aberto, close()
+        # sozinho não fecha o socket de fato
+        if self.conexao is None:
+            return
+        try:
+            self.conexao.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.leitor.close()
+        self.conexao.close()
+        self.conexao = self.leitor = None
+
+    def requisitar(self, pedido):
+        """
+        Envia um pedido ao coordenador e espera a resposta (no máximo
+        tempo_limite segundos). Se a conexão falhar, ela é refeita e o pedido
+        é enviado mais uma vez; os blocos arrendados pela conexão anterior
+        voltam para a fila do coordenador (ver Coordenador).
+
+        Levanta OSError (ConnectionError, socket.timeout) se a segunda
+        tentativa também falhar.
+        """
+        with self.lock_conexao:
+            for tentativa in range(2):
+                try:
+                    if self.conexao is None:
+                        self._conectar()
+                    _enviar(self.conexao, pedido)
+                    linha = self.leitor.readline()
+                    if not linha:
+                        raise ConnectionError("o coordenador fechou a conexão")
+                except OSError as e:
+                    # Depois de um erro ou de um timeout no meio de uma linha, a conexão não serve mais
+                    self._desconectar()
+                    if tentativa:
+                        raise
+                    self.log_callback(f"Conexão com o coordenador perdida ({e}); reconectando.")
+                    continue
+                return json.loads(linha)
+
+    def arrendar(self):
+        """
+        Pede um novo arrendamento ao coordenador. O pedido é feito sem
+        self.lock, para que um coordenador lento não trave o servidor.
+
+        Retorna:
+            O índice do arrendamento e seu Trabalho parcial, ou None se não houver bloco.
+        """
+        with self.lock:
+            if time.monotonic() < self.sem_arrendamento_ate or self.terminado.is_set():
+                return None
+        try:
+            resposta = self.requisitar({"op": "arrendar"})
+        except (OSError, ValueError) as e:
+            self.log_callback(f"Falha ao arrendar do coordenador: {e}")
+            with self.lock:
+                self.sem_arrendamento_ate = time.monotonic() + self.espera_arrendamento
+            return None
+        if resposta.get("bloco") is None:
+            with self.lock:
+                if resposta.get("terminado") and not self.arrendamentos and not self.entregas_pendentes:
+                    self.terminado.set()
+                self.sem_arrendamento_ate = time.monotonic() + self.espera_arrendamento
+            return None
+        inicio, fim = resposta["intervalo"]
+        parcial = tarefas.Trabalho(self.tarefa.nome, self.params, inicio, fim, self.tamanho_bloco, self.tarefa.versao, parcial=True)
+        with self.lock:
+            excedente = len(self.arrendamentos) >= self.max_arrendamentos
+            if not excedente:
+                self.arrendamentos[resposta["bloco"]] = parcial
+        if excedente:
+            # Outra chamada abriu arrendamentos enquanto este era pedido
+            try:
+                self.requisitar({"op": "devolver", "bloco": resposta["bloco"]})
+            except (OSError, ValueError):
+                pass
+            return None
+        self.log_callback(f"Bloco {resposta['bloco']} [{inicio}, {fim}) arrendado do coordenador.")
+        return resposta["bloco"], parcial
+
+    def proximo_bloco(self):
+        """
+        Reserva o próximo sub-bloco pendente, arrendando um novo bloco do
+        coordenador quando os arrendamentos abertos não têm mais nenhum.
+
+        Retorna:
+            O sub-bloco, com índice global no nó, ou None.
+        """
+        if self.entregas_pendentes:
+            self.entregar_pendentes()
+        with self.lock:
+            for arrendamento, parcial in sorted(self.arrendamentos.items()):
+                bloco = parcial.proximo_bloco()
+                if bloco is not None:
+                    return self._global(arrendamento, bloco)
+            if len(self.arrendamentos) >= self.max_arrendamentos:
+                return None
+        if not self.lock_arrendar.acquire(blocking=False):
+            return None
+        try:
+            arrendado = self.arrendar()
+        finally:
+            self.lock_arrendar.release()
+        if arrendado is None:
+            return None
+        arrendamento, parcial = arrendado
+        bloco = parcial.proximo_bloco()
+        return self._global(arrendamento, bloco) if bloco is not None else None
+
+    def _global(self, arrendamento, bloco):
+        return dict(bloco, indice=arrendamento * self.blocos_por_arrendamento + bloco["indice"])
+
+    def _local(self, bloco):
+        arrendamento, indice = divmod(bloco["indice"], self.blocos_por_arrendamento)
+        return arrendamento, dict(bloco, indice=indice)
+
+    def devolver(self, bloco):
+        """
+        Devolve um sub-bloco à fila do seu arrendamento.
+        """
+        arrendamento, local = self._local(bloco)
+        with self.lock:
+            parcial = self.arrendamentos.get(arrendamento)
+        if parcial is not None:
+            parcial.devolver(local)
+
+    def concluir(self, bloco, resultado, fim_parcial=None):
+        """
+        Registra o resultado de um sub-bloco (ou de um prefixo dele, ver
+        tarefas.Trabalho.concluir). Se ele fecha o arrendamento, o resultado
+        combinado é enviado ao coordenador.
+
+        Levanta ValueError se a tarefa não conseguir decodificar o resultado.
+
+        Retorna:
+            A situação do sub-bloco no arrendamento, como em
+            tarefas.Trabalho.concluir; CONCLUSAO_ANTIGA se o arrendamento já
+            foi fechado.
+        """
+        arrendamento, local = self._local(bloco)
+        with self.lock:
+            parcial = self.arrendamentos.get(arrendamento)
+        if parcial is None:
+            return tarefas.CONCLUSAO_ANTIGA
+        situacao = parcial.concluir(local, resultado, fim_parcial)
+        if not parcial.terminado.is_set():
+            return situacao
+        with self.lock:
+            if self.arrendamentos.pop(arrendamento, None) is None:
+                return situacao
+            self.entregas_pendentes[arrendamento] = parcial.resultado()
+        self.entregar_pendentes()
+        return situacao
+
+    def entregar_pendentes(self):
+        """
+        Envia ao coordenador os resultados de arrendamentos terminados que ainda
+        não foram confirmados. Um resultado só sai de entregas_pendentes quando o
+        coordenador responde; se a conexão falhar, ele é reenviado na próxima
+        chamada. Se outra thread já estiver entregando, não faz nada.
+        """
+        if not self.lock_entregas.acquire(blocking=False):
+            return
+        try:
+            with self.lock:
+                pendentes = sorted(self.entregas_pendentes.items())
+            for arrendamento, resultado in pendentes:
+                try:
+                    resposta = self.requisitar({"op": "concluir", "bloco": arrendamento, "resultado": resultado})
+                except (OSError, ValueError) as e:
+                    self.log_callback(f"Falha ao entregar o bloco {arrendamento} ao coordenador (nova tentativa depois): {e}")
+                    return
+                with self.lock:
+                    del self.entregas_pendentes[arrendamento]
+                if "erro" in resposta:
+                    # O coordenador não considera mais o bloco deste nó; reenviar não adianta
+                    self.log_callback(f"O coordenador recusou o bloco {arrendamento}: {resposta['erro']}")
+                    continue
+                with self.lock:
+                    self.concluidos += 1
+                    if resposta.get("terminado") and not self.arrendamentos and not self.entregas_pendentes:
+                        self.terminado.set()
+                self.log_callback(f"Bloco {arrendamento} entregue ao coordenador.")
+        finally:
+            self.lock_entregas.release()
+
+    def progresso(self):
+        """
+        Retorna a contagem de sub-blocos dos arrendamentos abertos (total,
+        concluidos, em_andamento, pendentes, retomados) e de arrendamentos
+        entregues e à espera de entrega.
+        """
+        with self.lock:
+            parciais = list(self.arrendamentos.values())
+            entregues = self.concluidos
+            a_entregar = len(self.entregas_pendentes)
+        progresso = {"total": 0, "concluidos": 0, "em_andamento": 0, "pendentes": 0, "retomados": 0}
+        for parcial in parciais:
+            for chave, valor in parcial.progresso().items():
+                progresso[chave] += valor
+        progresso["arrendamentos_abertos"] = len(parciais)
+        progresso["arrendamentos_entregues"] = entregues
+        progresso["entregas_pendentes"] = a_entregar
+        return progresso
+
+    def resultado(self):
+        """
+        O resultado final só existe no coordenador.
+        """
+        return None
+
+    def fechar(self):
+        """
+        Fecha a conexão com o coordenador, depois de uma última tentativa de
+        entregar os resultados pendentes; os arrendamentos abertos (e os não
+        entregues) voltam para a fila dele.
+        """
+        if self.entregas_pendentes:
+            self.entregar_pendentes()
+        with self.lock_conexao:
+            self._desconectar()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coordenador que reparte um trabalho entre vários servidores.")
+    parser.add_argument("tarefa", help="especificação JSON (ou arquivo) do trabalho; tamanho_bloco é o tamanho dos arrendamentos")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--porta", type=int, default=12400)
+    args = parser.parse_args()
+
+    trabalho = tarefas.criar_trabalho(args.tarefa, log_callback=print)
+    coordenador = Coordenador(trabalho, args.host, args.porta, print)
+    coordenador.start()
+    try:
+        trabalho.terminado.wait()
+    except KeyboardInterrupt:
+        pass
+    coordenador.stop()
+    print(json.dumps(trabalho.resultado(), ensure_ascii=False))
@@ -0,0 +1,176 @@
+import argparse
+import collections
+import json
+import struct
+import threading
+import time
+
+# Cabeçalho: assinatura, versão do formato e início da gravação (relógio de parede)
+CABECALHO = struct.Struct("<4sBd")
+ASSINATURA = b"TRAF"
+VERSAO_FORMATO = 1
+
+# Um registro por evento: conexão, tipo, nanossegundos desde o início e bytes
+REGISTRO = struct.Struct("<IBqI")
+
+# Tipos de evento, do ponto de vista do servidor
+CHEGADA = 0
+ENVIADO = 1
+RECEBIDO = 2
+FIM = 3
+
+# Registros acumulados em memória antes de cada escrita em disco
+TAMANHO_BUFFER = 4096
+
+class GravadorTrafego:
+    """
+    Grava a forma do tráfego recebido pelo servidor: o instante de chegada de
+    cada conexão, o tamanho de cada mensagem trocada e os intervalos entre
+    elas. O conteúdo das mensagens não é guardado.
+
+    O arquivo é binário: um cabeçalho e registros de largura fixa
+    (REGISTRO, 17 bytes) com o identificador da conexão, o tipo do evento
+    (CHEGADA, ENVIADO, RECEBIDO ou FIM), os nanossegundos desde o início da
+    gravação (time.perf_counter_ns) e o número de bytes. Os registros ficam
+    em buffer e são escritos em lotes, então o custo por evento é um
+    struct.pack sob um lock. Ver stress-tests/reproducao_trafego.py para
+    reproduzir uma gravação.
+
+    Parâmetros:
+        caminho: arquivo de saída; None desativa a gravação.
+
+    Métodos:
+        nova_conexao(): Registra a chegada de uma conexão e retorna seu identificador.
+        registrar(conexao, tipo, tamanho): Grava um evento da conexão.
+        fechar(): Grava o que estiver em buffer e fecha o arquivo.
+    """
+    def __init__(self, caminho=None):
+        self.arquivo = open(caminho, "wb") if caminho else None
+        self.base = time.perf_counter_ns()
+        self.proxima = 0
+        self.buffer = bytearray()
+        self.pendentes = 0
+        self.lock = threading.Lock()
+        if self.arquivo:
+            self.arquivo.write(CABECALHO.pack(ASSINATURA, VERSAO_FORMATO, time.time()))
+
+    def nova_conexao(self):
+        """
+        Registra a chegada de uma conexão.
+
+        Retorna:
+            O identificador da conexão, ou None se a gravação estiver desativada.
+        """
+        if self.arquivo is None:
+            return None
+        with self.lock:
+            conexao = self.proxima
+            self.proxima += 1
+        self.registrar(conexao, CHEGADA)
+        return conexao
+
+    def registrar(self, conexao, tipo, tamanho=0):
+        """
+        Grava um evento. Não faz nada se conexao for None.
+
+        Parâmetros:
+            conexao: identificador retornado por nova_conexao().
+            tipo: CHEGADA, ENVIADO, RECEBIDO ou FIM.
+            tamanho: bytes enviados ou recebidos.
+        """
+        if conexao is None:
+            return
+        instante = time.perf_counter_ns() - self.base
+        with self.lock:
+            if self.arquivo is None:
+                return
+            self.buffer += REGISTRO.pack(conexao, tipo, instante, tamanho)
+            self.pendentes += 1
+            if self.pendentes >= TAMANHO_BUFFER:
+                self._descarregar()
+
+    def _descarregar(self):
+        self.arquivo.write(self.buffer)
+        self.buffer.clear()
+        self.pendentes = 0
+
+    def fechar(self):
+        """
+        Grava o que estiver em buffer e fecha o arquivo de saída.
+        """
+        with self.lock:
+            if self.arquivo:
+                self._descarregar()
+                self.arquivo.close()
+                self.arquivo = None
+
+def carregar_trafego(caminho):
+    """
+    Lê uma gravação de GravadorTrafego.
+
+    Parâmetros:
+        caminho: arquivo gravado.
+
+    Retorna:
+        inicio (float): Início da gravação (time.time).
+        conexoes (list): Uma lista de eventos (tipo, ns desde o início, bytes)
+            por conexão, em ordem de chegada.
+    """
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    if len(dados) < CABECALHO.size:
+        raise ValueError(f"{caminho} não é uma gravação de tráfego")
+    assinatura, versao, inicio = CABECALHO.unpack_from(dados)
+    if assinatura != ASSINATURA or versao != VERSAO_FORMATO:
+        raise ValueError(f"{caminho} não é uma gravação de tráfego (versão {VERSAO_FORMATO})")
+    # Um registro incompleto no fim (servidor interrompido) é descartado
+    fim = CABECALHO.size + (len(dados) - CABECALHO.size) // REGISTRO.size * REGISTRO.size
+    por_conexao = collections.OrderedDict()
+    for conexao, tipo, instante, tamanho in REGISTRO.iter_unpack(memoryview(dados)[CABECALHO.size:fim]):
+        por_conexao.setdefault(conexao, []).append((tipo, instante, tamanho))
+    conexoes = [eventos for eventos in por_conexao.values() if eventos[0][0] == CHEGADA]
+    conexoes.sort(key=lambda eventos: eventos[0][1])
+    return inicio, conexoes
+
+def resumir(conexoes):
+    """
+    Resume uma gravação: duração, taxa de chegada, rajadas e tamanhos das mensagens.
+
+    Retorna:
+        Dicionário com o número de conexões e de mensagens, a duração, a taxa
+        média e a máxima em janelas de 1 s, os percentis dos intervalos entre
+        chegadas e dos bytes recebidos por mensagem.
+    """
+    def percentis(valores):
+        if not valores:
+            return None
+        valores.sort()
+        return {
+            "p50": valores[len(valores) // 2],
+            "p99": valores[min(len(valores) - 1, int(len(valores) * 0.99))],
+            "max": valores[-1],
+        }
+
+    chegadas = [eventos[0][1] for eventos in conexoes]
+    entre_chegadas = [(b - a) / 1e6 for a, b in zip(chegadas, chegadas[1:])]
+    por_segundo = collections.Counter(instante // 1000000000 for instante in chegadas)
+    recebidos = [tamanho for eventos in conexoes for tipo, _, tamanho in eventos if tipo == RECEBIDO]
+    duracao = (chegadas[-1] - chegadas[0]) / 1e9 if chegadas else 0.0
+    return {
+        "conexoes": len(conexoes),
+        "mensagens_recebidas": len(recebidos),
+        "duracao_s": duracao,
+        "taxa_media_por_s": len(chegadas) / duracao if duracao else None,
+        "taxa_maxima_por_s": max(por_segundo.values()) if por_segundo else 0,
+        "entre_chegadas_ms": percentis(entre_chegadas),
+        "bytes_recebidos": percentis(recebidos),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume uma gravação de tráfego do servidor.")
+    parser.add_argument("arquivo", help="arquivo gravado pelo GravadorTrafego")
+    args = parser.parse_args()
+    inicio, conexoes = carregar_trafego(args.arquivo)
+    resumo = resumir(conexoes)
+    resumo["inicio"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(inicio))
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
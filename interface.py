@@ -0,0 +1,43 @@
+import importlib
+import os
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+def modulo_gerado(nome):
+    """
+    Retorna o nome do módulo Python gerado a partir de <nome>.ui por compilar_interfaces.py.
+    """
+    return f"ui_{nome}"
+
+def carregar_interface(janela, nome):
+    """
+    Monta a interface <nome>.ui na janela.
+
+    Usa o módulo gerado por compilar_interfaces.py, que só instancia os widgets;
+    se ele não existir, ou se a variável de ambiente INTERFACE_DINAMICA estiver
+    definida (útil ao editar o .ui), cai para PyQt5.uic.loadUi, que interpreta
+    o XML a cada execução. Nos dois casos os widgets ficam acessíveis como
+    atributos da janela, pelo nome dado no Qt Designer.
+
+    Parâmetros:
+        janela: a QMainWindow a ser montada.
+        nome: nome do arquivo .ui, sem extensão (ex.: "client").
+
+    Retorna:
+        True se o módulo gerado foi usado, False se o .ui foi interpretado.
+    """
+    if not os.environ.get("INTERFACE_DINAMICA"):
+        try:
+            modulo = importlib.import_module(modulo_gerado(nome))
+        except ImportError:
+            modulo = None
+        if modulo is not None:
+            classe = next(getattr(modulo, atributo) for atributo in dir(modulo) if atributo.startswith("Ui_"))
+            interface = classe()
+            interface.setupUi(janela)
+            for atributo, valor in vars(interface).items():
+                setattr(janela, atributo, valor)
+            return True
+    from PyQt5.uic import loadUi
+    loadUi(os.path.join(DIRETORIO, f"{nome}.ui"), janela)
+    return False
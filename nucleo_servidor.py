@@ -0,0 +1,1024 @@
+import collections
+import gc
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import random
+import concurrent.futures
+import tarefas
+from gravacao_trafego import ENVIADO, FIM, RECEBIDO, GravadorTrafego
+from rastreamento import Cronometro, Rastreador, extrair_trace_id
+
+intervalos_utilizados = set()
+
+# Limite de tamanho da resposta de um cliente a uma atribuição de tarefa
+TAMANHO_MAXIMO_RESPOSTA = 64 * 1024 * 1024
+
+# Latências de handlers mais recentes guardadas para os percentis do painel
+TAMANHO_JANELA_LATENCIAS = 65536
+
+# Confirmação de recebimento dos resultados
+RESPOSTA_ACK = b"200 - Sever received the data\n"
+
+# Respostas de negação codificadas uma única vez
+NEGACAO_MAXIMO_CONEXOES = "Conexão negada: número máximo de conexões atingido.\n".encode()
+NEGACAO_SEM_BLOCO = "Conexão negada: nenhum bloco de trabalho disponível.\n".encode()
+NEGACAO_TAXA_IP = "Conexão negada: limite de conexões por segundo deste endereço atingido.\n".encode()
+NEGACAO_CONCORRENCIA_IP = "Conexão negada: limite de conexões simultâneas deste endereço atingido.\n".encode()
+
+def codificar_intervalo(intervalo, trace_id=None):
+    """
+    Monta a linha enviada pelo servidor no protocolo original: "a b" e, quando
+    o intervalo é rastreado, o trace_id como terceiro campo (ecoado pelo cliente).
+
+    Retorna:
+        A mensagem codificada (bytes).
+    """
+    if trace_id:
+        return f"{intervalo[0]} {intervalo[1]} {trace_id}\n".encode()
+    return f"{intervalo[0]} {intervalo[1]}\n".encode()
+
+class ClientHandler:
+    """
+    Classe para lidar com clientes conectados ao servidor.
+
+    Parâmetros:
+        client_socket: socket do cliente conectado.
+        intervalo: intervalo atribuído ao cliente para cálculos.
+        log_callback: função de callback para registrar mensagens de log.
+        connection_log_callback: função de callback para registrar conexões.
+        trace_id: identificador de rastreamento do intervalo (None se não amostrado).
+        rastreador: Rastreador onde os spans do handler são gravados.
+        trabalho: tarefas.Trabalho ao qual o bloco pertence (None no protocolo original).
+        bloco: bloco do trabalho atribuído ao cliente.
+        gravador_trafego: GravadorTrafego onde as mensagens da conexão são registradas.
+        conexao_trafego: identificador da conexão no gravador (None se não gravada).
+
+    Métodos:
+        decode_server_message(socket): Decodifica mensagens recebidas do cliente.
+        receber_linha(socket): Recebe uma linha completa do cliente.
+        handle(client_address): Manipula a conexão com o cliente.
+        handle_tarefa(client_address): Recebe o resultado de um bloco de tarefa.
+        cancelar(): Pede ao cliente que pare o cálculo e devolva o que já calculou.
+    """
+    def __init__(self, client_socket, intervalo, log_callback, connection_log_callback, trace_id=None, rastreador=None, trabalho=None, bloco=None,
+                 gravador_trafego=None, conexao_trafego=None):
+        self.client_socket = client_socket
+        self.intervalo = intervalo
+        self.log_callback = log_callback
+        self.connection_log_callback = connection_log_callback
+        self.trace_id = trace_id
+        self.rastreador = rastreador
+        self.trabalho = trabalho
+        self.bloco = bloco
+        self.gravador_trafego = gravador_trafego
+        self.conexao_trafego = conexao_trafego
+        self.cancelado = False
+
+    def registrar_trafego(self, tipo, tamanho=0):
+        """
+        Registra um evento da conexão no gravador de tráfego, se ela estiver sendo gravada.
+        """
+        if self.conexao_trafego is not None:
+            self.gravador_trafego.registrar(self.conexao_trafego, tipo, tamanho)
+
+    def cancelar(self):
+        """
+        Envia ao cliente a mensagem de controle de cancelamento (só uma vez).
+        Um cliente que a entende para o cálculo no próximo ponto de verificação
+        e responde com o resultado do prefixo calculado; os demais a ignoram.
+        Pode ser chamado de outra thread enquanto o handler espera a resposta.
+
+        Retorna:
+            True se a mensagem foi enviada agora.
+        """
+        if self.cancelado:
+            return False
+        self.cancelado = True
+        mensagem = tarefas.codificar_cancelamento(self.bloco["indice"] if self.bloco else None)
+        try:
+            self.client_socket.sendall(mensagem)
+        except OSError:
+            return False
+        self.registrar_trafego(ENVIADO, len(mensagem))
+        return True
+
+    def decode_server_message(self, socket):
+        """
+        Decodifica mensagens recebidas do cliente.
+
+        Parâmetros:
+            socket: socket do cliente.
+
+        Retorna:
+            Mensagem decodificada.
+        """
+        dados = socket.recv(1024)
+        if dados:
+            self.registrar_trafego(RECEBIDO, len(dados))
+        return dados.decode().strip()
+
+    def receber_linha(self, socket):
+        """
+        Recebe dados do cliente até o fim da primeira linha (ou da conexão).
+
+        Parâmetros:
+            socket: socket do cliente.
+
+        Retorna:
+            A linha decodificada, sem o fim de linha, ou None se passar de
+            TAMANHO_MAXIMO_RESPOSTA ou não for UTF-8 válido.
+        """
+        dados = bytearray()
+        while b"\n" not in dados:
+            pedaco = socket.recv(65536)
+            if not pedaco:
+                break
+            dados += pedaco
+            if len(dados) > TAMANHO_MAXIMO_RESPOSTA:
+                return None
+        if dados:
+            self.registrar_trafego(RECEBIDO, len(dados))
+        try:
+            return dados.split(b"\n", 1)[0].decode().strip()
+        except UnicodeDecodeError:
+            return None
+
+    def handle(self, client_address):
+        """
+        Manipula a conexão com o cliente.
+
+        Parâmetros:
+            client_address: tupla contendo o endereço IP e a porta do cliente.
+
+        Retorna:
+            Número de termos (índices do intervalo) cujos resultados foram
+            recebidos; 0 se o cliente não enviou resultados. Um cliente
+            cancelado informa até onde calculou (tarefas.PREFIXO_CONCLUIDO).
+        """
+        if self.trabalho is not None:
+            return self.handle_tarefa(client_address)
+
+        a, b = self.intervalo
+
+        # Registra o endereço do cliente na GUI do servidor
+        self.log_callback(f"Nova conexão de: {client_address[0]}:{client_address[1]}")
+
+        # Recebe os resultados dos cálculos do cliente
+        resultados = []
+        cronometro = Cronometro() if self.trace_id else None
+        while True:
+            resultado = self.decode_server_message(self.client_socket)
+            if not resultado:
+                break
+            if cronometro and not resultados:
+                self.rastreador.registrar(self.trace_id, "espera_resultados", cronometro.inicio_ns, cronometro.decorrido())
+            resultados.append(resultado)
+            # Envia uma confirmação de volta para o cliente
+            ack = Cronometro() if self.trace_id else None
+            self.client_socket.sendall(RESPOSTA_ACK)
+            self.registrar_trafego(ENVIADO, len(RESPOSTA_ACK))
+            if ack:
+                self.rastreador.registrar(self.trace_id, "ack", ack.inicio_ns, ack.decorrido())
+        # Imprime os resultados recebidos
+        persistencia = Cronometro() if self.trace_id else None
+        trace = f" (trace {self.trace_id})" if self.trace_id else ""
+        self.log_callback(f"\nResultados recebidos do cliente {client_address[0]}:{client_address[1]}{trace}:")
+        for resultado in resultados:
+            self.log_callback(resultado)
+        self.log_callback("\n")
+        if persistencia:
+            eco = extrair_trace_id("\n".join(resultados))
+            self.rastreador.registrar(self.trace_id, "persistencia", persistencia.inicio_ns, persistencia.decorrido(), eco_confere=eco == self.trace_id)
+
+        # Fecha a conexão com o cliente
+        self.client_socket.close()
+        self.registrar_trafego(FIM)
+        if not resultados:
+            return 0
+        for linha in "\n".join(resultados).splitlines():
+            if linha.startswith(tarefas.PREFIXO_CONCLUIDO):
+                try:
+                    _, fim = (int(valor) for valor in linha[len(tarefas.PREFIXO_CONCLUIDO):].split())
+                except ValueError:
+                    break
+                # "a b" é inclusivo nos dois extremos, e fim é o último número calculado
+                return max(0, min(fim, b) - a + 1)
+        return b - a + 1
+
+    def handle_tarefa(self, client_address):
+        """
+        Recebe a resposta do cliente a um bloco de tarefa (uma linha JSON), confirma
+        o recebimento e entrega o resultado parcial ao trabalho. Se o cliente não
+        devolver um resultado para o bloco atribuído, o bloco volta para a fila;
+        se devolver só o de um prefixo (cálculo cancelado), o prefixo é
+        creditado e só o restante volta.
+
+        Parâmetros:
+            client_address: tupla contendo o endereço IP e a porta do cliente.
+
+        Retorna:
+            Número de termos creditados (o bloco ou o prefixo); 0 se nenhum.
+        """
+        self.log_callback(f"Nova conexão de: {client_address[0]}:{client_address[1]}")
+        cronometro = Cronometro() if self.trace_id else None
+        concluido = False
+        creditados = 0
+        try:
+            texto = self.receber_linha(self.client_socket)
+            if not texto:
+                return 0
+            if cronometro:
+                self.rastreador.registrar(self.trace_id, "espera_resultados", cronometro.inicio_ns, cronometro.decorrido())
+            ack = Cronometro() if self.trace_id else None
+            self.client_socket.sendall(RESPOSTA_ACK)
+            self.registrar_trafego(ENVIADO, len(RESPOSTA_ACK))
+            if ack:
+                self.rastreador.registrar(self.trace_id, "ack", ack.inicio_ns, ack.decorrido())
+
+            persistencia = Cronometro() if self.trace_id else None
+            resposta = tarefas.interpretar_resposta(texto)
+            origem = f"{client_address[0]}:{client_address[1]}"
+            if resposta is None or resposta["bloco"] != self.bloco["indice"]:
+                self.log_callback(f"Resposta inválida de {origem} para o bloco {self.bloco['indice']}.")
+            elif "erro" in resposta:
+                self.log_callback(f"Cliente {origem} não calculou o bloco {self.bloco['indice']}: {resposta['erro']}")
+            elif "resultado" in resposta:
+                inicio, fim = self.bloco["inicio"], self.bloco["fim"]
+                intervalo = resposta.get("intervalo")
+                fim_parcial = intervalo[1] if isinstance(intervalo, list) and len(intervalo) == 2 and intervalo[0] == inicio else None
+                try:
+                    if intervalo is not None and fim_parcial is None:
+                        raise ValueError(f"intervalo {intervalo} não é um prefixo do bloco")
+                    situacao = self.trabalho.concluir(self.bloco, resposta["resultado"], fim_parcial)
+                except (TypeError, ValueError) as e:
+                    self.log_callback(f"Resultado inválido de {origem} para o bloco {self.bloco['indice']}: {e}")
+                else:
+                    # Mesmo ignorada, a resposta não deve devolver o bloco à fila:
+                    # ele já foi concluído ou retomado por outra atribuição
+                    concluido = True
+                    if situacao in (tarefas.CONCLUSAO_DUPLICADA, tarefas.CONCLUSAO_ANTIGA):
+                        self.log_callback(f"Resposta de {origem} para o bloco {self.bloco['indice']} [{inicio}, {fim}) ignorada ({situacao}).")
+                    elif situacao == tarefas.CONCLUSAO_PREFIXO:
+                        creditados = fim_parcial - inicio
+                        self.log_callback(f"Bloco {self.bloco['indice']} cancelado: [{inicio}, {fim_parcial}) creditado a {origem}, [{fim_parcial}, {fim}) volta para a fila.")
+                    else:
+                        creditados = fim - inicio
+                        self.log_callback(f"Bloco {self.bloco['indice']} [{inicio}, {fim}) concluído por {origem}.")
+            if persistencia:
+                self.rastreador.registrar(self.trace_id, "persistencia", persistencia.inicio_ns, persistencia.decorrido(),
+                                          eco_confere=bool(resposta) and resposta.get("trace_id") == self.trace_id)
+        finally:
+            if not concluido:
+                self.trabalho.devolver(self.bloco)
+            self.client_socket.close()
+            self.registrar_trafego(FIM)
+        return creditados
+
+class AdmissaoPorIP:
+    """
+    Controle de admissão por endereço IP de origem: um balde de fichas (taxa
+    de conexões por segundo, com rajadas de até rajada conexões) e um limite de
+    conexões simultâneas por IP.
+
+    Cada IP ocupa uma entrada de tamanho fixo, mantida em ordem de último uso;
+    entradas sem conexões ativas e paradas há mais de ocioso segundos são
+    removidas aos poucos a cada admissão, então a memória acompanha o número
+    de IPs ativos e nenhuma varredura completa é necessária.
+
+    Parâmetros:
+        taxa: conexões por segundo admitidas por IP; None não limita a taxa.
+        rajada: capacidade do balde; padrão é max(1, taxa).
+        max_simultaneas: conexões em atendimento por IP; None não limita.
+        ocioso: segundos sem uso até uma entrada poder ser removida.
+
+    Métodos:
+        admitir(ip): Decide se uma conexão recém-aceita pode ser atendida.
+        liberar(ip): Registra o fim do atendimento de uma conexão admitida.
+        estado(): IPs acompanhados e contagem de negações por motivo.
+    """
+    def __init__(self, taxa=None, rajada=None, max_simultaneas=None, ocioso=60.0):
+        self.taxa = taxa
+        self.rajada = rajada if rajada is not None else max(1.0, taxa or 0)
+        self.max_simultaneas = max_simultaneas
+        self.ocioso = ocioso
+        # ip -> [fichas, instante da última atualização, conexões ativas]
+        self.entradas = collections.OrderedDict()
+        self.negacoes_taxa = 0
+        self.negacoes_concorrencia = 0
+        self.lock = threading.Lock()
+
+    def admitir(self, ip):
+        """
+        Decide se uma conexão recém-aceita de ip pode ser atendida; se puder,
+        consome uma ficha e conta a conexão como ativa até liberar(ip).
+
+        Retorna:
+            None se a conexão foi admitida; senão, a resposta de negação já
+            codificada (bytes).
+        """
+        agora = time.monotonic()
+        with self.lock:
+            self._remover_ociosas(agora)
+            entrada = self.entradas.get(ip)
+            if entrada is None:
+                entrada = self.entradas[ip] = [self.rajada, agora, 0]
+            else:
+                self.entradas.move_to_end(ip)
+                self._recarregar(entrada, agora)
+            if self.max_simultaneas is not None and entrada[2] >= self.max_simultaneas:
+                self.negacoes_concorrencia += 1
+                return NEGACAO_CONCORRENCIA_IP
+            if self.taxa is not None:
+                if entrada[0] < 1:
+                    self.negacoes_taxa += 1
+                    return NEGACAO_TAXA_IP
+                entrada[0] -= 1
+            entrada[2] += 1
+            return None
+
+    def liberar(self, ip):
+        """
+        Registra o fim do atendimento de uma conexão admitida de ip.
+        """
+        with self.lock:
+            entrada = self.entradas.get(ip)
+            if entrada is not None and entrada[2] > 0:
+                entrada[2] -= 1
+
+    def _recarregar(self, entrada, agora):
+        if self.taxa is not None:
+            entrada[0] = min(self.rajada, entrada[0] + (agora - entrada[1]) * self.taxa)
+        entrada[1] = agora
+
+    def _remover_ociosas(self, agora):
+        # As entradas mais antigas ficam no início; no máximo algumas são
+        # examinadas por chamada, então o custo amortizado é O(1)
+        for _ in range(2):
+            if not self.entradas:
+                return
+            ip, entrada = next(iter(self.entradas.items()))
+            if agora - entrada[1] < self.ocioso:
+                return
+            if entrada[2] > 0:
+                # Ainda há conexões em atendimento: volta para o fim da fila
+                self._recarregar(entrada, agora)
+                self.entradas.move_to_end(ip)
+            else:
+                del self.entradas[ip]
+
+    def estado(self):
+        """
+        Retorna o número de IPs acompanhados e as negações por motivo.
+        """
+        with self.lock:
+            return {"ips": len(self.entradas), "negacoes_taxa": self.negacoes_taxa, "negacoes_concorrencia": self.negacoes_concorrencia}
+
+class Server:
+    """
+    Classe que representa o servidor.
+
+    Parâmetros:
+        host: endereço IP do servidor.
+        port: porta do servidor.
+        max_connections: número máximo de conexões permitidas.
+        log_callback: função de callback para registrar mensagens de log.
+        connection_log_callback: função de callback para registrar conexões.
+        arquivo_metricas: arquivo JSON lines onde as métricas são gravadas periodicamente (opcional).
+        intervalo_metricas: segundos entre amostras de métricas.
+        rastreador: Rastreador para os spans de cada intervalo atribuído (opcional).
+        trabalhadores: threads do executor que atende os clientes; padrão é o número de núcleos.
+        trabalho: tarefas.Trabalho distribuído em blocos aos clientes; sem ele, cada
+            cliente recebe um intervalo "a b" do protocolo original.
+        processos_locais: processos que calculam blocos do trabalho no próprio
+            servidor enquanto há poucos clientes (ver TrabalhadoresLocais); 0 desliga.
+        limiar_locais: número de clientes atendidos a partir do qual os processos
+            locais deixam de pegar blocos; padrão é processos_locais.
+        taxa_por_ip: conexões por segundo admitidas de cada IP (ver AdmissaoPorIP).
+        rajada_por_ip: rajada de conexões admitida de cada IP.
+        conexoes_por_ip: conexões simultâneas em atendimento por IP.
+        gravador_trafego: GravadorTrafego que registra chegadas e tamanhos das
+            mensagens de cada conexão, para reprodução (opcional).
+        idade_retardatario: segundos a partir dos quais um bloco em cálculo é
+            cancelado quando um cliente chega e não há mais blocos pendentes: o
+            prefixo calculado é creditado e o restante fica para o novo cliente
+            (que tenta de novo); None desliga.
+
+    Com port=0 o sistema escolhe uma porta livre; a porta efetiva fica em self.port
+    quando o evento self.escutando é sinalizado.
+
+    Métodos:
+        accept_connections(): Aceita conexões de clientes.
+        start(): Inicia o servidor.
+        stop(): Para o servidor.
+        gerar_intervalo_unico(): Gera um intervalo único para um cliente.
+        metricas(): Retorna um retrato do uso de recursos do servidor.
+        cancelar_em_andamento(): Cancela o cálculo de todos os clientes em atendimento.
+        dividir_retardatario(): Cancela o bloco há mais tempo em cálculo, para redistribuir o restante.
+        contadores(janela): Retorna os contadores e as latências recentes usados pelo painel.
+        iniciar_perfil(duracao, frequencia, caminho): Liga o perfilador por amostragem.
+        parar_perfil(): Desliga o perfilador e grava o resultado.
+        alternar_perfil(): Liga ou desliga o perfilador.
+    """
+    def __init__(self, host, port, max_connections, log_callback, connection_log_callback, arquivo_metricas=None, intervalo_metricas=5.0, rastreador=None, trabalhadores=None, trabalho=None,
+                 processos_locais=0, limiar_locais=None, taxa_por_ip=None, rajada_por_ip=None, conexoes_por_ip=None,
+                 gravador_trafego=None, idade_retardatario=None):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.log_callback = log_callback
+        self.connection_log_callback = connection_log_callback
+        self.server_socket = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=trabalhadores or os.cpu_count())
+        self.running = True
+        self.connections_count = 0
+        self.handlers_ativos = 0
+        # Handlers submetidos ao executor que ainda esperam uma thread livre
+        self.handlers_na_fila = 0
+        self.handlers_concluidos = 0
+        self.negacoes = 0
+        self.termos_concluidos = 0
+        self.latencias = collections.deque(maxlen=TAMANHO_JANELA_LATENCIAS)
+        # Handlers em atendimento -> instante (time.monotonic) em que começaram, em ordem de início
+        self.em_atendimento = {}
+        self.cancelamentos = 0
+        self.idade_retardatario = idade_retardatario
+        self.lock = threading.Lock()
+        self.monitor = MonitorRecursos(self, arquivo_metricas, intervalo_metricas) if arquivo_metricas else None
+        self.perfilador = None
+        self.rastreador = rastreador or Rastreador()
+        self.gravador_trafego = gravador_trafego or GravadorTrafego()
+        self.escutando = threading.Event()
+        self.trabalho = trabalho
+        self.locais = TrabalhadoresLocais(self, processos_locais, limiar_locais) if trabalho and processos_locais else None
+        self.admissao = None
+        if taxa_por_ip is not None or conexoes_por_ip is not None:
+            self.admissao = AdmissaoPorIP(taxa_por_ip, rajada_por_ip, conexoes_por_ip)
+
+    def accept_connections(self):
+        """
+        Aceita conexões de clientes.
+        """
+        while self.running:
+            with self.lock:
+                if self.connections_count >= self.max_connections:
+                    self.log_callback("Número máximo de conexões atingido. Negando nova conexão.")
+                    client_socket, _ = self.server_socket.accept()
+                    conexao_trafego = self.gravador_trafego.nova_conexao()
+                    client_socket.send(NEGACAO_MAXIMO_CONEXOES)
+                    client_socket.close()
+                    self.gravador_trafego.registrar(conexao_trafego, ENVIADO, len(NEGACAO_MAXIMO_CONEXOES))
+                    self.gravador_trafego.registrar(conexao_trafego, FIM)
+                    self.negacoes += 1
+                    continue
+
+            client_socket, address = self.server_socket.accept()
+            inicio = time.perf_counter()
+            conexao_trafego = self.gravador_trafego.nova_conexao()
+            # Admissão por IP antes de qualquer trabalho por conexão (bloco, intervalo, trace)
+            if self.admissao is not None:
+                negacao = self.admissao.admitir(address[0])
+                if negacao is not None:
+                    self.negar(client_socket, negacao, conexao_trafego=conexao_trafego)
+                    continue
+            bloco = None
+            if self.trabalho is not None:
+                bloco = self.trabalho.proximo_bloco()
+                if bloco is None:
+                    if self.idade_retardatario is not None:
+                        self.dividir_retardatario()
+                    self.negar(client_socket, NEGACAO_SEM_BLOCO, address[0], conexao_trafego)
+                    continue
+            trace_id = self.rastreador.novo_trace_id()
+            aceitacao = Cronometro() if trace_id else None
+    
+            with self.lock:
+                self.connections_count += 1
+            atribuicao = Cronometro() if trace_id else None
+            if bloco is not None:
+                intervalo = (bloco["inicio"], bloco["fim"])
+                try:
+                    mensagem = tarefas.codificar_atribuicao(self.trabalho, bloco, trace_id)
+                    client_socket.send(mensagem)
+                except OSError:
+                    self.trabalho.devolver(bloco)
+                    client_socket.close()
+                    self.gravador_trafego.registrar(conexao_trafego, FIM)
+                    if self.admissao is not None:
+                        self.admissao.liberar(address[0])
+                    continue
+                if trace_id:
+                    self.rastreador.registrar(trace_id, "atribuicao", atribuicao.inicio_ns, atribuicao.decorrido(), intervalo=list(intervalo), bloco=bloco["indice"])
+            else:
+                intervalo = self.gerar_intervalo_unico()
+                mensagem = codificar_intervalo(intervalo, trace_id)
+                client_socket.send(mensagem)
+                if trace_id:
+                    self.rastreador.registrar(trace_id, "atribuicao", atribuicao.inicio_ns, atribuicao.decorrido(), intervalo=list(intervalo))
+            self.gravador_trafego.registrar(conexao_trafego, ENVIADO, len(mensagem))
+
+            client_handler = ClientHandler(client_socket, intervalo, self.log_callback, self.connection_log_callback, trace_id, self.rastreador, self.trabalho, bloco,
+                                           self.gravador_trafego, conexao_trafego)
+            with self.lock:
+                self.handlers_ativos += 1
+                self.handlers_na_fila += 1
+                self.em_atendimento[client_handler] = time.monotonic()
+            future = self.executor.submit(self.atender, client_handler, address)
+            future.add_done_callback(lambda future, inicio=inicio, ip=address[0], handler=client_handler: self.handler_finalizado(future, inicio, ip, handler))
+            self.connection_log_callback(address)
+            if aceitacao:
+                self.rastreador.registrar(trace_id, "aceitacao", aceitacao.inicio_ns, aceitacao.decorrido(), endereco=f"{address[0]}:{address[1]}")
+
+    def negar(self, client_socket, negacao, ip=None, conexao_trafego=None):
+        """
+        Envia uma resposta de negação já codificada e fecha a conexão.
+
+        Parâmetros:
+            client_socket: socket do cliente recém-aceito.
+            negacao: a resposta (bytes), ex.: NEGACAO_TAXA_IP.
+            ip: IP admitido por AdmissaoPorIP cuja vaga deve ser liberada.
+            conexao_trafego: identificador da conexão no gravador de tráfego.
+        """
+        try:
+            client_socket.send(negacao)
+            self.gravador_trafego.registrar(conexao_trafego, ENVIADO, len(negacao))
+        except OSError:
+            pass
+        client_socket.close()
+        self.gravador_trafego.registrar(conexao_trafego, FIM)
+        if ip is not None and self.admissao is not None:
+            self.admissao.liberar(ip)
+        with self.lock:
+            self.negacoes += 1
+
+    def atender(self, handler, address):
+        """
+        Executa ClientHandler.handle numa thread do executor, descontando o
+        handler da fila de espera quando ele começa.
+
+        Retorna:
+            O retorno de handle (termos creditados).
+        """
+        with self.lock:
+            self.handlers_na_fila -= 1
+        return handler.handle(address)
+
+    def handler_finalizado(self, future, inicio=None, ip=None, handler=None):
+        """
+        Chamado quando um ClientHandler termina (com ou sem erro).
+
+        Parâmetros:
+            future: future do handler submetido ao executor.
+            inicio: instante (time.perf_counter) em que a conexão foi aceita.
+            ip: IP do cliente, cuja vaga em AdmissaoPorIP é liberada.
+            handler: o ClientHandler, que deixa de contar como em atendimento.
+        """
+        if ip is not None and self.admissao is not None:
+            self.admissao.liberar(ip)
+        fim = time.perf_counter()
+        termos = future.result() if not future.cancelled() and future.exception() is None else 0
+        with self.lock:
+            self.em_atendimento.pop(handler, None)
+            self.handlers_ativos -= 1
+            self.handlers_concluidos += 1
+            self.termos_concluidos += termos or 0
+            if inicio is not None:
+                self.latencias.append((fim, fim - inicio))
+        if self.locais:
+            self.locais.acordar.set()
+
+    def cancelar_em_andamento(self):
+        """
+        Cancela o cálculo de todos os clientes em atendimento (ver
+        ClientHandler.cancelar); os que entendem o cancelamento devolvem o
+        resultado do que já calcularam, que ainda é creditado pelos handlers.
+
+        Retorna:
+            Número de clientes cancelados.
+        """
+        with self.lock:
+            handlers = list(self.em_atendimento)
+        cancelados = sum(1 for handler in handlers if handler.cancelar())
+        with self.lock:
+            self.cancelamentos += cancelados
+        return cancelados
+
+    def dividir_retardatario(self):
+        """
+        Cancela o bloco de tarefa há mais tempo em cálculo, se ele já passou de
+        idade_retardatario segundos, para que o restante dele seja redistribuído.
+
+        Retorna:
+            O ClientHandler cancelado, ou None.
+        """
+        limite = time.monotonic() - self.idade_retardatario
+        with self.lock:
+            # Em ordem de início: o primeiro ainda não cancelado é o mais antigo
+            retardatario = None
+            for handler, inicio in self.em_atendimento.items():
+                if inicio > limite:
+                    break
+                if handler.bloco is not None and not handler.cancelado:
+                    retardatario = handler
+                    break
+        if retardatario is None or not retardatario.cancelar():
+            return None
+        with self.lock:
+            self.cancelamentos += 1
+        self.log_callback(f"Bloco {retardatario.bloco['indice']} em cálculo há mais de {self.idade_retardatario:g}s cancelado para redistribuir o restante.")
+        return retardatario
+
+    def start(self):
+        """
+        Inicia o servidor.
+        """
+        if self.monitor:
+            self.monitor.start()
+        if self.locais:
+            self.locais.start()
+        while self.running:
+            try:
+                self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.server_socket.bind((self.host, self.port))
+                self.server_socket.listen()
+                self.port = self.server_socket.getsockname()[1]
+                self.escutando.set()
+
+                self.log_callback(f"Servidor escutando em {self.host}:{self.port}. Aguardando conexões...")
+
+                self.accept_connections()
+
+            except Exception as e:
+                if isinstance(e, RuntimeError) and "cannot schedule new futures after shutdown" in str(e):
+                    self.log_callback("Erro no servidor: O servidor foi encerrado e não aceita mais conexões.")
+                    break
+                elif isinstance(e, OSError) and e.errno == 98:
+                    self.log_callback("Endereço e porta já estão em uso. Tentando novamente em alguns segundos...")
+                    time.sleep(5)
+                    continue
+                else:
+                    self.log_callback(f"Erro no servidor: {e}")
+                    break
+            finally:
+                if self.server_socket:
+                    self.server_socket.close()
+
+        self.log_callback("Servidor parou.")
+
+    def stop(self):
+        """
+        Para o servidor.
+        """
+        if self.server_socket:
+            # No Linux, só close() não acorda a thread bloqueada em accept()
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server_socket.close()
+        # Encerramento da sessão: os clientes param de calcular e devolvem o que já têm
+        self.cancelar_em_andamento()
+        self.executor.shutdown(wait=False)  # Usamos wait=False para evitar bloqueio
+        self.running = False
+        if self.monitor:
+            self.monitor.parar()
+        if self.locais:
+            self.locais.parar()
+        if self.trabalho:
+            self.trabalho.fechar()
+        self.parar_perfil()
+        self.rastreador.fechar()
+        self.gravador_trafego.fechar()
+        self.log_callback("Servidor parando.....")
+
+    def gerar_intervalo_unico(self):
+        """
+        Gera um intervalo único para um cliente.
+
+        Retorna:
+            Intervalo único.
+        """
+        while True:
+            segundo_valor = random.randint(1, 1000000)
+            intervalo = (0, segundo_valor)
+            if intervalo not in intervalos_utilizados:
+                intervalos_utilizados.add(intervalo)
+                return intervalo
+
+    def contadores(self, janela=1.0):
+        """
+        Retorna os contadores acumulados do servidor e os percentis de latência
+        dos handlers que terminaram nos últimos janela segundos. É barato o
+        bastante para ser chamado a cada segundo pelo painel da interface.
+
+        Parâmetros:
+            janela: segundos considerados nos percentis de latência.
+
+        Retorna:
+            Dicionário com instante (time.perf_counter), conexões aceitas,
+            negações, handlers ativos e concluídos, termos concluídos e
+            latencia_p50/latencia_p99 em segundos (None sem handlers na janela).
+        """
+        instante = time.perf_counter()
+        with self.lock:
+            contadores = {
+                "instante": instante,
+                "conexoes_aceitas": self.connections_count,
+                "negacoes": self.negacoes,
+                "handlers_ativos": self.handlers_ativos,
+                "handlers_concluidos": self.handlers_concluidos,
+                "termos_concluidos": self.termos_concluidos,
+            }
+            recentes = []
+            for fim, latencia in reversed(self.latencias):
+                if fim < instante - janela:
+                    break
+                recentes.append(latencia)
+        recentes.sort()
+        contadores["latencia_p50"] = recentes[len(recentes) // 2] if recentes else None
+        contadores["latencia_p99"] = recentes[min(len(recentes) - 1, int(len(recentes) * 0.99))] if recentes else None
+        return contadores
+
+    def metricas(self):
+        """
+        Retorna um retrato do uso de recursos do servidor.
+
+        Retorna:
+            Dicionário com memória residente, descritores abertos, threads,
+            fila do executor, handlers ativos, intervalos utilizados,
+            estatísticas do coletor de lixo e os contadores de contadores().
+        """
+        with self.lock:
+            conexoes = self.connections_count
+            handlers_ativos = self.handlers_ativos
+            handlers_na_fila = self.handlers_na_fila
+            negacoes = self.negacoes
+            handlers_concluidos = self.handlers_concluidos
+            termos_concluidos = self.termos_concluidos
+            cancelamentos = self.cancelamentos
+        try:
+            with open("/proc/self/statm") as arquivo:
+                rss_bytes = int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            fds_abertos = len(os.listdir("/proc/self/fd"))
+        except OSError:
+            rss_bytes = None
+            fds_abertos = None
+        return {
+            "rss_bytes": rss_bytes,
+            "fds_abertos": fds_abertos,
+            "threads": threading.active_count(),
+            "backlog_executor": handlers_na_fila,
+            "handlers_ativos": handlers_ativos,
+            "handlers_concluidos": handlers_concluidos,
+            "conexoes_aceitas": conexoes,
+            "negacoes": negacoes,
+            "termos_concluidos": termos_concluidos,
+            "intervalos_utilizados": len(intervalos_utilizados),
+            "gc_pendentes": list(gc.get_count()),
+            "gc_coletas": [estatistica["collections"] for estatistica in gc.get_stats()],
+            "gc_nao_coletaveis": len(gc.garbage),
+            "trabalho": self.trabalho.progresso() if self.trabalho else None,
+            "locais": self.locais.estado() if self.locais else None,
+            "admissao": self.admissao.estado() if self.admissao else None,
+            "cancelamentos": cancelamentos,
+        }
+
+    def iniciar_perfil(self, duracao=30, frequencia=100, caminho=None):
+        """
+        Liga o perfilador por amostragem sobre o laço de aceitação e os handlers.
+
+        Parâmetros:
+            duracao: tempo máximo de amostragem em segundos.
+            frequencia: amostras por segundo.
+            caminho: arquivo de saída; por padrão perfil_servidor_<instante>.folded.
+        """
+        with self.lock:
+            if self.perfilador and self.perfilador.is_alive():
+                return
+            if caminho is None:
+                caminho = f"perfil_servidor_{time.strftime('%Y%m%d_%H%M%S')}.folded"
+            self.perfilador = PerfiladorAmostragem(self, caminho, duracao, frequencia)
+            self.perfilador.start()
+        self.log_callback(f"Perfilador ligado por até {duracao}s ({frequencia} amostras/s).")
+
+    def parar_perfil(self):
+        """
+        Desliga o perfilador, se estiver ligado. O resultado é gravado pela própria
+        thread do perfilador ao terminar.
+        """
+        perfilador = self.perfilador
+        if perfilador:
+            perfilador.parar()
+
+    def alternar_perfil(self):
+        """
+        Liga o perfilador se estiver desligado e vice-versa.
+        """
+        perfilador = self.perfilador
+        if perfilador and perfilador.is_alive():
+            self.parar_perfil()
+        else:
+            self.iniciar_perfil()
+
+class PerfiladorAmostragem(threading.Thread):
+    """
+    Perfilador por amostragem: em intervalos regulares, captura a pilha das threads
+    que estão dentro de Server.accept_connections ou ClientHandler.handle e agrega
+    as pilhas idênticas. Ao terminar, grava o resultado no formato de pilhas
+    agregadas ("folded"/collapsed: uma pilha por linha, quadros separados por ";"
+    e a contagem no fim), aceito por flamegraph.pl, speedscope e similares.
+
+    Enquanto desligado não existe nenhuma thread nem gancho ativo, então o custo é zero.
+
+    Parâmetros:
+        server: instância de Server perfilada.
+        caminho: arquivo de saída.
+        duracao: tempo máximo de amostragem em segundos.
+        frequencia: amostras por segundo.
+    """
+    def __init__(self, server, caminho, duracao, frequencia):
+        super(PerfiladorAmostragem, self).__init__(daemon=True)
+        self.server = server
+        self.caminho = caminho
+        self.duracao = duracao
+        self.intervalo = 1.0 / frequencia
+        self.parado = threading.Event()
+        self.contagens = collections.Counter()
+        self.amostras = 0
+
+    def run(self):
+        alvos = {Server.accept_connections.__code__, ClientHandler.handle.__code__}
+        fim = time.monotonic() + self.duracao
+        while not self.parado.is_set() and time.monotonic() < fim:
+            nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                quadros = []
+                relevante = False
+                while frame is not None:
+                    codigo = frame.f_code
+                    relevante = relevante or codigo in alvos
+                    quadros.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                if relevante:
+                    quadros.append(nomes.get(ident, str(ident)))
+                    self.contagens[";".join(reversed(quadros))] += 1
+            self.amostras += 1
+            self.parado.wait(self.intervalo)
+        self.gravar()
+
+    def gravar(self):
+        """
+        Grava as pilhas agregadas no arquivo de saída.
+        """
+        with open(self.caminho, "w", encoding="utf-8") as arquivo:
+            for pilha, contagem in self.contagens.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+        self.server.log_callback(f"Perfil gravado em {self.caminho} ({self.amostras} amostras).")
+
+    def parar(self):
+        """
+        Interrompe a amostragem antes do fim da janela.
+        """
+        self.parado.set()
+
+class TrabalhadoresLocais(threading.Thread):
+    """
+    Thread que usa os núcleos do próprio servidor para calcular blocos do
+    trabalho quando há poucos clientes conectados.
+
+    Os blocos saem do mesmo alocador dos clientes (Trabalho.proximo_bloco) e são
+    calculados por um pool de processos com os mesmos kernels. Com n clientes
+    sendo atendidos, até min(processos, limiar - n) blocos locais ficam em
+    andamento: perto do limiar, cada cliente que chega tira uma vaga dos
+    processos locais, que voltam a pegar blocos quando os clientes vão embora.
+    Os blocos que já estão no pool terminam normalmente.
+
+    Parâmetros:
+        server: instância de Server cujo trabalho é calculado.
+        processos: tamanho do pool de processos.
+        limiar: número de clientes atendidos a partir do qual nenhum bloco novo
+            é calculado localmente; padrão é processos.
+        intervalo: segundos entre reavaliações da demanda.
+    """
+    def __init__(self, server, processos, limiar=None, intervalo=0.1):
+        super(TrabalhadoresLocais, self).__init__(daemon=True)
+        self.server = server
+        self.trabalho = server.trabalho
+        self.processos = processos
+        self.limiar = processos if limiar is None else limiar
+        self.intervalo = intervalo
+        self.em_andamento = 0
+        self.concluidos = 0
+        self.lock = threading.Lock()
+        self.acordar = threading.Event()
+        self.parado = threading.Event()
+
+    def vagas(self):
+        """
+        Retorna quantos blocos locais ainda podem ser iniciados agora.
+        """
+        with self.server.lock:
+            remotos = self.server.handlers_ativos
+        alvo = min(self.processos, self.limiar - remotos)
+        with self.lock:
+            return max(0, alvo - self.em_andamento)
+
+    def run(self):
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.processos)
+        try:
+            while not self.parado.is_set() and not self.trabalho.terminado.is_set():
+                for _ in range(self.vagas()):
+                    bloco = self.trabalho.proximo_bloco()
+                    if bloco is None:
+                        break
+                    with self.lock:
+                        self.em_andamento += 1
+                    future = pool.submit(tarefas.executar_atribuicao, tarefas.montar_atribuicao(self.trabalho, bloco))
+                    future.add_done_callback(lambda future, bloco=bloco: self.bloco_calculado(bloco, future))
+                self.acordar.wait(self.intervalo)
+                self.acordar.clear()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def bloco_calculado(self, bloco, future):
+        """
+        Entrega ao trabalho o resultado de um bloco calculado localmente, ou o
+        devolve à fila se o cálculo falhou ou foi cancelado.
+        """
+        resposta = None
+        if not future.cancelled() and future.exception() is None:
+            resposta, _ = future.result()
+        try:
+            if resposta is None or "erro" in resposta:
+                self.trabalho.devolver(bloco)
+                if resposta:
+                    self.server.log_callback(f"Falha no cálculo local do bloco {bloco['indice']}: {resposta['erro']}")
+            else:
+                situacao = self.trabalho.concluir(bloco, resposta["resultado"])
+                if situacao != tarefas.CONCLUSAO_ACEITA:
+                    self.server.log_callback(f"Resultado local do bloco {bloco['indice']} ignorado ({situacao}).")
+                    return
+                with self.lock:
+                    self.concluidos += 1
+                with self.server.lock:
+                    self.server.termos_concluidos += bloco["fim"] - bloco["inicio"]
+                self.server.log_callback(f"Bloco {bloco['indice']} [{bloco['inicio']}, {bloco['fim']}) concluído localmente.")
+        except ValueError as e:
+            self.trabalho.devolver(bloco)
+            self.server.log_callback(f"Resultado local inválido para o bloco {bloco['indice']}: {e}")
+        finally:
+            with self.lock:
+                self.em_andamento -= 1
+            self.acordar.set()
+
+    def estado(self):
+        """
+        Retorna os blocos locais em andamento e concluídos.
+        """
+        with self.lock:
+            return {"processos": self.processos, "em_andamento": self.em_andamento, "concluidos": self.concluidos}
+
+    def parar(self):
+        """
+        Para de pegar blocos e cancela os que ainda não começaram.
+        """
+        self.parado.set()
+        self.acordar.set()
+
+class MonitorRecursos(threading.Thread):
+    """
+    Thread que grava periodicamente as métricas do servidor em um arquivo
+    JSON lines (uma amostra por linha, com o instante em "t").
+
+    Parâmetros:
+        server: instância de Server a ser monitorada.
+        caminho: arquivo de saída.
+        intervalo: segundos entre amostras.
+    """
+    def __init__(self, server, caminho, intervalo):
+        super(MonitorRecursos, self).__init__(daemon=True)
+        self.server = server
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.parado = threading.Event()
+
+    def run(self):
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            while not self.parado.is_set():
+                amostra = {"t": time.time()}
+                amostra.update(self.server.metricas())
+                arquivo.write(json.dumps(amostra) + "\n")
+                arquivo.flush()
+                self.parado.wait(self.intervalo)
+
+    def parar(self):
+        """
+        Interrompe a amostragem.
+        """
+        self.parado.set()
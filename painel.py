@@ -0,0 +1,146 @@
+import collections
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# Pontos mantidos em cada gráfico: dois minutos com uma amostra por segundo
+PONTOS_PADRAO = 120
+
+class GraficoLinha(QtWidgets.QWidget):
+    """
+    Gráfico de linhas mínimo, desenhado direto com QPainter, com os últimos
+    pontos de uma ou mais séries. O custo de desenhar não depende da carga do
+    servidor, só do número de pontos.
+
+    Parâmetros:
+        titulo: texto exibido no canto do gráfico.
+        series: nomes das séries (uma linha e uma cor por série).
+        formato: formato do último valor de cada série exibido no título.
+        pontos: número de amostras mantidas.
+    """
+    CORES = (QtGui.QColor(31, 119, 180), QtGui.QColor(214, 39, 40), QtGui.QColor(44, 160, 44))
+
+    def __init__(self, titulo, series=("",), formato="{:.0f}", pontos=PONTOS_PADRAO, parent=None):
+        super(GraficoLinha, self).__init__(parent)
+        self.titulo = titulo
+        self.formato = formato
+        self.pontos = pontos
+        self.series = collections.OrderedDict((serie, collections.deque(maxlen=pontos)) for serie in series)
+        self.setMinimumSize(150, 80)
+
+    def adicionar(self, *valores):
+        """
+        Acrescenta uma amostra a cada série (None deixa um buraco na linha) e
+        agenda o redesenho.
+        """
+        for valores_serie, valor in zip(self.series.values(), valores):
+            valores_serie.append(valor)
+        self.update()
+
+    def limpar(self):
+        """
+        Descarta todas as amostras.
+        """
+        for valores_serie in self.series.values():
+            valores_serie.clear()
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        area = self.rect().adjusted(4, 18, -4, -4)
+        painter.fillRect(self.rect(), QtGui.QColor(250, 250, 250))
+        painter.setPen(QtGui.QColor(200, 200, 200))
+        painter.drawRect(area)
+
+        validos = [valor for valores_serie in self.series.values() for valor in valores_serie if valor is not None]
+        maximo = max(validos) if validos else 0
+        maximo = maximo if maximo > 0 else 1
+
+        legenda = []
+        for (serie, valores_serie), cor in zip(self.series.items(), self.CORES):
+            ultimo = valores_serie[-1] if valores_serie else None
+            texto = self.formato.format(ultimo) if ultimo is not None else "-"
+            legenda.append(f"{serie} {texto}".strip())
+            painter.setPen(QtGui.QPen(cor, 1.5))
+            passo = area.width() / max(1, self.pontos - 1)
+            deslocamento = self.pontos - len(valores_serie)
+            linha = QtGui.QPolygonF()
+            for i, valor in enumerate(valores_serie):
+                if valor is None:
+                    painter.drawPolyline(linha)
+                    linha = QtGui.QPolygonF()
+                    continue
+                x = area.left() + (deslocamento + i) * passo
+                y = area.bottom() - valor / maximo * area.height()
+                linha.append(QtCore.QPointF(x, y))
+            painter.drawPolyline(linha)
+
+        fonte = painter.font()
+        fonte.setPointSizeF(fonte.pointSizeF() * 0.8)
+        painter.setFont(fonte)
+        painter.setPen(QtGui.QColor(60, 60, 60))
+        painter.drawText(4, 13, f"{self.titulo}: {'  '.join(legenda)}")
+        painter.setPen(QtGui.QColor(150, 150, 150))
+        painter.drawText(area.adjusted(2, 1, -2, 0), QtCore.Qt.AlignRight | QtCore.Qt.AlignTop, self.formato.format(maximo))
+        painter.end()
+
+class PainelMetricas:
+    """
+    Monta os gráficos do painel de vazão dentro de um widget da interface e os
+    atualiza a partir de retratos de Server.contadores().
+
+    As taxas são calculadas pela diferença entre dois retratos consecutivos,
+    então o painel custa o mesmo com 1 ou 100 mil clientes.
+
+    Parâmetros:
+        container: widget (ex.: QGroupBox do server.ui) que recebe os gráficos.
+
+    Métodos:
+        atualizar(contadores): Acrescenta uma amostra a cada gráfico.
+        limpar(): Descarta as amostras (ex.: ao reiniciar o servidor).
+    """
+    def __init__(self, container):
+        self.conexoes = GraficoLinha("Conexões/s")
+        self.handlers = GraficoLinha("Handlers ativos")
+        self.negacoes = GraficoLinha("Negações/s")
+        self.termos = GraficoLinha("Termos concluídos/s", formato="{:.3g}")
+        self.latencia = GraficoLinha("Latência dos handlers (ms)", ("p50", "p99"), formato="{:.1f}")
+        layout = QtWidgets.QGridLayout(container)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.conexoes, 0, 0)
+        layout.addWidget(self.handlers, 0, 1)
+        layout.addWidget(self.negacoes, 0, 2)
+        layout.addWidget(self.termos, 1, 0)
+        layout.addWidget(self.latencia, 1, 1, 1, 2)
+        self.anterior = None
+
+    def atualizar(self, contadores):
+        """
+        Acrescenta uma amostra a cada gráfico.
+
+        Parâmetros:
+            contadores: dicionário retornado por Server.contadores().
+        """
+        anterior, self.anterior = self.anterior, contadores
+        if anterior is None:
+            return
+        decorrido = contadores["instante"] - anterior["instante"]
+        if decorrido <= 0:
+            return
+
+        def taxa(chave):
+            return (contadores[chave] - anterior[chave]) / decorrido
+
+        self.conexoes.adicionar(taxa("conexoes_aceitas"))
+        self.handlers.adicionar(contadores["handlers_ativos"])
+        self.negacoes.adicionar(taxa("negacoes"))
+        self.termos.adicionar(taxa("termos_concluidos"))
+        p50, p99 = contadores["latencia_p50"], contadores["latencia_p99"]
+        self.latencia.adicionar(p50 * 1000 if p50 is not None else None, p99 * 1000 if p99 is not None else None)
+
+    def limpar(self):
+        """
+        Descarta as amostras de todos os gráficos.
+        """
+        self.anterior = None
+        for grafico in (self.conexoes, self.handlers, self.negacoes, self.termos, self.latencia):
+            grafico.limpar()
@@ -0,0 +1,167 @@
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+
+PREFIXO_TRACE = "Trace:"
+
+class Rastreador:
+    """
+    Registra spans (trechos cronometrados) de requisições em um arquivo JSON lines,
+    um span por linha, para que cliente e servidor possam ser correlacionados pelo
+    trace_id.
+
+    Cada linha tem: trace_id, lado ("servidor" ou "cliente"), span, inicio_ns
+    (relógio de parede, time.time_ns), duracao_ns (time.perf_counter_ns) e
+    atributos opcionais.
+
+    Parâmetros:
+        caminho: arquivo de saída; None desativa o rastreamento.
+        lado: identifica quem grava os spans.
+        taxa_amostragem: fração das requisições que recebem trace_id (0 a 1).
+
+    Métodos:
+        novo_trace_id(): Gera um trace_id, ou None se a requisição não for amostrada.
+        registrar(trace_id, span, inicio_ns, duracao_ns, **atributos): Grava um span.
+        fechar(): Fecha o arquivo de saída.
+    """
+    def __init__(self, caminho=None, lado="servidor", taxa_amostragem=1.0):
+        self.lado = lado
+        self.taxa_amostragem = taxa_amostragem
+        self.arquivo = open(caminho, "a", encoding="utf-8") if caminho else None
+        self.lock = threading.Lock()
+
+    def novo_trace_id(self):
+        """
+        Gera um trace_id de 64 bits em hexadecimal, respeitando a taxa de amostragem.
+
+        Retorna:
+            O trace_id, ou None se o rastreamento estiver desativado ou a
+            requisição não tiver sido amostrada.
+        """
+        if self.arquivo is None or random.random() >= self.taxa_amostragem:
+            return None
+        return f"{random.getrandbits(64):016x}"
+
+    def registrar(self, trace_id, span, inicio_ns, duracao_ns, **atributos):
+        """
+        Grava um span. Não faz nada se trace_id for None.
+
+        Parâmetros:
+            trace_id: identificador da requisição.
+            span: nome do trecho (ex.: "atribuicao", "calculo").
+            inicio_ns: início em nanossegundos de relógio de parede (time.time_ns).
+            duracao_ns: duração em nanossegundos.
+            atributos: campos extras (ex.: endereco).
+        """
+        if trace_id is None or self.arquivo is None:
+            return
+        registro = {"trace_id": trace_id, "lado": self.lado, "span": span, "inicio_ns": inicio_ns, "duracao_ns": duracao_ns}
+        registro.update(atributos)
+        linha = json.dumps(registro) + "\n"
+        with self.lock:
+            # fechar() pode ter rodado em outra thread depois da verificação acima
+            if self.arquivo is None:
+                return
+            self.arquivo.write(linha)
+
+    def fechar(self):
+        """
+        Grava o que estiver em buffer e fecha o arquivo de saída.
+        """
+        with self.lock:
+            if self.arquivo:
+                self.arquivo.close()
+                self.arquivo = None
+
+class Cronometro:
+    """
+    Marca o início de um span nos dois relógios usados pelo Rastreador.
+    """
+    def __init__(self):
+        self.inicio_ns = time.time_ns()
+        self.marca = time.perf_counter_ns()
+
+    def decorrido(self):
+        return time.perf_counter_ns() - self.marca
+
+def extrair_trace_id(texto):
+    """
+    Procura a linha "Trace: <id>" ecoada pelo cliente junto com os resultados.
+
+    Retorna:
+        O trace_id ou None.
+    """
+    for linha in texto.splitlines():
+        if linha.startswith(PREFIXO_TRACE):
+            return linha[len(PREFIXO_TRACE):].strip() or None
+    return None
+
+def carregar_spans(caminhos):
+    """
+    Lê os spans de vários arquivos e os agrupa por trace_id.
+
+    Retorna:
+        Dicionário {trace_id: [spans]}.
+    """
+    traces = collections.defaultdict(list)
+    for caminho in caminhos:
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                linha = linha.strip()
+                if linha:
+                    span = json.loads(linha)
+                    traces[span["trace_id"]].append(span)
+    return traces
+
+def resumir(traces, mais_lentos=10):
+    """
+    Junta os spans de cliente e servidor e calcula estatísticas por span e os
+    traces mais lentos de ponta a ponta.
+
+    Retorna:
+        Dicionário com o número de traces, quantos têm os dois lados, estatísticas
+        (média, p50, p99, máximo em ms) por lado/span e os traces mais lentos.
+    """
+    por_span = collections.defaultdict(list)
+    completos = 0
+    ponta_a_ponta = []
+    for trace_id, spans in traces.items():
+        lados = {span["lado"] for span in spans}
+        if {"cliente", "servidor"} <= lados:
+            completos += 1
+        for span in spans:
+            por_span[f"{span['lado']}.{span['span']}"].append(span["duracao_ns"] / 1e6)
+        inicio = min(span["inicio_ns"] for span in spans)
+        fim = max(span["inicio_ns"] + span["duracao_ns"] for span in spans)
+        ponta_a_ponta.append(((fim - inicio) / 1e6, trace_id))
+
+    estatisticas = {}
+    for nome, duracoes in sorted(por_span.items()):
+        duracoes.sort()
+        estatisticas[nome] = {
+            "amostras": len(duracoes),
+            "media_ms": sum(duracoes) / len(duracoes),
+            "p50_ms": duracoes[len(duracoes) // 2],
+            "p99_ms": duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.99))],
+            "max_ms": duracoes[-1],
+        }
+    ponta_a_ponta.sort(reverse=True)
+    lentos = []
+    for duracao, trace_id in ponta_a_ponta[:mais_lentos]:
+        spans = sorted(traces[trace_id], key=lambda span: span["inicio_ns"])
+        lentos.append({
+            "trace_id": trace_id,
+            "duracao_ms": duracao,
+            "spans": [(f"{span['lado']}.{span['span']}", span["duracao_ns"] / 1e6) for span in spans],
+        })
+    return {"traces": len(traces), "traces_completos": completos, "spans": estatisticas, "mais_lentos": lentos}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Junta arquivos de trace do servidor e dos clientes e resume os spans.")
+    parser.add_argument("arquivos", nargs="+", help="arquivos JSON lines gravados pelo Rastreador")
+    parser.add_argument("--mais-lentos", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(resumir(carregar_spans(args.arquivos), args.mais_lentos), indent=2, ensure_ascii=False))
@@ -1,188 +1,11 @@
-import multiprocessing
-import socket
+import os
+import signal
 import sys
 import threading
-import time
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5 import QtCore
-from PyQt5.uic import loadUi
-import random
-import concurrent.futures
-import netifaces
-
-intervalos_utilizados = set()
-
-class ClientHandler:
-    """
-    Classe para lidar com clientes conectados ao servidor.
-
-    Parâmetros:
-        client_socket: socket do cliente conectado.
-        intervalo: intervalo atribuído ao cliente para cálculos.
-        log_callback: função de callback para registrar mensagens de log.
-        connection_log_callback: função de callback para registrar conexões.
-
-    Métodos:
-        decode_server_message(socket): Decodifica mensagens recebidas do cliente.
-        handle(client_address): Manipula a conexão com o cliente.
-    """
-    def __init__(self, client_socket, intervalo, log_callback, connection_log_callback):
-        self.client_socket = client_socket
-        self.intervalo = intervalo
-        self.log_callback = log_callback
-        self.connection_log_callback = connection_log_callback
-
-    def decode_server_message(self, socket):
-        """
-        Decodifica mensagens recebidas do cliente.
-
-        Parâmetros:
-            socket: socket do cliente.
-
-        Retorna:
-            Mensagem decodificada.
-        """
-        return socket.recv(1024).decode().strip()
-    
-    def handle(self, client_address):
-        """
-        Manipula a conexão com o cliente.
-
-        Parâmetros:
-            client_address: tupla contendo o endereço IP e a porta do cliente.
-        """
-        a, b = self.intervalo
-
-        # Registra o endereço do cliente na GUI do servidor
-        self.log_callback(f"Nova conexão de: {client_address[0]}:{client_address[1]}")
-
-        # Recebe os resultados dos cálculos do cliente
-        resultados = []
-        while True:
-            resultado = self.decode_server_message(self.client_socket)
-            if not resultado:
-                break
-            resultados.append(resultado)
-            # Envia uma confirmação de volta para o cliente
-            self.client_socket.sendall(b"200 - Sever received the data\n")
-        # Imprime os resultados recebidos
-        self.log_callback(f"\nResultados recebidos do cliente {client_address[0]}:{client_address[1]}:")
-        for resultado in resultados:
-            self.log_callback(resultado)
-        self.log_callback("\n")
-
-        # Fecha a conexão com o cliente
-        self.client_socket.close()
-
-class Server:
-    """
-    Classe que representa o servidor.
-
-    Parâmetros:
-        host: endereço IP do servidor.
-        port: porta do servidor.
-        max_connections: número máximo de conexões permitidas.
-        log_callback: função de callback para registrar mensagens de log.
-        connection_log_callback: função de callback para registrar conexões.
-
-    Métodos:
-        accept_connections(): Aceita conexões de clientes.
-        start(): Inicia o servidor.
-        stop(): Para o servidor.
-        gerar_intervalo_unico(): Gera um intervalo único para um cliente.
-    """
-    def __init__(self, host, port, max_connections, log_callback, connection_log_callback):
-        self.host = host
-        self.port = port
-        self.max_connections = max_connections
-        self.log_callback = log_callback
-        self.connection_log_callback = connection_log_callback
-        self.server_socket = None
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count())
-        self.running = True
-        self.connections_count = 0
-        self.lock = threading.Lock()
-
-    def accept_connections(self):
-        """
-        Aceita conexões de clientes.
-        """
-        while self.running:
-            with self.lock:
-                if self.connections_count >= self.max_connections:
-                    self.log_callback("Número máximo de conexões atingido. Negando nova conexão.")
-                    client_socket, _ = self.server_socket.accept()
-                    client_socket.send("Conexão negada: número máximo de conexões atingido.\n".encode())
-                    client_socket.close()
-                    continue
-
-            client_socket, address = self.server_socket.accept()
-    
-            with self.lock:
-                self.connections_count += 1
-            print(self.connections_count)
-            intervalo = self.gerar_intervalo_unico()
-            client_socket.send(f"{intervalo[0]} {intervalo[1]}\n".encode())
-
-            client_handler = ClientHandler(client_socket, intervalo, self.log_callback, self.connection_log_callback)
-            self.executor.submit(client_handler.handle, address)
-            self.connection_log_callback(address)
-
-    def start(self):
-        """
-        Inicia o servidor.
-        """
-        while self.running:
-            try:
-                self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.server_socket.bind((self.host, self.port))
-                self.server_socket.listen()
-
-                self.log_callback(f"Servidor escutando em {self.host}:{self.port}. Aguardando conexões...")
-
-                self.accept_connections()
-
-            except Exception as e:
-                if isinstance(e, RuntimeError) and "cannot schedule new futures after shutdown" in str(e):
-                    self.log_callback("Erro no servidor: O servidor foi encerrado e não aceita mais conexões.")
-                    break
-                elif isinstance(e, OSError) and e.errno == 98:
-                    self.log_callback("Endereço e porta já estão em uso. Tentando novamente em alguns segundos...")
-                    time.sleep(5)
-                    continue
-                else:
-                    self.log_callback(f"Erro no servidor: {e}")
-                    break
-            finally:
-                if self.server_socket:
-                    self.server_socket.close()
-
-        self.log_callback("Servidor parou.")
-
-    def stop(self):
-        """
-        Para o servidor.
-        """
-        if self.server_socket:
-            self.server_socket.close()
-        self.executor.shutdown(wait=False)  # Usamos wait=False para evitar bloqueio
-        self.running = False
-        self.log_callback("Servidor parando.....")
-
-    def gerar_intervalo_unico(self):
-        """
-        Gera um intervalo único para um cliente.
-
-        Retorna:
-            Intervalo único.
-        """
-        while True:
-            segundo_valor = random.randint(1, 1000000)
-            intervalo = (0, segundo_valor)
-            if intervalo not in intervalos_utilizados:
-                intervalos_utilizados.add(intervalo)
-                return intervalo
+from interface import carregar_interface
+from painel import PainelMetricas
 
 class ServerWindow(QMainWindow):
     """
@@ -190,12 +13,21 @@ class ServerWindow(QMainWindow):
     """
     def __init__(self):
         super(ServerWindow, self).__init__()
-        loadUi("server.ui", self)
+        carregar_interface(self, "server")
 
         self.startServer.clicked.connect(self.iniciar_servidor)
         self.clearLogs.clicked.connect(self.limpar_logs)
         self.stopServer.clicked.connect(self.parar_servidor)
+        self.profileServer.clicked.connect(self.alternar_perfil)
+        self.logsAtivos.toggled.connect(self.alternar_logs)
         self.server = None
+        self.logs_ativos = self.logsAtivos.isChecked()
+
+        # O painel lê um retrato dos contadores do servidor por segundo, qualquer que seja a carga
+        self.painel = PainelMetricas(self.painelMetricas)
+        self.timer_painel = QtCore.QTimer(self)
+        self.timer_painel.timeout.connect(self.atualizar_painel)
+        self.timer_painel.start(1000)
 
     def get_local_ip(self):
         """
@@ -204,6 +36,8 @@ class ServerWindow(QMainWindow):
         Retorna:
             Endereço IP da máquina na rede local.
         """
+        import netifaces
+
         interfaces = netifaces.interfaces()
         for interface in interfaces:
             addresses = netifaces.ifaddresses(interface)
@@ -219,12 +53,49 @@ class ServerWindow(QMainWindow):
         Inicia o servidor.
         """
         if not self.server:
+            # O núcleo do servidor (executor, tarefas, rastreamento) só é carregado ao iniciar, não ao abrir a janela
+            from gravacao_trafego import GravadorTrafego
+            from nucleo_servidor import Server
+            from rastreamento import Rastreador
+            import tarefas
+
             HOST = self.get_local_ip()
             if HOST:
                 print("Endereço IP da máquina na rede local:", HOST)
             PORTA = 12345
             max_connections = self.maxConnectionsSpinBox.value()
-            self.server = Server(HOST, PORTA, max_connections, self.update_log_info, self.update_connection_log_info)
+            # Defina SERVIDOR_ARQUIVO_METRICAS para gravar as métricas de recursos (ex.: em testes de soak)
+            arquivo_metricas = os.environ.get("SERVIDOR_ARQUIVO_METRICAS")
+            # Defina SERVIDOR_ARQUIVO_TRACE (e opcionalmente SERVIDOR_AMOSTRAGEM_TRACE, de 0 a 1) para rastrear os intervalos
+            rastreador = Rastreador(os.environ.get("SERVIDOR_ARQUIVO_TRACE"), "servidor", float(os.environ.get("SERVIDOR_AMOSTRAGEM_TRACE", "1")))
+            # Defina SERVIDOR_TAREFA (JSON ou arquivo JSON, ver tarefas.criar_trabalho) para distribuir uma tarefa em blocos
+            especificacao = os.environ.get("SERVIDOR_TAREFA")
+            trabalho = tarefas.criar_trabalho(especificacao, log_callback=self.update_log_info) if especificacao else None
+            # Ou defina SERVIDOR_COORDENADOR (host:porta, ver federacao.py) para dividir com outros servidores um trabalho do coordenador
+            coordenador = os.environ.get("SERVIDOR_COORDENADOR")
+            if coordenador:
+                from federacao import TrabalhoFederado
+
+                trabalho = TrabalhoFederado(coordenador, log_callback=self.update_log_info)
+            # Defina SERVIDOR_PROCESSOS_LOCAIS para que o servidor também calcule blocos da tarefa quando houver poucos clientes
+            processos_locais = int(os.environ.get("SERVIDOR_PROCESSOS_LOCAIS", "0"))
+            # Defina SERVIDOR_TAXA_POR_IP (conexões/s, com rajada opcional em SERVIDOR_RAJADA_POR_IP) e/ou
+            # SERVIDOR_CONEXOES_POR_IP para limitar cada host de origem
+            taxa_por_ip = os.environ.get("SERVIDOR_TAXA_POR_IP")
+            rajada_por_ip = os.environ.get("SERVIDOR_RAJADA_POR_IP")
+            conexoes_por_ip = os.environ.get("SERVIDOR_CONEXOES_POR_IP")
+            # Defina SERVIDOR_ARQUIVO_TRAFEGO para gravar a forma do tráfego (ver stress-tests/reproducao_trafego.py)
+            gravador_trafego = GravadorTrafego(os.environ.get("SERVIDOR_ARQUIVO_TRAFEGO"))
+            # Defina SERVIDOR_IDADE_RETARDATARIO (segundos) para cancelar blocos lentos e redistribuir o restante
+            idade_retardatario = os.environ.get("SERVIDOR_IDADE_RETARDATARIO")
+            self.server = Server(HOST, PORTA, max_connections, self.update_log_info, self.update_connection_log_info, arquivo_metricas,
+                                 rastreador=rastreador, trabalho=trabalho, processos_locais=processos_locais,
+                                 taxa_por_ip=float(taxa_por_ip) if taxa_por_ip else None,
+                                 rajada_por_ip=float(rajada_por_ip) if rajada_por_ip else None,
+                                 conexoes_por_ip=int(conexoes_por_ip) if conexoes_por_ip else None,
+                                 gravador_trafego=gravador_trafego,
+                                 idade_retardatario=float(idade_retardatario) if idade_retardatario else None)
+            self.painel.limpar()
             threading.Thread(target=self.server.start).start()
 
     def parar_servidor(self):
@@ -235,6 +106,29 @@ class ServerWindow(QMainWindow):
             self.server.stop()
             self.server = None
 
+    def alternar_perfil(self):
+        """
+        Liga ou desliga o perfilador do servidor em execução.
+        """
+        if self.server:
+            self.server.alternar_perfil()
+
+    def atualizar_painel(self):
+        """
+        Acrescenta ao painel uma amostra dos contadores do servidor em execução.
+        """
+        if self.server:
+            self.painel.atualizar(self.server.contadores())
+
+    def alternar_logs(self, ativos):
+        """
+        Liga ou desliga os logs de texto da interface.
+
+        Parâmetros:
+            ativos: True para exibir as mensagens de log e de conexão.
+        """
+        self.logs_ativos = ativos
+
     def limpar_logs(self):
         """
         Limpa os logs na interface gráfica.
@@ -249,6 +143,8 @@ class ServerWindow(QMainWindow):
         Parâmetros:
             message: mensagem de log a ser exibida.
         """
+        if not self.logs_ativos:
+            return
         QtCore.QMetaObject.invokeMethod(self.logInfo, "append", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, message))
 
     def update_connection_log_info(self, address):
@@ -258,6 +154,8 @@ class ServerWindow(QMainWindow):
         Parâmetros:
             address: tupla contendo o endereço IP e a porta do cliente.
         """
+        if not self.logs_ativos:
+            return
         QtCore.QMetaObject.invokeMethod(self.clientConnect, "append", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, f"Nova conexão de: {address[0]}:{address[1]}"))
 
     def closeEvent(self, event):
@@ -275,5 +173,12 @@ class ServerWindow(QMainWindow):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = ServerWindow()
+    # "kill -USR1 <pid>" liga/desliga o perfilador sem passar pela interface
+    signal.signal(signal.SIGUSR1, lambda signum, frame: window.alternar_perfil())
+    # O tratador só roda quando o interpretador retoma o controle; enquanto
+    # app.exec_() espera eventos, este timer devolve o controle a cada 250 ms
+    timer_sinais = QtCore.QTimer()
+    timer_sinais.timeout.connect(lambda: None)
+    timer_sinais.start(250)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,160 @@
+import array
+import json
+import math
+import os
+import sys
+import time
+
+STATUS_SUCESSO = 0
+STATUS_NEGADO = 1
+STATUS_FALHA = 2
+
+# Fases gravadas em colunas próprias (mesmos nomes de motor_async.FASES e dos kernels)
+FASES_CAPTURADAS = (
+    "espera", "dns", "conexao", "primeiro_byte", "calculo",
+    "calculo_soma_pares", "calculo_soma_impares", "calculo_pi", "envio", "ack",
+)
+
+# (coluna, código do módulo array, dtype NumPy sem a ordem dos bytes)
+COLUNAS = (
+    ("inicio", "d", "f8"),
+    ("status", "B", "u1"),
+    ("conexao", "d", "f8"),
+    ("resposta", "d", "f8"),
+    ("total", "d", "f8"),
+) + tuple((f"fase_{fase}", "q", "i8") for fase in FASES_CAPTURADAS)
+
+class GravadorAmostras:
+    """
+    Grava cada amostra de requisição em disco, em formato colunar: um arquivo
+    binário de largura fixa por coluna (<coluna>.bin) e um meta.json com os
+    dtypes e o número de amostras. Os arquivos podem ser abertos sem cópia com
+    numpy.memmap (ver carregar_captura), então nem o gerador nem o relatório
+    precisam manter todas as amostras na memória.
+
+    Usa apenas a biblioteca padrão, para que o gerador de carga não dependa de NumPy.
+
+    Parâmetros:
+        pasta (str): Diretório da captura (criado se não existir).
+        tamanho_buffer (int): Amostras acumuladas antes de cada escrita em disco.
+    """
+    def __init__(self, pasta, tamanho_buffer=4096):
+        os.makedirs(pasta, exist_ok=True)
+        self.pasta = pasta
+        self.tamanho_buffer = tamanho_buffer
+        self.base = time.perf_counter()
+        self.inicio_parede = time.time()
+        self.total = 0
+        self.buffers = {nome: array.array(codigo) for nome, codigo, _ in COLUNAS}
+        self.arquivos = {nome: open(os.path.join(pasta, f"{nome}.bin"), "wb") for nome, _, _ in COLUNAS}
+
+    def gravar(self, status, connection_time=math.nan, response_time=math.nan, total_time=math.nan, fases=None):
+        """
+        Acrescenta uma amostra.
+
+        Parâmetros:
+            status (int): STATUS_SUCESSO, STATUS_NEGADO ou STATUS_FALHA.
+            connection_time (float): Tempo de conexão em segundos.
+            response_time (float): Tempo de resposta em segundos.
+            total_time (float): Tempo total em segundos.
+            fases (dict): Duração de cada fase em nanossegundos (-1 quando ausente).
+        """
+        agora = time.perf_counter() - self.base
+        buffers = self.buffers
+        buffers["inicio"].append(agora - total_time if total_time == total_time else agora)
+        buffers["status"].append(status)
+        buffers["conexao"].append(connection_time)
+        buffers["resposta"].append(response_time)
+        buffers["total"].append(total_time)
+        fases = fases or {}
+        for fase in FASES_CAPTURADAS:
+            buffers[f"fase_{fase}"].append(fases.get(fase, -1))
+        self.total += 1
+        if len(buffers["status"]) >= self.tamanho_buffer:
+            self.descarregar()
+
+    def descarregar(self):
+        """
+        Escreve as amostras em buffer nos arquivos de coluna.
+        """
+        for nome, buffer in self.buffers.items():
+            buffer.tofile(self.arquivos[nome])
+            del buffer[:]
+
+    def fechar(self, **metadados):
+        """
+        Descarrega o buffer, fecha os arquivos e grava meta.json.
+
+        Parâmetros:
+            metadados: informações extras da execução (ex.: num_clientes, cenario).
+        """
+        self.descarregar()
+        for arquivo in self.arquivos.values():
+            arquivo.close()
+        ordem = "<" if sys.byteorder == "little" else ">"
+        meta = {
+            "amostras": self.total,
+            "inicio": self.inicio_parede,
+            "colunas": {nome: ordem + dtype if dtype != "u1" else dtype for nome, _, dtype in COLUNAS},
+        }
+        meta.update(metadados)
+        with open(os.path.join(self.pasta, "meta.json"), "w", encoding="utf-8") as arquivo:
+            json.dump(meta, arquivo, indent=2, ensure_ascii=False)
+
+def listar_partes(pasta):
+    """
+    Retorna os diretórios de captura dentro de pasta: a própria pasta, se tiver
+    meta.json, ou suas subpastas (uma por processo gerador).
+    """
+    if os.path.exists(os.path.join(pasta, "meta.json")):
+        return [pasta]
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if os.path.exists(os.path.join(pasta, nome, "meta.json"))
+    )
+
+def carregar_captura(pasta):
+    """
+    Abre uma captura sem carregá-la na memória.
+
+    Parâmetros:
+        pasta (str): Diretório gravado por GravadorAmostras (ou com uma subpasta
+            por processo gerador).
+
+    Retorna:
+        meta (dict): O conteúdo de meta.json (amostras somadas entre as partes).
+        colunas (dict): {coluna: array NumPy}; com uma única parte, cada array é
+            um numpy.memmap somente leitura.
+    """
+    import numpy as np
+
+    partes = listar_partes(pasta)
+    if not partes:
+        raise FileNotFoundError(f"Nenhuma captura encontrada em {pasta}")
+
+    metas = []
+    por_coluna = {}
+    for parte in partes:
+        with open(os.path.join(parte, "meta.json"), encoding="utf-8") as arquivo:
+            meta = json.load(arquivo)
+        metas.append(meta)
+        for nome, dtype in meta["colunas"].items():
+            caminho = os.path.join(parte, f"{nome}.bin")
+            if meta["amostras"] and os.path.getsize(caminho):
+                coluna = np.memmap(caminho, dtype=np.dtype(dtype), mode="r", shape=(meta["amostras"],))
+            else:
+                coluna = np.empty(0, dtype=np.dtype(dtype))
+            por_coluna.setdefault(nome, []).append(coluna)
+
+    meta = dict(metas[0])
+    meta["amostras"] = sum(parte["amostras"] for parte in metas)
+    meta["partes"] = len(partes)
+    if all("num_clientes" in parte for parte in metas):
+        meta["num_clientes"] = sum(parte["num_clientes"] for parte in metas)
+    if any("duracao_s" in parte for parte in metas):
+        meta["duracao_s"] = max(parte.get("duracao_s", 0.0) for parte in metas)
+    colunas = {
+        nome: pedacos[0] if len(pedacos) == 1 else np.concatenate(pedacos)
+        for nome, pedacos in por_coluna.items()
+    }
+    return meta, colunas
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, RAIZ)
+
+JANELAS = {
+    "client": ("client", "ClientWindow"),
+    "server": ("server", "ServerWindow"),
+}
+
+# Executado em um processo novo: abre a janela e sai assim que ela está montada,
+# sem esperar a finalização do Qt
+PROGRAMA = """
+import os, sys
+sys.path.insert(0, {raiz!r})
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import {modulo}
+janela = {modulo}.{classe}()
+janela.show()
+app.processEvents()
+sys.stdout.flush()
+os._exit(0)
+"""
+
+VARIANTES = {
+    "gerado": {},
+    "loadUi": {"INTERFACE_DINAMICA": "1"},
+}
+
+def medir_inicializacao(janela, variante, repeticoes=10, plataforma="offscreen"):
+    """
+    Mede o tempo de inicialização a frio de uma janela: do início de um novo
+    interpretador Python até a janela estar montada e exibida.
+
+    Parâmetros:
+        janela (str): Chave de JANELAS.
+        variante (str): Chave de VARIANTES ("gerado" usa os módulos de
+            compilar_interfaces.py, "loadUi" interpreta o .ui).
+        repeticoes (int): Número de processos medidos.
+        plataforma (str): QT_QPA_PLATFORM dos processos; "offscreen" dispensa um display.
+
+    Retorna:
+        amostras (list): Tempo de cada inicialização em segundos.
+    """
+    modulo, classe = JANELAS[janela]
+    programa = PROGRAMA.format(raiz=RAIZ, modulo=modulo, classe=classe)
+    ambiente = dict(os.environ)
+    ambiente.pop("INTERFACE_DINAMICA", None)
+    ambiente.update(VARIANTES[variante])
+    if plataforma:
+        ambiente["QT_QPA_PLATFORM"] = plataforma
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", programa], cwd=RAIZ, env=ambiente, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        amostras.append(time.perf_counter() - inicio)
+    return amostras
+
+def garantir_modulos_gerados():
+    """
+    Gera os módulos das interfaces se algum estiver faltando.
+    """
+    import compilar_interfaces
+    from interface import modulo_gerado
+
+    for nome, _ in JANELAS.values():
+        if not os.path.exists(os.path.join(RAIZ, modulo_gerado(nome) + ".py")):
+            compilar_interfaces.compilar(os.path.join(RAIZ, f"{nome}.ui"))
+
+def executar(janelas=tuple(JANELAS), repeticoes=10, plataforma="offscreen"):
+    """
+    Mede todas as combinações de janela e variante, intercalando as variantes
+    para que ruído da máquina afete as duas igualmente.
+
+    Retorna:
+        Dicionário {janela: {variante: {min, mediana, max}}} em segundos.
+    """
+    garantir_modulos_gerados()
+    resultados = {}
+    for janela in janelas:
+        # Um processo descartado de cada variante aquece o cache de disco
+        for variante in VARIANTES:
+            medir_inicializacao(janela, variante, 1, plataforma)
+        amostras = {variante: [] for variante in VARIANTES}
+        for _ in range(repeticoes):
+            for variante in VARIANTES:
+                amostras[variante] += medir_inicializacao(janela, variante, 1, plataforma)
+        resultados[janela] = {
+            variante: {"min": min(valores), "mediana": statistics.median(valores), "max": max(valores)}
+            for variante, valores in amostras.items()
+        }
+        for variante, resumo in resultados[janela].items():
+            print(f"{janela:8s} {variante:8s} mediana {resumo['mediana'] * 1000:8.1f} ms  min {resumo['min'] * 1000:8.1f} ms")
+        razao = resultados[janela]["loadUi"]["mediana"] / resultados[janela]["gerado"]["mediana"]
+        print(f"{janela:8s} módulo gerado x{razao:.2f} mais rápido que loadUi")
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização a frio das janelas do cliente e do servidor.")
+    parser.add_argument("janelas", nargs="*", help=f"janelas medidas, entre {', '.join(JANELAS)} (padrão: todas)")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--plataforma", default="offscreen", help="QT_QPA_PLATFORM dos processos medidos (vazio usa o display atual)")
+    parser.add_argument("--salvar", help="grava o resultado neste arquivo JSON")
+    args = parser.parse_args()
+    desconhecidas = set(args.janelas) - set(JANELAS)
+    if desconhecidas:
+        parser.error(f"janela desconhecida: {', '.join(sorted(desconhecidas))}")
+    resultados = executar(args.janelas or list(JANELAS), args.repeticoes, args.plataforma)
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
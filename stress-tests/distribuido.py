@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import motor_async
+from amostras import GravadorAmostras
+
+TAMANHO_LOTE = 500
+
+# Segundos que um gerador espera os demais ficarem prontos antes de começar sozinho
+TEMPO_MAXIMO_PRONTOS = 60
+
+class ResultadosTransmitidos(motor_async.ResultadosCarga):
+    """
+    ResultadosCarga que envia as amostras ao processo pai em lotes, em vez de
+    acumulá-las na memória do processo gerador.
+
+    Parâmetros:
+        fila (multiprocessing.Queue): Fila de envio para o processo pai.
+        tamanho_lote (int): Número de amostras por lote enviado.
+        gravador (amostras.GravadorAmostras): Captura local deste processo; com
+            ele, os lotes levam apenas contagens e histogramas.
+    """
+    def __init__(self, fila, tamanho_lote=TAMANHO_LOTE, gravador=None):
+        super().__init__(gravador, guardar_amostras=gravador is None)
+        self.fila = fila
+        self.tamanho_lote = tamanho_lote
+
+    def registrar_sucesso(self, connection_time, response_time, total_time, fases=None):
+        super().registrar_sucesso(connection_time, response_time, total_time, fases)
+        if self.success_count >= self.tamanho_lote:
+            self.enviar_lote()
+
+    def enviar_lote(self):
+        """
+        Envia as amostras acumuladas até aqui e zera o acumulador local.
+        """
+        lote = motor_async.ResultadosCarga()
+        lote.mesclar(self)
+        self.fila.put(("lote", lote))
+        motor_async.ResultadosCarga.__init__(self, self.gravador, self.guardar_amostras)
+
+def processo_gerador(fila, host, porta, num_clientes, gerar_resultados, usar_executor, timeout, pasta_captura=None, barreira=None):
+    """
+    Função executada em cada processo gerador de carga. Ao terminar, envia ao
+    processo pai a janela (time.time de início e de fim) em que gerou carga.
+
+    Parâmetros:
+        fila (multiprocessing.Queue): Fila de envio para o processo pai.
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        num_clientes (int): A parcela de clientes deste processo.
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo); ver motor_async.cliente_async.
+        usar_executor (bool): Executa gerar_resultados em um pool de threads.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        pasta_captura (str): Diretório onde este processo grava suas amostras brutas.
+        barreira (multiprocessing.Barrier): Espera todos os geradores estarem
+            prontos antes de começar, para que a carga comece ao mesmo tempo.
+    """
+    gravador = GravadorAmostras(pasta_captura) if pasta_captura else None
+    resultados = ResultadosTransmitidos(fila, gravador=gravador)
+    janela = None
+    try:
+        if barreira is not None:
+            try:
+                barreira.wait(TEMPO_MAXIMO_PRONTOS)
+            except threading.BrokenBarrierError:
+                # Um gerador não ficou pronto; os demais começam mesmo assim
+                pass
+        inicio = time.time()
+        motor_async.executar_clientes(host, porta, num_clientes, gerar_resultados, usar_executor, timeout, resultados)
+        janela = (inicio, time.time())
+    finally:
+        duracao = resultados.duracao
+        resultados.enviar_lote()
+        if gravador is not None:
+            gravador.fechar(num_clientes=num_clientes, duracao_s=duracao)
+        fila.put(("fim", janela))
+
+def dividir_clientes(num_clientes, num_processos):
+    """
+    Divide num_clientes entre num_processos o mais igualmente possível.
+
+    Retorna:
+        parcelas (list): O número de clientes de cada processo.
+    """
+    base, resto = divmod(num_clientes, num_processos)
+    return [base + (1 if i < resto else 0) for i in range(num_processos)]
+
+def executar_distribuido(host, porta, num_clientes, gerar_resultados, num_processos=None, usar_executor=False, timeout=30, pasta_captura=None):
+    """
+    Distribui num_clientes clientes simulados entre vários processos geradores e
+    mescla as amostras recebidas em um único ResultadosCarga.
+
+    gerar_resultados precisa ser uma função de nível de módulo, para que possa
+    ser enviada aos processos filhos.
+
+    Os geradores começam juntos, depois de uma barreira, e a duração é medida
+    do início do primeiro ao fim do último, pelas janelas informadas por
+    eles: o tempo de criar os processos e importar os módulos não entra na
+    vazão.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        num_clientes (int): O número total de clientes a serem simulados.
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo); ver motor_async.cliente_async.
+        num_processos (int): Número de processos geradores; padrão é o número de núcleos.
+        usar_executor (bool): Executa gerar_resultados em um pool de threads.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        pasta_captura (str): Se informado, cada processo grava suas amostras brutas
+            em pasta_captura/processo_<i> (ver amostras.carregar_captura) e as
+            listas de tempos não são enviadas ao processo pai.
+
+    Retorna:
+        resultados (ResultadosCarga): As medições mescladas de todos os processos.
+    """
+    if num_processos is None:
+        num_processos = multiprocessing.cpu_count()
+    num_processos = max(1, min(num_processos, num_clientes))
+
+    fila = multiprocessing.Queue()
+    barreira = multiprocessing.Barrier(num_processos)
+    processos = []
+    for indice, parcela in enumerate(dividir_clientes(num_clientes, num_processos)):
+        pasta_processo = os.path.join(pasta_captura, f"processo_{indice}") if pasta_captura else None
+        processo = multiprocessing.Process(
+            target=processo_gerador,
+            args=(fila, host, porta, parcela, gerar_resultados, usar_executor, timeout, pasta_processo, barreira),
+        )
+        processo.start()
+        processos.append(processo)
+
+    resultados = motor_async.ResultadosCarga(guardar_amostras=pasta_captura is None)
+    ativos = len(processos)
+    janelas = []
+    while ativos:
+        try:
+            tipo, lote = fila.get(timeout=1)
+        except queue.Empty:
+            if not any(processo.is_alive() for processo in processos):
+                break
+            continue
+        if tipo == "fim":
+            ativos -= 1
+            if lote is not None:
+                janelas.append(lote)
+        else:
+            resultados.mesclar(lote)
+
+    for processo in processos:
+        processo.join()
+    if janelas:
+        resultados.duracao = max(fim for _, fim in janelas) - min(inicio for inicio, _ in janelas)
+    return resultados
@@ -0,0 +1,649 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import socket
+import time
+import threading
+import motor_async
+import amostras
+import tarefas
+import distribuido
+import histograma
+import malha_aberta
+
+def conectar_ao_servidor(host, porta):
+    """
+    Estabelece uma conexão com o servidor.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+
+    Retorna:
+        client_socket (socket): O socket cliente conectado ao servidor.
+        connection_time (int): O tempo de conexão com o servidor em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        client_socket.connect((host, porta))
+    except OSError as e:
+        print(str(e))
+        client_socket.close()
+        return None, 0
+    end_time = time.perf_counter_ns()
+    connection_time = end_time - start_time
+    return client_socket, connection_time
+
+def receber_intervalo(mensagem):
+    """
+    Extrai o intervalo recebido do servidor.
+
+    Parâmetros:
+        mensagem (str): A mensagem recebida do servidor.
+
+    Retorna:
+        intervalo (tuple): O intervalo (tupla de dois números inteiros).
+        reception_time (int): O tempo de recepção da mensagem em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    intervalo = mensagem.split()
+    if len(intervalo) not in (2, 3):
+        return None, 0  # Retorna None se a mensagem não contiver um intervalo válido (o terceiro campo opcional é o trace_id)
+
+    a, b = int(intervalo[0]), int(intervalo[1])
+    end_time = time.perf_counter_ns()
+    reception_time = end_time - start_time
+    return (a, b), reception_time
+
+def decode_server_message(socket):
+    """
+    Decodifica mensagens recebidas do servidor.
+
+    Parâmetros:
+        socket (socket): O socket do servidor.
+
+    Retorna:
+        A mensagem decodificada (str).
+    """
+    return socket.recv(1024).decode().strip()
+
+def calcular_soma_pares(intervalo):
+    """
+    Calcula a soma dos números pares dentro do intervalo.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo de números (tupla de dois números inteiros).
+
+    Retorna:
+        soma (int): A soma dos números pares dentro do intervalo.
+        calculation_time (int): O tempo de duração do cálculo em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    a, b = intervalo
+    soma = sum(x for x in range(a, b+1) if x % 2 == 0)
+    end_time = time.perf_counter_ns()
+    calculation_time = end_time - start_time
+    return soma, calculation_time
+
+def calcular_soma_impares(intervalo):
+    """
+    Calcula a soma dos números ímpares dentro do intervalo.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo de números (tupla de dois números inteiros).
+
+    Retorna:
+        soma (int): A soma dos números ímpares dentro do intervalo.
+        calculation_time (int): O tempo de duração do cálculo em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    a, b = intervalo
+    soma = sum(x for x in range(a, b+1) if x % 2 != 0)
+    end_time = time.perf_counter_ns()
+    calculation_time = end_time - start_time
+    return soma, calculation_time
+
+def calcular_pi(intervalo):
+    """
+    Calcula o valor de PI utilizando a fórmula de Leibniz.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo de números (tupla de dois números inteiros).
+
+    Retorna:
+        pi (float): O valor de PI calculado.
+        calculation_time (int): O tempo de duração do cálculo em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    a, b = intervalo
+    pi = 0
+    for i in range(a, b+1):
+        sinal = pow(-1, i)
+        termo = sinal / (2 * i + 1)
+        pi += termo
+    end_time = time.perf_counter_ns()
+    calculation_time = end_time - start_time
+    return pi*4, calculation_time
+
+def enviar_resultados(socket, soma_pares, soma_impares, pi, trace_id=None):
+    """
+    Envia os resultados dos cálculos para o servidor.
+
+    Parâmetros:
+        socket (socket): O socket do cliente conectado ao servidor.
+        soma_pares (int): A soma dos números pares.
+        soma_impares (int): A soma dos números ímpares.
+        pi (float): O valor de PI calculado.
+        trace_id (str): Identificador de rastreamento a ser ecoado ao servidor.
+
+    Retorna:
+        sending_time (int): O tempo de duração do envio em nanossegundos.
+        ack_time (int): O tempo de espera pela confirmação do servidor em nanossegundos.
+    """
+    mensagem = f"Soma dos números pares: {soma_pares}\n"
+    mensagem += f"Soma dos números ímpares: {soma_impares}\n"
+    mensagem += f"Cálculo de PI com o intervalo: {pi}\n"
+    if trace_id:
+        mensagem += f"Trace: {trace_id}\n"
+    return enviar_mensagem(socket, mensagem.encode())
+
+def enviar_mensagem(socket, dados):
+    """
+    Envia uma mensagem ao servidor e espera a confirmação.
+
+    Parâmetros:
+        socket (socket): O socket do cliente conectado ao servidor.
+        dados (bytes): A mensagem codificada.
+
+    Retorna:
+        sending_time (int): O tempo de duração do envio em nanossegundos.
+        ack_time (int): O tempo de espera pela confirmação do servidor em nanossegundos.
+    """
+    start_time = time.perf_counter_ns()
+    socket.sendall(dados)
+    sent_time = time.perf_counter_ns()
+    tarefas.receber_confirmacao(socket)
+    end_time = time.perf_counter_ns()
+
+    return sent_time - start_time, end_time - sent_time
+
+def calcular_dados(intervalo):
+    """
+    Calcula os resultados dos cálculos.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo de números (tupla de dois números inteiros).
+
+    Retorna:
+        soma_pares (int): A soma dos números pares.
+        soma_impares (int): A soma dos números ímpares.
+        pi (float): O valor de PI calculado.
+        calculation_time_sum_even (int): O tempo de duração do cálculo da soma dos números pares.
+        calculation_time_sum_odd (int): O tempo de duração do cálculo da soma dos números ímpares.
+        calculation_time_pi (int): O tempo de duração do cálculo de PI.
+    """
+    soma_pares, calculation_time_sum_even = calcular_soma_pares(intervalo)
+    soma_impares, calculation_time_sum_odd = calcular_soma_impares(intervalo)
+    pi, calculation_time_pi = calcular_pi(intervalo)
+    
+    return soma_pares, soma_impares, pi, calculation_time_sum_even, calculation_time_sum_odd, calculation_time_pi
+
+def gerar_dados_falsos():
+    """
+    Gera dados falsos para envio ao servidor.
+
+    Retorna:
+        soma_pares (int): A soma dos números pares falsos.
+        soma_impares (int): A soma dos números ímpares falsos.
+        pi (float): O valor de PI falso.
+    """
+    intervalo = (1, 1000000)
+    soma_pares = random.randint(1, 1000000)
+    soma_impares = random.randint(1, 1000000)
+    pi = random.randint(13,14)
+
+    return soma_pares, soma_impares, pi
+
+def gerar_resultados_falsos(intervalo):
+    """
+    Adapta gerar_dados_falsos à assinatura esperada pelo motor assíncrono.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo recebido do servidor (ignorado).
+
+    Retorna:
+        soma_pares (int), soma_impares (int) e pi (float) falsos, e um dicionário
+        vazio de tempos de cálculo.
+    """
+    soma_pares, soma_impares, pi = gerar_dados_falsos()
+    return soma_pares, soma_impares, pi, {}
+
+def gerar_resultados_reais(intervalo):
+    """
+    Adapta calcular_dados à assinatura esperada pelo motor assíncrono.
+
+    Parâmetros:
+        intervalo (tuple): O intervalo recebido do servidor.
+
+    Retorna:
+        soma_pares (int), soma_impares (int), pi (float) e o tempo de cada
+        kernel em nanossegundos (dict).
+    """
+    soma_pares, soma_impares, pi, tempo_pares, tempo_impares, tempo_pi = calcular_dados(intervalo)
+    return soma_pares, soma_impares, pi, {"soma_pares": tempo_pares, "soma_impares": tempo_impares, "pi": tempo_pi}
+
+
+def client_thread(host, porta, resultados, gerar_resultados=gerar_resultados_falsos):
+    """
+    Função a ser executada em cada thread do cliente.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): O número da porta do servidor.
+        resultados (motor_async.ResultadosCarga): Acumulador compartilhado entre as threads.
+        gerar_resultados (callable): gerar_resultados_falsos ou gerar_resultados_reais.
+    """
+    inicio = time.perf_counter_ns()
+    client_socket, connection_time = conectar_ao_servidor(host, porta)
+    if client_socket is None:
+        print("Falha ao conectar ao servidor.")
+        resultados.registrar_falha()
+        return
+
+    try:
+        start_time = time.perf_counter_ns()
+        mensagem = decode_server_message(client_socket)
+        first_byte_time = time.perf_counter_ns() - start_time
+
+        if mensagem.startswith("Conexão negada:"):
+            print("Conexão negada: número máximo de conexões atingido.")
+            resultados.registrar_negacao()
+            return
+
+        atribuicao = tarefas.interpretar_atribuicao(mensagem)
+        if atribuicao is not None:
+            # Blocos de tarefa são sempre calculados de verdade: o servidor combina os resultados
+            start_time = time.perf_counter_ns()
+            resposta, duracao = tarefas.executar_atribuicao(atribuicao, tarefas.vigiar_cancelamento(client_socket))
+            tempos_calculo = {atribuicao["tarefa"]: duracao}
+            calculation_time = time.perf_counter_ns() - start_time
+            sending_time, ack_time = enviar_mensagem(client_socket, tarefas.codificar_resposta(resposta))
+        else:
+            intervalo, reception_time = receber_intervalo(mensagem)
+            if intervalo is None:
+                print("Intervalo inválido.")
+                resultados.registrar_falha()
+                return
+
+            start_time = time.perf_counter_ns()
+            soma_pares, soma_impares, pi, tempos_calculo = gerar_resultados(intervalo)
+            calculation_time = time.perf_counter_ns() - start_time
+
+            partes = mensagem.split()
+            trace_id = partes[2] if len(partes) == 3 else None
+            sending_time, ack_time = enviar_resultados(client_socket,soma_pares,soma_impares,pi,trace_id)
+
+        fases = {
+            "conexao": connection_time,
+            "primeiro_byte": first_byte_time,
+            "calculo": calculation_time,
+            "envio": sending_time,
+            "ack": ack_time,
+        }
+        for kernel, duracao in tempos_calculo.items():
+            fases[f"calculo_{kernel}"] = duracao
+
+        response_time = (sending_time + ack_time) / 1e9
+        resultados.registrar_sucesso(connection_time / 1e9, response_time, (time.perf_counter_ns() - inicio) / 1e9, fases)
+    except (OSError, ValueError):
+        # ValueError inclui UnicodeDecodeError (mensagem do servidor que não é UTF-8)
+        resultados.registrar_falha()
+    finally:
+        client_socket.close()
+
+def get_local_ip():
+    """
+    Obtém o endereço IP local da máquina.
+
+    Retorna:
+        ip_address (str): O endereço IP local da máquina.
+    """
+    import netifaces
+
+    interfaces = netifaces.interfaces()
+    for interface in interfaces:
+        addresses = netifaces.ifaddresses(interface)
+        if netifaces.AF_INET in addresses:
+            for address_info in addresses[netifaces.AF_INET]:
+                ip_address = address_info.get('addr')
+                if ip_address and ip_address != '127.0.0.1':
+                    return ip_address
+    return None
+
+
+GERADORES = {"falso": gerar_resultados_falsos, "real": gerar_resultados_reais}
+TIPOS_ETAPA = ("fechada", "aberta", "varredura")
+PERFIS = ("constante", "rampa", "degraus")
+
+# Valores usados quando nem o cenário nem a etapa os definem
+PADROES = {
+    "alvos": ["auto"],
+    "porta": 12345,
+    "calculo": "falso",
+    "motor": "async",
+    "processos": 1,
+    "repeticoes": 1,
+    "pausa": 0,
+    "timeout": 30,
+}
+
+def carregar_cenario(caminho):
+    """
+    Lê um arquivo de cenário em TOML ou JSON (conforme a extensão), completa os
+    valores padrão e valida as etapas.
+
+    Chaves do cenário (as de PADROES podem ser sobrescritas em cada etapa):
+        nome (str): Nome do cenário; padrão é o nome do arquivo.
+        alvos (list): Servidores testados: "auto" (IP local), "host" ou "host:porta".
+        porta (int): Porta usada quando o alvo não informa uma.
+        calculo (str): "falso" (gerar_dados_falsos) ou "real" (calcular_dados).
+        motor (str): "async" ou "threads" (uma thread por cliente).
+        processos (int): Processos geradores do motor "async" nas etapas fechadas.
+        repeticoes (int): Quantas vezes cada combinação é executada.
+        pausa (float): Segundos de espera entre execuções.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        etapas (list): Etapas executadas em ordem, cada uma com um tipo:
+            "fechada": clientes (lista de números de clientes simultâneos).
+            "aberta": perfil ("constante", "rampa" ou "degraus") e duracao, com
+                taxa, taxa_inicial e taxa_final, ou taxas (duracao por degrau).
+            "varredura": slo_p99 e duracao de cada patamar.
+
+    Retorna:
+        cenario (dict): O cenário completo.
+    """
+    with open(caminho, "rb") as arquivo:
+        if caminho.endswith(".toml"):
+            # tomllib só existe a partir do Python 3.11; cenários em JSON não precisam dele
+            try:
+                import tomllib
+            except ImportError:
+                import tomli as tomllib
+            cenario = tomllib.load(arquivo)
+        else:
+            cenario = json.load(arquivo)
+
+    cenario.setdefault("nome", os.path.splitext(os.path.basename(caminho))[0])
+    for chave, valor in PADROES.items():
+        cenario.setdefault(chave, valor)
+    if not cenario.get("etapas"):
+        raise ValueError(f"{caminho}: o cenário não define nenhuma etapa")
+
+    for indice, etapa in enumerate(cenario["etapas"], 1):
+        config = configuracao_etapa(cenario, etapa)
+        erro = f"{caminho}, etapa {indice}"
+        if config.get("tipo") not in TIPOS_ETAPA:
+            raise ValueError(f"{erro}: tipo deve ser um de {', '.join(TIPOS_ETAPA)}")
+        if config["calculo"] not in GERADORES:
+            raise ValueError(f"{erro}: calculo deve ser um de {', '.join(GERADORES)}")
+        if config["motor"] not in ("async", "threads"):
+            raise ValueError(f"{erro}: motor deve ser async ou threads")
+        if config["tipo"] == "fechada" and not config.get("clientes"):
+            raise ValueError(f"{erro}: etapa fechada sem a lista de clientes")
+        if config["tipo"] == "aberta":
+            obrigatorias = {"constante": ("taxa",), "rampa": ("taxa_inicial", "taxa_final"), "degraus": ("taxas",)}
+            if config.get("perfil") not in PERFIS:
+                raise ValueError(f"{erro}: perfil deve ser um de {', '.join(PERFIS)}")
+            faltando = [chave for chave in obrigatorias[config["perfil"]] + ("duracao",) if chave not in config]
+            if faltando:
+                raise ValueError(f"{erro}: faltando {', '.join(faltando)}")
+        if config["tipo"] == "varredura" and "slo_p99" not in config:
+            raise ValueError(f"{erro}: etapa de varredura sem slo_p99")
+    return cenario
+
+def configuracao_etapa(cenario, etapa):
+    """
+    Combina os valores do cenário com os da etapa (os da etapa prevalecem).
+    """
+    config = {chave: cenario[chave] for chave in PADROES}
+    config.update(etapa)
+    if isinstance(config["alvos"], str):
+        config["alvos"] = [config["alvos"]]
+    return config
+
+def substituir(cenario, chave, valor):
+    """
+    Substitui uma configuração em todo o cenário, inclusive nas etapas que a
+    definiam (ex.: apontar todas as etapas para outro alvo).
+    """
+    cenario[chave] = valor
+    for etapa in cenario["etapas"]:
+        etapa.pop(chave, None)
+
+def resolver_alvo(alvo, porta):
+    """
+    Converte um alvo do cenário em (host, porta).
+
+    Parâmetros:
+        alvo (str): "auto" (IP local), "host" ou "host:porta".
+        porta (int): Porta usada quando o alvo não informa uma.
+    """
+    if alvo == "auto":
+        host = get_local_ip()
+        if host is None:
+            raise ValueError("alvo auto: nenhum endereço IP local encontrado")
+        return host, porta
+    if ":" in alvo:
+        host, porta = alvo.rsplit(":", 1)
+        return host, int(porta)
+    return alvo, porta
+
+def montar_perfil(config):
+    """
+    Cria o perfil de chegadas de uma etapa aberta (ver malha_aberta.perfil_*).
+    """
+    if config["perfil"] == "constante":
+        return malha_aberta.perfil_constante(config["taxa"], config["duracao"])
+    if config["perfil"] == "rampa":
+        return malha_aberta.perfil_rampa(config["taxa_inicial"], config["taxa_final"], config["duracao"])
+    return malha_aberta.perfil_degraus(config["taxas"], config["duracao"])
+
+def expandir_execucoes(cenario):
+    """
+    Gera cada execução do cenário: etapa x alvo x (número de clientes) x repetição.
+
+    Retorna:
+        Iterador de dicionários com rotulo, etapa, tipo, host, porta, num_clientes
+        (apenas nas etapas fechadas), repeticao e config.
+    """
+    for indice, etapa in enumerate(cenario["etapas"], 1):
+        config = configuracao_etapa(cenario, etapa)
+        cargas = config["clientes"] if config["tipo"] == "fechada" else [None]
+        for alvo in config["alvos"]:
+            host, porta = resolver_alvo(alvo, config["porta"])
+            for num_clientes in cargas:
+                if config["tipo"] == "fechada":
+                    detalhe = str(num_clientes)
+                elif config["tipo"] == "aberta":
+                    detalhe = config["perfil"]
+                else:
+                    detalhe = f"slo{config['slo_p99']}"
+                for repeticao in range(1, config["repeticoes"] + 1):
+                    yield {
+                        "rotulo": f"{indice:02d}-{config['tipo']}-{detalhe}-{host}_{porta}-r{repeticao}",
+                        "etapa": indice,
+                        "tipo": config["tipo"],
+                        "host": host,
+                        "porta": porta,
+                        "num_clientes": num_clientes,
+                        "repeticao": repeticao,
+                        "config": config,
+                    }
+
+def executar_fechada(host, porta, num_clientes, config, pasta_captura):
+    """
+    Dispara num_clientes clientes simultâneos e grava as amostras em pasta_captura.
+
+    Retorna:
+        resultados (motor_async.ResultadosCarga): As medições da execução.
+    """
+    gerar_resultados = GERADORES[config["calculo"]]
+    usar_executor = config["calculo"] == "real"
+    if config["motor"] == "async" and config["processos"] > 1:
+        return distribuido.executar_distribuido(host, porta, num_clientes, gerar_resultados, config["processos"],
+                                                usar_executor, config["timeout"], pasta_captura)
+
+    gravador = amostras.GravadorAmostras(pasta_captura)
+    resultados = motor_async.ResultadosCarga(gravador, guardar_amostras=False)
+    if config["motor"] == "async":
+        motor_async.executar_clientes(host, porta, num_clientes, gerar_resultados, usar_executor, config["timeout"], resultados)
+    else:
+        threads = []
+        inicio = time.perf_counter()
+
+        for _ in range(num_clientes):
+            thread = threading.Thread(target=client_thread, args=(host, porta, resultados, gerar_resultados))
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+        resultados.duracao = time.perf_counter() - inicio
+    gravador.fechar(num_clientes=num_clientes, duracao_s=resultados.duracao)
+    return resultados
+
+def executar_execucao(execucao, pasta):
+    """
+    Executa uma combinação do cenário e grava seu pacote de resultados em pasta:
+    resumo.json e percentis.csv (ou varredura.json) e amostras/ com as amostras brutas.
+
+    Retorna:
+        resumo (dict): O resumo numérico da execução.
+    """
+    config = execucao["config"]
+    host, porta = execucao["host"], execucao["porta"]
+    pasta_captura = os.path.join(pasta, "amostras")
+    os.makedirs(pasta, exist_ok=True)
+
+    if execucao["tipo"] == "varredura":
+        varredura = malha_aberta.varrer_taxa(host, porta, GERADORES[config["calculo"]], config["slo_p99"], config.get("duracao", 10),
+                                             usar_executor=config["calculo"] == "real", timeout=config["timeout"])
+        with open(os.path.join(pasta, "varredura.json"), "w", encoding="utf-8") as arquivo:
+            json.dump(varredura, arquivo, indent=2, ensure_ascii=False)
+        return {"taxa_maxima_sustentavel": varredura["taxa_maxima_sustentavel"], "patamares": len(varredura["patamares"])}
+
+    if execucao["tipo"] == "fechada":
+        num_clientes = execucao["num_clientes"]
+        resultados = executar_fechada(host, porta, num_clientes, config, pasta_captura)
+    else:
+        gravador = amostras.GravadorAmostras(pasta_captura)
+        resultados, num_clientes = malha_aberta.executar_perfil(
+            host, porta, montar_perfil(config), GERADORES[config["calculo"]], config["calculo"] == "real",
+            config["timeout"], motor_async.ResultadosCarga(gravador, guardar_amostras=False),
+        )
+        gravador.fechar(num_clientes=num_clientes, duracao_s=resultados.duracao)
+
+    resumo = resultados.resumo(num_clientes)
+    histograma.exportar_resumo(pasta, resumo)
+    return resumo
+
+def linha_indice(execucao, resumo):
+    """
+    Monta a linha de indice.csv de uma execução.
+    """
+    linha = {
+        "execucao": execucao["rotulo"],
+        "etapa": execucao["etapa"],
+        "tipo": execucao["tipo"],
+        "alvo": f"{execucao['host']}:{execucao['porta']}",
+        "repeticao": execucao["repeticao"],
+    }
+    if "tempo_total" in resumo:
+        for chave in ("num_clientes", "sucessos", "negacoes", "falhas", "duracao_s", "vazao_por_s"):
+            linha[chave] = resumo[chave]
+        for estatistica in ("p50", "p90", "p99", "max"):
+            linha[f"total_{estatistica}"] = resumo["tempo_total"][estatistica]
+    else:
+        linha.update(resumo)
+    return linha
+
+def executar_cenario(cenario, pasta_saida=None):
+    """
+    Executa todas as combinações de um cenário. Cada execução grava um pacote
+    com o mesmo formato em pasta_saida/<rotulo>/ (resumo, amostras brutas e
+    execucao.json com a configuração usada), e a raiz recebe cenario.json,
+    indice.csv (uma linha por execução) e fases_por_carga.csv.
+
+    Parâmetros:
+        cenario (dict): Cenário lido por carregar_cenario.
+        pasta_saida (str): Diretório de saída; padrão é resultados/<nome>/<data-hora>.
+
+    Retorna:
+        pasta_saida (str): O diretório com os resultados.
+    """
+    if pasta_saida is None:
+        pasta_saida = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados", cenario["nome"], time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(pasta_saida, exist_ok=True)
+    with open(os.path.join(pasta_saida, "cenario.json"), "w", encoding="utf-8") as arquivo:
+        json.dump(cenario, arquivo, indent=2, ensure_ascii=False)
+
+    linhas = []
+    resumos = []
+    for execucao in expandir_execucoes(cenario):
+        if linhas and execucao["config"]["pausa"]:
+            time.sleep(execucao["config"]["pausa"])
+        print(f"{execucao['rotulo']}...")
+        pasta = os.path.join(pasta_saida, execucao["rotulo"])
+        inicio = time.time()
+        resumo = executar_execucao(execucao, pasta)
+        with open(os.path.join(pasta, "execucao.json"), "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "cenario": cenario["nome"],
+                "execucao": execucao["rotulo"],
+                "alvo": f"{execucao['host']}:{execucao['porta']}",
+                "repeticao": execucao["repeticao"],
+                "num_clientes": execucao["num_clientes"],
+                "configuracao": execucao["config"],
+                "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(inicio)),
+                "duracao_s": time.time() - inicio,
+                "gerador": socket.gethostname(),
+                "python": platform.python_version(),
+                "plataforma": platform.platform(),
+            }, arquivo, indent=2, ensure_ascii=False)
+        linhas.append(linha_indice(execucao, resumo))
+        if "fases" in resumo:
+            resumos.append(resumo)
+
+    colunas = []
+    for linha in linhas:
+        for chave in linha:
+            if chave not in colunas:
+                colunas.append(chave)
+    with open(os.path.join(pasta_saida, "indice.csv"), "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        escritor.writerows(linhas)
+    # Tabela com a divisão do tempo entre as fases para cada carga
+    if resumos:
+        histograma.exportar_fases_por_carga(os.path.join(pasta_saida, "fases_por_carga.csv"), resumos)
+    return pasta_saida
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa cenários de carga descritos em arquivos TOML ou JSON.")
+    parser.add_argument("cenarios", nargs="+", help="arquivos de cenário (ex.: cenarios/cenario1.toml)")
+    parser.add_argument("--saida", help="diretório de saída (apenas com um cenário; padrão: resultados/<nome>/<data-hora>)")
+    parser.add_argument("--alvo", action="append", help="substitui os alvos do cenário (pode ser repetido)")
+    parser.add_argument("--repeticoes", type=int, help="substitui o número de repetições")
+    args = parser.parse_args()
+
+    for caminho in args.cenarios:
+        cenario = carregar_cenario(caminho)
+        for chave, valor in (("alvos", args.alvo), ("repeticoes", args.repeticoes)):
+            if valor is not None:
+                substituir(cenario, chave, valor)
+        pasta = executar_cenario(cenario, args.saida if len(args.cenarios) == 1 else None)
+        print(f"Resultados em {pasta}")
+        print(f"Gráficos e comparação: python relatorio.py {pasta}/*/")
@@ -0,0 +1,166 @@
+import csv
+import json
+import os
+import threading
+
+PERCENTIS = (50.0, 90.0, 99.0, 99.9)
+
+class HistogramaLatencia:
+    """
+    Histograma de latências com baldes logarítmicos, no estilo HDR.
+
+    Os valores são registrados em microssegundos. Abaixo de 2**precisao cada
+    valor tem seu próprio balde; acima disso cada potência de dois é dividida em
+    2**(precisao - 1) baldes, o que mantém o erro relativo abaixo de
+    2**-(precisao - 1) (menos de 1,6% com a precisão padrão). Apenas os baldes
+    ocupados são guardados, então a memória não cresce com o número de amostras.
+
+    Parâmetros:
+        precisao (int): Número de bits significativos mantidos por valor.
+    """
+    def __init__(self, precisao=7):
+        self.precisao = precisao
+        self.limite_linear = 1 << precisao
+        self.meia_faixa = 1 << (precisao - 1)
+        self.contagens = {}
+        self.total = 0
+        self.soma = 0
+        self.minimo = None
+        self.maximo = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["lock"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.lock = threading.Lock()
+
+    def _indice(self, valor):
+        if valor < self.limite_linear:
+            return valor
+        deslocamento = valor.bit_length() - self.precisao
+        mantissa = valor >> deslocamento
+        return self.limite_linear + (deslocamento - 1) * self.meia_faixa + (mantissa - self.meia_faixa)
+
+    def _valor_maximo_do_balde(self, indice):
+        if indice < self.limite_linear:
+            return indice
+        deslocamento, resto = divmod(indice - self.limite_linear, self.meia_faixa)
+        deslocamento += 1
+        mantissa = resto + self.meia_faixa
+        return ((mantissa + 1) << deslocamento) - 1
+
+    def registrar(self, segundos):
+        """
+        Registra uma amostra.
+
+        Parâmetros:
+            segundos (float): A latência medida, em segundos.
+        """
+        valor = max(0, int(segundos * 1_000_000))
+        indice = self._indice(valor)
+        with self.lock:
+            self.contagens[indice] = self.contagens.get(indice, 0) + 1
+            self.total += 1
+            self.soma += valor
+            if self.minimo is None or valor < self.minimo:
+                self.minimo = valor
+            if valor > self.maximo:
+                self.maximo = valor
+
+    def mesclar(self, outro):
+        """
+        Soma as contagens de outro histograma (por exemplo, vindo de outro processo).
+
+        Parâmetros:
+            outro (HistogramaLatencia): Histograma com a mesma precisão.
+        """
+        if outro.precisao != self.precisao:
+            raise ValueError("Não é possível mesclar histogramas com precisões diferentes.")
+        with self.lock:
+            for indice, contagem in outro.contagens.items():
+                self.contagens[indice] = self.contagens.get(indice, 0) + contagem
+            self.total += outro.total
+            self.soma += outro.soma
+            if outro.minimo is not None and (self.minimo is None or outro.minimo < self.minimo):
+                self.minimo = outro.minimo
+            self.maximo = max(self.maximo, outro.maximo)
+
+    def percentil(self, p):
+        """
+        Retorna o valor (em segundos) abaixo do qual estão p% das amostras.
+
+        Parâmetros:
+            p (float): O percentil desejado, entre 0 e 100.
+        """
+        if self.total == 0:
+            return 0.0
+        alvo = max(1, -(-self.total * p // 100))
+        acumulado = 0
+        for indice in sorted(self.contagens):
+            acumulado += self.contagens[indice]
+            if acumulado >= alvo:
+                return min(self._valor_maximo_do_balde(indice), self.maximo) / 1_000_000
+        return self.maximo / 1_000_000
+
+    def resumo(self):
+        """
+        Retorna um dicionário com contagem, média, percentis e máximo, em segundos.
+        """
+        resumo = {"amostras": self.total}
+        if self.total:
+            resumo["min"] = self.minimo / 1_000_000
+            resumo["media"] = self.soma / self.total / 1_000_000
+        else:
+            resumo["min"] = 0.0
+            resumo["media"] = 0.0
+        for p in PERCENTIS:
+            resumo[f"p{p:g}"] = self.percentil(p)
+        resumo["max"] = self.maximo / 1_000_000
+        return resumo
+
+def exportar_resumo(pasta, resumo):
+    """
+    Grava o resumo de uma execução como resumo.json e percentis.csv.
+
+    Parâmetros:
+        pasta (str): Diretório de saída (o mesmo dos gráficos).
+        resumo (dict): Resumo gerado por ResultadosCarga.resumo().
+    """
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, "resumo.json"), "w", encoding="utf-8") as arquivo:
+        json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+
+    with open(os.path.join(pasta, "percentis.csv"), "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(["metrica", "estatistica", "valor"])
+        for chave, valor in resumo.items():
+            if isinstance(valor, dict):
+                for estatistica, numero in valor.items():
+                    escritor.writerow([chave, estatistica, numero])
+            else:
+                escritor.writerow([chave, "", valor])
+
+def exportar_fases_por_carga(caminho, resumos):
+    """
+    Grava, em CSV, como o tempo de cada requisição se divide entre as fases
+    (conexão, primeiro byte, cálculo, envio, ack...) à medida que a carga cresce.
+
+    Parâmetros:
+        caminho (str): Arquivo CSV de saída.
+        resumos (list): Resumos gerados por ResultadosCarga.resumo(), um por carga.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(["num_clientes", "fase", "amostras", "media", "p50", "p99", "fracao_media"])
+        for resumo in resumos:
+            fases = resumo.get("fases", {})
+            # As fases "calculo_<kernel>" já estão contidas em "calculo".
+            total = sum(dados["media"] for fase, dados in fases.items() if not fase.startswith("calculo_"))
+            for fase, dados in fases.items():
+                fracao = dados["media"] / total if total else 0.0
+                escritor.writerow([resumo["num_clientes"], fase, dados["amostras"], dados["media"], dados["p50"], dados["p99"], fracao])
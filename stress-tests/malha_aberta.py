@@ -0,0 +1,176 @@
+import asyncio
+import math
+import time
+
+import motor_async
+
+def perfil_constante(taxa, duracao):
+    """
+    Gera os instantes de chegada de uma taxa constante.
+
+    Parâmetros:
+        taxa (float): Conexões por segundo.
+        duracao (float): Duração do perfil em segundos.
+
+    Retorna:
+        Iterador com os instantes (em segundos desde o início) de cada chegada.
+    """
+    total = int(taxa * duracao)
+    for i in range(total):
+        yield i / taxa
+
+def perfil_rampa(taxa_inicial, taxa_final, duracao):
+    """
+    Gera os instantes de chegada de uma taxa que varia linearmente de
+    taxa_inicial até taxa_final ao longo de duracao segundos.
+
+    Parâmetros:
+        taxa_inicial (float): Conexões por segundo no início.
+        taxa_final (float): Conexões por segundo no fim.
+        duracao (float): Duração do perfil em segundos.
+
+    Retorna:
+        Iterador com os instantes (em segundos desde o início) de cada chegada.
+    """
+    if taxa_inicial == taxa_final:
+        yield from perfil_constante(taxa_inicial, duracao)
+        return
+
+    # Número acumulado de chegadas até t: N(t) = r0*t + (r1 - r0)*t²/(2*D).
+    # A i-ésima chegada acontece quando N(t) = i.
+    aceleracao = (taxa_final - taxa_inicial) / duracao
+    total = int((taxa_inicial + taxa_final) / 2 * duracao)
+    for i in range(total):
+        discriminante = taxa_inicial * taxa_inicial + 2 * aceleracao * i
+        yield (math.sqrt(max(0.0, discriminante)) - taxa_inicial) / aceleracao
+
+def perfil_degraus(taxas, duracao_degrau):
+    """
+    Gera os instantes de chegada de uma sequência de taxas constantes.
+
+    Parâmetros:
+        taxas (list): Conexões por segundo em cada degrau.
+        duracao_degrau (float): Duração de cada degrau em segundos.
+
+    Retorna:
+        Iterador com os instantes (em segundos desde o início) de cada chegada.
+    """
+    for indice, taxa in enumerate(taxas):
+        deslocamento = indice * duracao_degrau
+        for instante in perfil_constante(taxa, duracao_degrau):
+            yield deslocamento + instante
+
+async def executar_perfil_async(host, porta, perfil, resultados, gerar_resultados, usar_executor=False, timeout=30):
+    """
+    Versão assíncrona de executar_perfil, para ser combinada com outras tarefas
+    no mesmo laço de eventos.
+
+    Retorna:
+        num_clientes (int): O número de clientes disparados.
+    """
+    tarefas = []
+    base = time.perf_counter_ns()
+    for instante in perfil:
+        inicio_planejado = base + int(instante * 1e9)
+        espera = (inicio_planejado - time.perf_counter_ns()) / 1e9
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarefas.append(asyncio.create_task(motor_async.cliente_async(
+            host, porta, resultados, gerar_resultados, usar_executor, timeout, inicio_planejado,
+        )))
+    await motor_async.aguardar_clientes(tarefas, resultados)
+    return len(tarefas)
+
+def executar_perfil(host, porta, perfil, gerar_resultados, usar_executor=False, timeout=30, resultados=None):
+    """
+    Executa uma carga de malha aberta: cada cliente é iniciado no instante definido
+    pelo perfil, independentemente de os anteriores já terem terminado.
+
+    Os tempos de conexão e total são medidos a partir do instante planejado, o que
+    corrige a omissão coordenada: se o servidor (ou o gerador) travar, o atraso
+    aparece nas latências em vez de simplesmente reduzir o número de requisições.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        perfil (iterable): Instantes de chegada em segundos (ver perfil_*).
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo); ver motor_async.cliente_async.
+        usar_executor (bool): Executa gerar_resultados em um pool de threads.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        resultados (motor_async.ResultadosCarga): Acumulador a ser usado; um novo é criado se omitido.
+
+    Retorna:
+        resultados (motor_async.ResultadosCarga): As medições da execução.
+        num_clientes (int): O número de clientes disparados.
+    """
+    motor_async.ajustar_limite_descritores()
+    if resultados is None:
+        resultados = motor_async.ResultadosCarga()
+    inicio = time.perf_counter()
+    num_clientes = asyncio.run(executar_perfil_async(host, porta, perfil, resultados, gerar_resultados, usar_executor, timeout))
+    resultados.duracao = time.perf_counter() - inicio
+    return resultados, num_clientes
+
+def _sustentavel(resultados, num_clientes, slo_p99, max_taxa_erro):
+    erros = resultados.failure_count + resultados.denial_count
+    if num_clientes == 0:
+        return True
+    return resultados.hist_total.percentil(99) <= slo_p99 and erros / num_clientes <= max_taxa_erro
+
+def varrer_taxa(host, porta, gerar_resultados, slo_p99, duracao=10, taxa_inicial=10, fator=2, refinamentos=4, max_taxa_erro=0.01, taxa_maxima=100000,
+                usar_executor=False, timeout=30):
+    """
+    Procura a maior taxa de chegada constante que o servidor sustenta sem que o
+    p99 do tempo total ultrapasse o SLO.
+
+    A taxa é multiplicada por fator até a primeira violação e, em seguida, o
+    intervalo entre a última taxa aprovada e a reprovada é refinado por bisseção.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo); ver motor_async.cliente_async.
+        slo_p99 (float): Limite do p99 do tempo total, em segundos.
+        duracao (float): Duração de cada patamar em segundos.
+        taxa_inicial (float): Primeira taxa testada (conexões por segundo).
+        fator (float): Multiplicador da taxa na fase de busca.
+        refinamentos (int): Número de passos de bisseção.
+        max_taxa_erro (float): Fração máxima de falhas e negações aceita.
+        taxa_maxima (float): Taxa a partir da qual a busca é interrompida.
+        usar_executor (bool): Executa gerar_resultados fora do laço de eventos (cálculo real).
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+
+    Retorna:
+        Dicionário com a maior taxa sustentável e o resumo de cada patamar testado.
+    """
+    patamares = []
+
+    def testar(taxa):
+        resultados, num_clientes = executar_perfil(host, porta, perfil_constante(taxa, duracao), gerar_resultados, usar_executor, timeout)
+        aprovado = _sustentavel(resultados, num_clientes, slo_p99, max_taxa_erro)
+        resumo = resultados.resumo(num_clientes)
+        resumo["taxa"] = taxa
+        resumo["aprovado"] = aprovado
+        patamares.append(resumo)
+        return aprovado
+
+    aprovada, reprovada = 0, None
+    taxa = taxa_inicial
+    while taxa <= taxa_maxima:
+        if not testar(taxa):
+            reprovada = taxa
+            break
+        aprovada = taxa
+        taxa *= fator
+
+    if reprovada is not None:
+        for _ in range(refinamentos):
+            meio = (aprovada + reprovada) / 2
+            if testar(meio):
+                aprovada = meio
+            else:
+                reprovada = meio
+
+    return {"slo_p99": slo_p99, "taxa_maxima_sustentavel": aprovada, "patamares": patamares}
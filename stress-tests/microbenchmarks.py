@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tarefas
+from client import ClientWindow
+from nucleo_servidor import ClientHandler, codificar_intervalo
+from rastreamento import extrair_trace_id
+
+# Tamanhos de intervalo (0, n) usados nos kernels; o servidor sorteia n até 1_000_000
+TAMANHOS_PADRAO = (1000, 100000)
+TRACE_ID = "9f3a6c0d12b4e587"
+
+# Blocos combinados em protocolo.reduzir (um trabalho de 1_000_000 termos em blocos de 10_000)
+BLOCOS_REDUCAO = 100
+
+class _SocketMemoria:
+    """
+    Socket em memória para medir a codificação e a decodificação sem a pilha
+    de rede: recv devolve sempre os mesmos dados e send guarda só o último envio.
+    """
+    def __init__(self, dados=b""):
+        self.dados = dados
+        self.enviados = b""
+
+    def recv(self, tamanho):
+        return self.dados[:tamanho]
+
+    def send(self, dados):
+        self.enviados = dados
+        return len(dados)
+
+def _casos_kernels(tamanhos):
+    # Os kernels do cliente não usam self, então são chamados sem criar a janela
+    casos = {}
+    for n in tamanhos:
+        intervalo = (0, n)
+        casos[f"kernel.soma_pares[{n}]"] = lambda intervalo=intervalo: ClientWindow.calcular_soma_pares(None, intervalo)
+        casos[f"kernel.soma_impares[{n}]"] = lambda intervalo=intervalo: ClientWindow.calcular_soma_impares(None, intervalo)
+        casos[f"kernel.pi[{n}]"] = lambda intervalo=intervalo: ClientWindow.calcular_pi(None, intervalo)
+        for nome in ("soma_pares", "soma_impares", "pi_leibniz"):
+            kernel = tarefas.obter_tarefa(nome).kernel
+            casos[f"kernel.tarefa.{nome}[{n}]"] = lambda kernel=kernel, n=n: kernel({}, 0, n)
+    return casos
+
+def _casos_protocolo():
+    mensagem_intervalo = f"0 523417 {TRACE_ID}"
+    janela = ClientWindow.__new__(ClientWindow)
+    cliente = _SocketMemoria()
+    ClientWindow.enviar_resultados(janela, cliente, 62500250000, 62500000000, 3.1415916535897743, TRACE_ID)
+    handler = ClientHandler(_SocketMemoria(cliente.enviados), (0, 523417), None, None, TRACE_ID)
+
+    trabalho = tarefas.criar_trabalho({"tarefa": "soma_pares", "params": {}, "inicio": 0, "fim": 1000000, "tamanho_bloco": 10000})
+    bloco = trabalho.bloco(0)
+    atribuicao = tarefas.codificar_atribuicao(trabalho, bloco, TRACE_ID).decode().strip()
+    resposta = tarefas.codificar_resposta({"tarefa": "soma_pares", "versao": 1, "bloco": 0, "resultado": 24995000, "trace_id": TRACE_ID})
+    handler_tarefa = ClientHandler(_SocketMemoria(resposta), (bloco["inicio"], bloco["fim"]), None, None, TRACE_ID, trabalho=trabalho, bloco=bloco)
+    parciais_soma = [24995000 + i for i in range(BLOCOS_REDUCAO)]
+    parciais_monte_carlo = [[7853, 10000] for _ in range(BLOCOS_REDUCAO)]
+    return {
+        # Protocolo original: servidor -> cliente
+        "protocolo.codificar_intervalo": lambda: codificar_intervalo((0, 523417), TRACE_ID),
+        "protocolo.receber_intervalo": lambda: (ClientWindow.receber_intervalo(janela, mensagem_intervalo), ClientWindow.receber_trace_id(janela, mensagem_intervalo)),
+        # Protocolo original: cliente -> servidor
+        "protocolo.codificar_resultados": lambda: ClientWindow.enviar_resultados(janela, cliente, 62500250000, 62500000000, 3.1415916535897743, TRACE_ID),
+        "protocolo.decodificar_resultados": lambda: extrair_trace_id(handler.decode_server_message(handler.client_socket)),
+        # Protocolo de tarefas
+        "protocolo.codificar_atribuicao": lambda: tarefas.codificar_atribuicao(trabalho, bloco, TRACE_ID),
+        "protocolo.interpretar_atribuicao": lambda: tarefas.interpretar_atribuicao(atribuicao),
+        "protocolo.interpretar_resposta": lambda: tarefas.interpretar_resposta(handler_tarefa.receber_linha(handler_tarefa.client_socket)),
+        "protocolo.reduzir.soma": lambda: tarefas.reduzir("soma", parciais_soma),
+        "protocolo.reduzir.monte_carlo": lambda: tarefas.reduzir("soma", parciais_monte_carlo),
+    }
+
+def casos(tamanhos=TAMANHOS_PADRAO):
+    """
+    Retorna todos os microbenchmarks disponíveis.
+
+    Parâmetros:
+        tamanhos (tuple): Valores de n dos intervalos (0, n) dos kernels.
+
+    Retorna:
+        Dicionário {nome: função sem argumentos}.
+    """
+    todos = _casos_kernels(tamanhos)
+    todos.update(_casos_protocolo())
+    return todos
+
+def medir(funcao, repeticoes=20, aquecimento=3, tempo_minimo=0.05):
+    """
+    Mede o tempo por chamada de funcao.
+
+    O número de chamadas por repetição é escolhido (como em timeit.Timer.autorange)
+    para que cada repetição dure pelo menos tempo_minimo segundos; as primeiras
+    aquecimento repetições são descartadas. Como no timeit, o coletor de lixo
+    fica desligado durante as medições.
+
+    Parâmetros:
+        funcao (callable): Função sem argumentos a ser medida.
+        repeticoes (int): Número de repetições registradas.
+        aquecimento (int): Repetições executadas e descartadas antes das medições.
+        tempo_minimo (float): Duração mínima de cada repetição em segundos.
+
+    Retorna:
+        amostras (list): Tempo por chamada, em segundos, de cada repetição.
+        chamadas (int): Número de chamadas por repetição.
+    """
+    temporizador = timeit.Timer(funcao)
+    chamadas = 1
+    while True:
+        if temporizador.timeit(chamadas) >= tempo_minimo:
+            break
+        chamadas *= 2
+    temporizador.repeat(aquecimento, chamadas)
+    return [total / chamadas for total in temporizador.repeat(repeticoes, chamadas)], chamadas
+
+def resumir(amostras, chamadas):
+    """
+    Calcula as estatísticas de um microbenchmark.
+
+    Retorna:
+        Dicionário com repetições, chamadas por repetição e mínimo, mediana,
+        média, desvio padrão, p90 e máximo do tempo por chamada (em segundos).
+    """
+    ordenadas = sorted(amostras)
+    return {
+        "repeticoes": len(ordenadas),
+        "chamadas": chamadas,
+        "min": ordenadas[0],
+        "mediana": statistics.median(ordenadas),
+        "media": statistics.fmean(ordenadas),
+        "desvio": statistics.stdev(ordenadas) if len(ordenadas) > 1 else 0.0,
+        "p90": ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.9))],
+        "max": ordenadas[-1],
+    }
+
+def executar_suite(filtro=None, tamanhos=TAMANHOS_PADRAO, repeticoes=20, aquecimento=3, tempo_minimo=0.05):
+    """
+    Executa os microbenchmarks cujo nome contém filtro (todos, se None).
+
+    Retorna:
+        Dicionário com o ambiente da execução ("ambiente") e o resumo de cada
+        microbenchmark ("resultados"), pronto para ser salvo como linha de base.
+    """
+    resultados = {}
+    for nome, funcao in casos(tamanhos).items():
+        if filtro and filtro not in nome:
+            continue
+        amostras, chamadas = medir(funcao, repeticoes, aquecimento, tempo_minimo)
+        resultados[nome] = resumir(amostras, chamadas)
+        print(f"{nome:40s} {resultados[nome]['mediana'] * 1e6:12.3f} µs (±{resultados[nome]['desvio'] * 1e6:.3f})")
+    return {
+        "ambiente": {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "maquina": socket.gethostname(),
+            "python": platform.python_version(),
+            "implementacao": platform.python_implementation(),
+            "plataforma": platform.platform(),
+            "processador": platform.processor(),
+            "cpus": os.cpu_count(),
+        },
+        "resultados": resultados,
+    }
+
+def comparar(atual, linha_de_base, limiar=0.10):
+    """
+    Compara uma execução com uma linha de base.
+
+    Um microbenchmark é marcado como regressão quando a mediana atual passa da
+    mediana da linha de base por mais de limiar (fração) e, para não confundir
+    ruído com regressão, o menor tempo atual também é maior que aquela mediana.
+    Melhorias são marcadas de forma simétrica.
+
+    Parâmetros:
+        atual (dict): Resultado de executar_suite.
+        linha_de_base (dict): Resultado salvo de uma execução anterior.
+        limiar (float): Variação relativa tolerada.
+
+    Retorna:
+        Dicionário {nome: {base, atual, razao, situacao}} com os microbenchmarks
+        presentes nas duas execuções; situacao é "regressao", "melhoria" ou "estavel".
+    """
+    comparacao = {}
+    for nome, resumo in atual["resultados"].items():
+        base = linha_de_base["resultados"].get(nome)
+        if base is None:
+            continue
+        razao = resumo["mediana"] / base["mediana"] if base["mediana"] else 0.0
+        if razao > 1 + limiar and resumo["min"] > base["mediana"]:
+            situacao = "regressao"
+        elif razao < 1 - limiar and resumo["max"] < base["mediana"]:
+            situacao = "melhoria"
+        else:
+            situacao = "estavel"
+        comparacao[nome] = {"base": base["mediana"], "atual": resumo["mediana"], "razao": razao, "situacao": situacao}
+    return comparacao
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks dos kernels de cálculo e da codificação do protocolo.")
+    parser.add_argument("--filtro", help="executa apenas os microbenchmarks cujo nome contém este texto")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO), help="valores de n dos intervalos (0, n)")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--aquecimento", type=int, default=3)
+    parser.add_argument("--tempo-minimo", type=float, default=0.05, help="duração mínima de cada repetição em segundos")
+    parser.add_argument("--salvar", help="grava o resultado como linha de base neste arquivo JSON")
+    parser.add_argument("--comparar", help="linha de base JSON de uma execução anterior")
+    parser.add_argument("--limiar", type=float, default=0.10, help="variação relativa da mediana considerada regressão")
+    args = parser.parse_args()
+
+    atual = executar_suite(args.filtro, args.tamanhos, args.repeticoes, args.aquecimento, args.tempo_minimo)
+    if args.salvar:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salvar)), exist_ok=True)
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(atual, arquivo, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            linha_de_base = json.load(arquivo)
+        comparacao = comparar(atual, linha_de_base, args.limiar)
+        for nome, dados in comparacao.items():
+            print(f"{nome:40s} x{dados['razao']:.3f} {dados['situacao']}")
+        regressoes = [nome for nome, dados in comparacao.items() if dados["situacao"] == "regressao"]
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.limiar:.0%}: {', '.join(regressoes)}")
+            sys.exit(1)
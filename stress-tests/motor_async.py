@@ -0,0 +1,400 @@
+import asyncio
+import os
+import resource
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tarefas
+from amostras import STATUS_FALHA, STATUS_NEGADO, STATUS_SUCESSO
+from histograma import HistogramaLatencia
+
+MENSAGEM_NEGADA = "Conexão negada:"
+
+# Fases de uma requisição, na ordem em que acontecem. A fase "calculo" ainda é
+# detalhada por kernel como "calculo_<kernel>" quando o gerador informa os tempos.
+FASES = ("espera", "dns", "conexao", "primeiro_byte", "calculo", "envio", "ack")
+
+class ResultadosCarga:
+    """
+    Acumula as medições de uma execução de carga.
+
+    Os registros são protegidos por um lock, então o mesmo acumulador pode ser
+    usado tanto pelo motor assíncrono quanto pelo modo com uma thread por cliente.
+
+    Com um gravador (amostras.GravadorAmostras), cada amostra também é gravada em
+    disco e, se guardar_amostras for False, as listas de tempos não são mantidas
+    na memória: os histogramas têm tamanho fixo e bastam para o resumo.
+
+    Parâmetros:
+        gravador (amostras.GravadorAmostras): Destino opcional das amostras brutas.
+        guardar_amostras (bool): Mantém connection_times e response_times na memória.
+
+    Atributos:
+        connection_times (list): Tempos de conexão em segundos.
+        response_times (list): Tempos de resposta (envio + ack) em segundos.
+        success_count (int): Número de clientes que concluíram o protocolo.
+        denial_count (int): Número de clientes negados pelo servidor.
+        failure_count (int): Número de clientes que falharam.
+        hist_conexao (HistogramaLatencia): Histograma dos tempos de conexão.
+        hist_resposta (HistogramaLatencia): Histograma dos tempos de resposta.
+        hist_total (HistogramaLatencia): Histograma do tempo entre o início
+            (planejado, no modo de malha aberta) e o ack do servidor.
+        hist_fases (dict): Histograma de cada fase da requisição (ver FASES).
+        duracao (float): Duração total da execução em segundos.
+    """
+    def __init__(self, gravador=None, guardar_amostras=True):
+        self.gravador = gravador
+        self.guardar_amostras = guardar_amostras
+        self.connection_times = []
+        self.response_times = []
+        self.success_count = 0
+        self.denial_count = 0
+        self.failure_count = 0
+        self.hist_conexao = HistogramaLatencia()
+        self.hist_resposta = HistogramaLatencia()
+        self.hist_total = HistogramaLatencia()
+        self.hist_fases = {}
+        self.duracao = 0.0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["lock"]
+        # Os arquivos abertos pelo gravador ficam no processo que os criou
+        estado["gravador"] = None
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.lock = threading.Lock()
+
+    def registrar_sucesso(self, connection_time, response_time, total_time, fases=None):
+        """
+        Registra um cliente que concluiu o protocolo.
+
+        Parâmetros:
+            connection_time (float): Tempo de conexão em segundos.
+            response_time (float): Tempo de resposta em segundos.
+            total_time (float): Tempo do início do cliente até o ack, em segundos.
+            fases (dict): Duração de cada fase em nanossegundos.
+        """
+        with self.lock:
+            if self.guardar_amostras:
+                self.connection_times.append(connection_time)
+                self.response_times.append(response_time)
+            self.success_count += 1
+            if self.gravador is not None:
+                self.gravador.gravar(STATUS_SUCESSO, connection_time, response_time, total_time, fases)
+        self.hist_conexao.registrar(connection_time)
+        self.hist_resposta.registrar(response_time)
+        self.hist_total.registrar(total_time)
+        if fases:
+            for fase, duracao in fases.items():
+                self._hist_fase(fase).registrar(duracao / 1e9)
+
+    def _hist_fase(self, fase):
+        with self.lock:
+            histograma = self.hist_fases.get(fase)
+            if histograma is None:
+                histograma = self.hist_fases[fase] = HistogramaLatencia()
+            return histograma
+
+    def registrar_negacao(self):
+        """
+        Registra um cliente negado pelo servidor (máximo de conexões atingido).
+        """
+        with self.lock:
+            self.denial_count += 1
+            if self.gravador is not None:
+                self.gravador.gravar(STATUS_NEGADO)
+
+    def registrar_falha(self):
+        """
+        Registra um cliente que falhou ao conectar ou durante o protocolo.
+        """
+        with self.lock:
+            self.failure_count += 1
+            if self.gravador is not None:
+                self.gravador.gravar(STATUS_FALHA)
+
+    def mesclar(self, outro):
+        """
+        Incorpora as medições de outro ResultadosCarga.
+
+        Parâmetros:
+            outro (ResultadosCarga): As medições a serem somadas a estas.
+        """
+        with self.lock:
+            if self.guardar_amostras:
+                self.connection_times.extend(outro.connection_times)
+                self.response_times.extend(outro.response_times)
+            self.success_count += outro.success_count
+            self.denial_count += outro.denial_count
+            self.failure_count += outro.failure_count
+            self.duracao = max(self.duracao, outro.duracao)
+        self.hist_conexao.mesclar(outro.hist_conexao)
+        self.hist_resposta.mesclar(outro.hist_resposta)
+        self.hist_total.mesclar(outro.hist_total)
+        for fase, histograma in outro.hist_fases.items():
+            self._hist_fase(fase).mesclar(histograma)
+
+    def resumo(self, num_clientes):
+        """
+        Gera o resumo numérico da execução.
+
+        Parâmetros:
+            num_clientes (int): O número de clientes simulados.
+
+        Retorna:
+            Dicionário com contagens, vazão e percentis de conexão, resposta e de cada fase.
+        """
+        ordem = {fase: indice for indice, fase in enumerate(FASES)}
+        fases = sorted(self.hist_fases, key=lambda fase: (ordem.get(fase, ordem["calculo"] if fase.startswith("calculo_") else len(ordem)), fase))
+        return {
+            "num_clientes": num_clientes,
+            "sucessos": self.success_count,
+            "negacoes": self.denial_count,
+            "falhas": self.failure_count,
+            "duracao_s": self.duracao,
+            "vazao_por_s": self.success_count / self.duracao if self.duracao else 0.0,
+            "tempo_conexao": self.hist_conexao.resumo(),
+            "tempo_resposta": self.hist_resposta.resumo(),
+            "tempo_total": self.hist_total.resumo(),
+            "fases": {fase: self.hist_fases[fase].resumo() for fase in fases},
+        }
+
+def ajustar_limite_descritores():
+    """
+    Eleva o limite flexível de descritores de arquivo até o limite rígido,
+    permitindo manter dezenas de milhares de sockets abertos no mesmo processo.
+
+    Retorna:
+        limite (int): O novo limite flexível.
+    """
+    flexivel, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if rigido == resource.RLIM_INFINITY or flexivel < rigido:
+        novo = rigido if rigido != resource.RLIM_INFINITY else max(flexivel, 1048576)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (novo, rigido))
+            flexivel = novo
+        except (ValueError, OSError):
+            pass
+    return flexivel
+
+def formatar_resultados(soma_pares, soma_impares, pi, trace_id=None):
+    """
+    Monta a mensagem de resultados no mesmo formato enviado pelo cliente real.
+
+    Parâmetros:
+        soma_pares (int): A soma dos números pares.
+        soma_impares (int): A soma dos números ímpares.
+        pi (float): O valor de PI calculado.
+        trace_id (str): Identificador de rastreamento a ser ecoado ao servidor.
+
+    Retorna:
+        A mensagem codificada (bytes).
+    """
+    mensagem = f"Soma dos números pares: {soma_pares}\n"
+    mensagem += f"Soma dos números ímpares: {soma_impares}\n"
+    mensagem += f"Cálculo de PI com o intervalo: {pi}\n"
+    if trace_id:
+        mensagem += f"Trace: {trace_id}\n"
+    return mensagem.encode()
+
+def interpretar_intervalo(mensagem):
+    """
+    Extrai o intervalo e o trace_id opcional da mensagem enviada pelo servidor.
+
+    Parâmetros:
+        mensagem (str): A mensagem recebida do servidor ("a b" ou "a b trace_id").
+
+    Retorna:
+        intervalo (tuple): O intervalo (tupla de dois inteiros) ou None se a mensagem for inválida.
+        trace_id (str): O identificador de rastreamento ou None.
+    """
+    partes = mensagem.split()
+    if len(partes) not in (2, 3):
+        return None, None
+    try:
+        intervalo = int(partes[0]), int(partes[1])
+    except ValueError:
+        return None, None
+    return intervalo, (partes[2] if len(partes) == 3 else None)
+
+def _eh_cancelamento(linha):
+    controle = tarefas.interpretar_controle(linha.decode(errors="replace").strip())
+    return controle is not None and controle["controle"] == tarefas.CONTROLE_CANCELAR
+
+async def _vigiar_cancelamento(reader, estado):
+    # Equivalente assíncrono de tarefas.vigiar_cancelamento: marca o cancelamento
+    # quando o servidor o envia (ou fecha a conexão) durante o cálculo
+    while not estado["cancelado"]:
+        linha = await reader.readline()
+        if not linha or _eh_cancelamento(linha):
+            estado["cancelado"] = True
+
+async def _ler_ack(reader, timeout):
+    # Um cancelamento que chegou depois do fim do cálculo não é a confirmação
+    while True:
+        linha = await asyncio.wait_for(reader.readline(), timeout)
+        if not linha or not _eh_cancelamento(linha):
+            return linha
+
+async def cliente_async(host, porta, resultados, gerar_resultados, usar_executor=False, timeout=30, inicio_planejado=None):
+    """
+    Executa o fluxo de um cliente simulado: conexão, intervalo, resultados e ack.
+    Se o servidor atribuir um bloco de tarefa (ver tarefas.py) em vez de um
+    intervalo, o bloco é calculado pelo kernel registrado e gerar_resultados
+    não é usado.
+
+    Cada fase é medida com time.perf_counter_ns e registrada em um dicionário
+    {fase: nanossegundos} (ver FASES). Quando inicio_planejado é informado, a
+    fase "espera" guarda o atraso até o cliente de fato começar, e os tempos de
+    conexão e total passam a contar a partir dele, de modo que atrasos do próprio
+    gerador ou do servidor não sejam omitidos.
+
+    Como o cliente real, o cliente atende ao cancelamento do servidor
+    (tarefas.codificar_cancelamento): um bloco de tarefa, sempre calculado no
+    executor, cancelado no meio do cálculo é respondido com o resultado do
+    prefixo já calculado (ver tarefas.executar_atribuicao). No protocolo original os
+    resultados de gerar_resultados são enviados inteiros; em ambos os casos a
+    mensagem de controle não é confundida com a confirmação do servidor.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        resultados (ResultadosCarga): Onde as medições são acumuladas.
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo), onde tempos_calculo é
+            um dicionário {kernel: nanossegundos}, possivelmente vazio.
+        usar_executor (bool): Executa gerar_resultados fora do laço de eventos
+            (cálculo real); blocos de tarefa sempre são executados fora dele.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        inicio_planejado (int): Instante planejado de início (time.perf_counter_ns).
+    """
+    fases = {}
+    agora = time.perf_counter_ns()
+    inicio = inicio_planejado if inicio_planejado is not None else agora
+    if inicio_planejado is not None:
+        fases["espera"] = max(0, agora - inicio_planejado)
+
+    loop = asyncio.get_running_loop()
+    try:
+        enderecos = await asyncio.wait_for(loop.getaddrinfo(host, porta, type=socket.SOCK_STREAM), timeout)
+        marca = time.perf_counter_ns()
+        fases["dns"] = marca - agora
+        familia, _, _, _, endereco = enderecos[0]
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(endereco[0], endereco[1], family=familia), timeout)
+    except (OSError, asyncio.TimeoutError):
+        resultados.registrar_falha()
+        return
+    conectado = time.perf_counter_ns()
+    fases["conexao"] = conectado - marca
+
+    vigia = None
+    try:
+        linha = await asyncio.wait_for(reader.readline(), timeout)
+        marca = time.perf_counter_ns()
+        fases["primeiro_byte"] = marca - conectado
+        mensagem = linha.decode().strip()
+        if mensagem.startswith(MENSAGEM_NEGADA):
+            resultados.registrar_negacao()
+            return
+
+        # O cálculo só é interrompido fora do laço de eventos, onde a vigia continua lendo a conexão
+        estado = {"cancelado": False}
+        vigia = asyncio.create_task(_vigiar_cancelamento(reader, estado))
+        atribuicao = tarefas.interpretar_atribuicao(mensagem)
+        if atribuicao is not None:
+            # Blocos de tarefa são sempre calculados de verdade (o servidor combina
+            # os resultados), então vão para o executor mesmo sem usar_executor:
+            # no laço de eventos eles travariam os demais clientes e o cancelamento
+            resposta, duracao = await loop.run_in_executor(None, tarefas.executar_atribuicao, atribuicao, lambda: estado["cancelado"])
+            tempos_calculo = {atribuicao["tarefa"]: duracao}
+            dados = tarefas.codificar_resposta(resposta)
+        else:
+            intervalo, trace_id = interpretar_intervalo(mensagem)
+            if intervalo is None:
+                resultados.registrar_falha()
+                return
+
+            if usar_executor:
+                soma_pares, soma_impares, pi, tempos_calculo = await loop.run_in_executor(None, gerar_resultados, intervalo)
+            else:
+                soma_pares, soma_impares, pi, tempos_calculo = gerar_resultados(intervalo)
+            dados = formatar_resultados(soma_pares, soma_impares, pi, trace_id)
+        envio = time.perf_counter_ns()
+        fases["calculo"] = envio - marca
+        for kernel, duracao in tempos_calculo.items():
+            fases[f"calculo_{kernel}"] = duracao
+
+        vigia.cancel()
+        await asyncio.wait([vigia])
+        writer.write(dados)
+        await writer.drain()
+        marca = time.perf_counter_ns()
+        fases["envio"] = marca - envio
+        await _ler_ack(reader, timeout)
+        fim = time.perf_counter_ns()
+        fases["ack"] = fim - marca
+
+        resultados.registrar_sucesso((conectado - inicio) / 1e9, (fim - envio) / 1e9, (fim - inicio) / 1e9, fases)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        # ValueError inclui UnicodeDecodeError (mensagem do servidor que não é UTF-8)
+        resultados.registrar_falha()
+    finally:
+        if vigia is not None:
+            vigia.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+async def aguardar_clientes(clientes, resultados):
+    """
+    Espera todos os clientes terminarem. Um cliente que termina com uma
+    exceção inesperada conta como falha, sem interromper os demais.
+
+    Parâmetros:
+        clientes (iterable): Corrotinas ou tarefas de cliente_async.
+        resultados (ResultadosCarga): Onde as falhas são acumuladas.
+    """
+    for retorno in await asyncio.gather(*clientes, return_exceptions=True):
+        if isinstance(retorno, Exception):
+            resultados.registrar_falha()
+
+async def _executar_clientes(host, porta, num_clientes, resultados, gerar_resultados, usar_executor, timeout):
+    await aguardar_clientes((
+        cliente_async(host, porta, resultados, gerar_resultados, usar_executor, timeout)
+        for _ in range(num_clientes)
+    ), resultados)
+
+def executar_clientes(host, porta, num_clientes, gerar_resultados, usar_executor=False, timeout=30, resultados=None):
+    """
+    Dispara num_clientes clientes simulados concorrentes em um único laço asyncio.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        num_clientes (int): O número de clientes a serem simulados.
+        gerar_resultados (callable): Recebe o intervalo e retorna
+            (soma_pares, soma_impares, pi, tempos_calculo); ver cliente_async.
+        usar_executor (bool): Executa gerar_resultados em um pool de threads.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        resultados (ResultadosCarga): Acumulador a ser usado; um novo é criado se omitido.
+
+    Retorna:
+        resultados (ResultadosCarga): As medições da execução.
+    """
+    ajustar_limite_descritores()
+    if resultados is None:
+        resultados = ResultadosCarga()
+    inicio = time.perf_counter()
+    asyncio.run(_executar_clientes(host, porta, num_clientes, resultados, gerar_resultados, usar_executor, timeout))
+    resultados.duracao = time.perf_counter() - inicio
+    return resultados
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import os
+
+from amostras import STATUS_NEGADO, STATUS_SUCESSO, carregar_captura
+
+PERCENTIS = (50, 90, 99, 99.9)
+
+def resolver_captura(caminho):
+    """
+    Aceita tanto o diretório da captura quanto o diretório da execução que a
+    contém (ex.: "1000", onde a captura fica em "1000/amostras").
+    """
+    interna = os.path.join(caminho, "amostras")
+    return interna if os.path.isdir(interna) else caminho
+
+def save_graphs(N, success_count, failure_count, network_latency, response_times, connection_times, pasta=None):
+    """
+    Salva os gráficos gerados.
+
+    Parâmetros:
+        N (int): O número de clientes.
+        success_count (int): O número de conexões bem-sucedidas.
+        failure_count (int): O número de conexões falhadas.
+        network_latency (numpy.array): Array com os tempos de latência da rede.
+        response_times (list): Lista com os tempos de resposta.
+        connection_times (list): Lista com os tempos de conexão.
+        pasta (str): Diretório de saída; por padrão, o diretório N ao lado deste script.
+    """
+    import matplotlib.pyplot as plt
+
+    # Criar o diretório para salvar os gráficos
+    if pasta is None:
+        pasta = os.path.join(os.path.dirname(os.path.abspath(__file__)), str(N))
+    folder_name = pasta
+    if not os.path.exists(folder_name):
+        os.makedirs(folder_name)
+
+    # Gráfico de pizza para taxa de sucesso/falha
+    fig, ax = plt.subplots(2, 1, figsize=(10, 5))
+    ax[0].pie([success_count, failure_count], labels=['Sucesso', 'Falha'], autopct='%1.1f%%', startangle=140)
+    ax[0].set_title('Taxa de Sucesso/Falha')
+
+    # Histograma para latência da rede
+    ax[1].hist(network_latency, bins=20, color='skyblue', edgecolor='black')
+    ax[1].set_xlabel('Latência da Rede (s)')
+    ax[1].set_ylabel('Frequência')
+    ax[1].set_title('Distribuição da Latência da Rede')
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(folder_name, 'taxa_sucesso_falha_e_latencia.png'))
+    plt.close()
+
+    # Gráfico de barras para tempo médio de resposta do servidor
+    fig, ax = plt.subplots(2, 1, figsize=(10, 5))
+    ax[0].hist(response_times, bins=20, color='skyblue', edgecolor='black')
+    ax[0].set_xlabel('Tempo de Resposta (s)')
+    ax[0].set_ylabel('Frequência')
+    ax[0].set_title('Distribuição do Tempo de Resposta do Servidor')
+
+    # Gráfico de barras para tempo de conexão
+    ax[1].hist(connection_times, bins=20, color='lightgreen', edgecolor='black')
+    ax[1].set_xlabel('Tempo de Conexão (s)')
+    ax[1].set_ylabel('Frequência')
+    ax[1].set_title('Distribuição do Tempo de Conexão')
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(folder_name, 'distribuicao_tempo_resposta_e_conexao.png'))
+    plt.close()
+
+    # Gráfico de linhas para tempo de resposta x número de conexões e tempo de conexão x número de conexões
+    fig, ax = plt.subplots(2, 1, figsize=(10, 5))
+    ax[0].plot(response_times)
+    ax[0].set_xlabel('Número de conexões')
+    ax[0].set_ylabel('Tempo de resposta (s)')
+    ax[0].set_title('Tempo de resposta x Número de conexões')
+
+    ax[1].plot(connection_times)
+    ax[1].set_xlabel('Número de conexões')
+    ax[1].set_ylabel('Tempo de conexão (s)')
+    ax[1].set_title('Tempo de conexão x Número de conexões')
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(folder_name, 'tempo_resposta_e_conexao_x_num_conexoes.png'))
+    plt.close()
+
+def gerar_graficos(caminho, pasta=None):
+    """
+    Gera os gráficos de save_graphs a partir de uma captura gravada em disco.
+
+    Parâmetros:
+        caminho (str): Diretório da execução ou da captura.
+        pasta (str): Diretório de saída; por padrão, o diretório da execução.
+    """
+    captura = resolver_captura(caminho)
+    meta, colunas = carregar_captura(captura)
+    sucesso = colunas["status"] == STATUS_SUCESSO
+    connection_times = colunas["conexao"][sucesso]
+    response_times = colunas["resposta"][sucesso]
+    if pasta is None:
+        pasta = os.path.dirname(os.path.abspath(captura)) if captura != caminho else captura
+    num_sucessos = int(sucesso.sum())
+    save_graphs(meta.get("num_clientes", meta["amostras"]), num_sucessos, meta["amostras"] - num_sucessos,
+                connection_times, response_times, connection_times, pasta)
+
+def estatisticas(caminho):
+    """
+    Calcula contagens, vazão, percentis do tempo total e a média de cada fase de
+    uma captura.
+
+    Retorna:
+        Dicionário com as estatísticas (tempos em segundos) e os tempos totais
+        dos sucessos (array NumPy), usados nas comparações.
+    """
+    import numpy as np
+
+    meta, colunas = carregar_captura(resolver_captura(caminho))
+    status = colunas["status"]
+    sucesso = status == STATUS_SUCESSO
+    total = np.asarray(colunas["total"][sucesso])
+    sucessos = int(sucesso.sum())
+    negacoes = int((status == STATUS_NEGADO).sum())
+    duracao = meta.get("duracao_s", 0.0)
+    linha = {
+        "execucao": os.path.basename(os.path.normpath(caminho)),
+        "amostras": meta["amostras"],
+        "sucessos": sucessos,
+        "negacoes": negacoes,
+        "falhas": meta["amostras"] - sucessos - negacoes,
+        "vazao_por_s": sucessos / duracao if duracao else 0.0,
+    }
+    for p in PERCENTIS:
+        linha[f"p{p}"] = float(np.percentile(total, p)) if total.size else 0.0
+    for nome, coluna in colunas.items():
+        if nome.startswith("fase_"):
+            valores = coluna[sucesso]
+            valores = valores[valores >= 0]
+            linha[f"media_{nome[len('fase_'):]}"] = float(valores.mean()) / 1e9 if valores.size else 0.0
+    return linha, total
+
+def comparar(caminhos, pasta):
+    """
+    Compara várias execuções: grava comparacao.csv (uma linha por execução) e
+    comparacao.png (CDF do tempo total e p50/p99 de cada execução).
+
+    Parâmetros:
+        caminhos (list): Diretórios das execuções ou das capturas.
+        pasta (str): Diretório de saída.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    os.makedirs(pasta, exist_ok=True)
+    linhas = []
+    fig, ax = plt.subplots(2, 1, figsize=(10, 8))
+    for caminho in caminhos:
+        linha, total = estatisticas(caminho)
+        linhas.append(linha)
+        if total.size:
+            ordenado = np.sort(total)
+            ax[0].plot(ordenado, np.arange(1, ordenado.size + 1) / ordenado.size, label=linha["execucao"])
+    ax[0].set_xscale('log')
+    ax[0].set_xlabel('Tempo total (s)')
+    ax[0].set_ylabel('Fração das requisições')
+    ax[0].set_title('CDF do tempo total')
+    ax[0].legend()
+
+    nomes = [linha["execucao"] for linha in linhas]
+    posicoes = np.arange(len(nomes))
+    ax[1].bar(posicoes - 0.2, [linha["p50"] for linha in linhas], 0.4, label='p50')
+    ax[1].bar(posicoes + 0.2, [linha["p99"] for linha in linhas], 0.4, label='p99')
+    ax[1].set_xticks(posicoes)
+    ax[1].set_xticklabels(nomes)
+    ax[1].set_ylabel('Tempo total (s)')
+    ax[1].set_title('Percentis por execução')
+    ax[1].legend()
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(pasta, 'comparacao.png'))
+    plt.close()
+
+    colunas = []
+    for linha in linhas:
+        for chave in linha:
+            if chave not in colunas:
+                colunas.append(chave)
+    with open(os.path.join(pasta, "comparacao.csv"), "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        escritor.writerows(linhas)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os gráficos e comparações a partir das amostras gravadas pelos testes de carga.")
+    parser.add_argument("execucoes", nargs="+", help="diretórios das execuções (ex.: 100 1000 10000) ou das capturas")
+    parser.add_argument("--saida", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "comparacao"),
+                        help="diretório da comparação entre execuções")
+    parser.add_argument("--sem-graficos", action="store_true", help="gera apenas a comparação")
+    args = parser.parse_args()
+    if not args.sem_graficos:
+        for execucao in args.execucoes:
+            gerar_graficos(execucao)
+    if len(args.execucoes) > 1:
+        comparar(args.execucoes, args.saida)
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import motor_async
+import tarefas
+from gravacao_trafego import ENVIADO, FIM, RECEBIDO, carregar_trafego, resumir
+
+def ajustar_tamanho(dados, tamanho):
+    """
+    Completa (com espaços antes do fim de linha) ou corta uma mensagem para
+    que ela tenha o tamanho gravado, sem quebrar caracteres UTF-8.
+
+    Parâmetros:
+        dados (bytes): A mensagem montada pelo reprodutor.
+        tamanho (int): O tamanho gravado, em bytes.
+
+    Retorna:
+        A mensagem com tamanho bytes (bytes).
+    """
+    fim_linha = b"\n" if dados.endswith(b"\n") else b""
+    corpo = dados[:len(dados) - len(fim_linha)]
+    espaco = max(0, tamanho - len(fim_linha))
+    if len(corpo) > espaco:
+        corpo = corpo[:espaco].decode(errors="ignore").encode()
+    return corpo + b" " * (espaco - len(corpo)) + fim_linha[:tamanho]
+
+def montar_mensagens(primeira_linha, tamanhos):
+    """
+    Monta as mensagens do cliente, com os tamanhos gravados e válidas para o
+    protocolo que o servidor usou nesta conexão.
+
+    Num bloco de tarefa, a resposta é uma resposta de erro (o servidor devolve
+    o bloco para a fila) completada até a soma dos tamanhos e dividida nos
+    tamanhos gravados: o servidor junta os pedaços até o fim da linha. No
+    protocolo original, cada recv é tratado como uma mensagem, e um recv em
+    branco como o fim dos resultados; por isso a primeira mensagem traz os
+    resultados no formato do cliente real e as seguintes são linhas de
+    preenchimento não vazias.
+
+    Parâmetros:
+        primeira_linha (str): A primeira linha enviada pelo servidor.
+        tamanhos (list): O tamanho gravado de cada mensagem do cliente, em bytes.
+
+    Retorna:
+        As mensagens (lista de bytes).
+    """
+    if not tamanhos:
+        return []
+    atribuicao = tarefas.interpretar_atribuicao(primeira_linha)
+    if atribuicao is not None:
+        resposta = {"tarefa": atribuicao["tarefa"], "versao": atribuicao["versao"], "bloco": atribuicao["bloco"], "erro": "reprodução de tráfego"}
+        if atribuicao.get("trace_id"):
+            resposta["trace_id"] = atribuicao["trace_id"]
+        dados = ajustar_tamanho(tarefas.codificar_resposta(resposta), sum(tamanhos))
+        mensagens = []
+        for tamanho in tamanhos[:-1]:
+            mensagens.append(dados[:tamanho])
+            dados = dados[tamanho:]
+        # Se a resposta não coube nos tamanhos gravados, o excesso vai no último pedaço
+        return mensagens + [dados]
+    _, trace_id = motor_async.interpretar_intervalo(primeira_linha)
+    mensagens = [ajustar_tamanho(motor_async.formatar_resultados(0, 0, 0.0, trace_id), tamanhos[0])]
+    for tamanho in tamanhos[1:]:
+        mensagens.append(ajustar_tamanho(b"." * max(0, tamanho - 1) + b"\n", tamanho) if tamanho > 1 else b".")
+    return mensagens
+
+async def reproduzir_conexao(host, porta, eventos, velocidade, resultados, inicio_planejado, calcular=False, timeout=30):
+    """
+    Reproduz uma conexão gravada: conecta, lê cada mensagem que o servidor
+    enviou na gravação e envia cada mensagem do cliente com o tamanho gravado,
+    depois do mesmo intervalo (dividido por velocidade) que a separava do
+    evento anterior. No fim, fecha o lado de escrita e espera o servidor fechar.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        eventos (list): Eventos (tipo, ns, bytes) da conexão (ver carregar_trafego).
+        velocidade (float): Fator de aceleração (2 reproduz duas vezes mais rápido).
+        resultados (motor_async.ResultadosCarga): Onde as medições são acumuladas.
+        inicio_planejado (int): Instante planejado da chegada (time.perf_counter_ns).
+        calcular (bool): Calcula de verdade os blocos de tarefa recebidos (o
+            tempo de cálculo é descontado do intervalo gravado) em vez de
+            responder com erro.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+    """
+    fases = {}
+    agora = time.perf_counter_ns()
+    fases["espera"] = max(0, agora - inicio_planejado)
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, porta), timeout)
+    except (OSError, asyncio.TimeoutError):
+        resultados.registrar_falha()
+        return
+    conectado = time.perf_counter_ns()
+    fases["conexao"] = conectado - agora
+
+    loop = asyncio.get_running_loop()
+    primeira_linha = None
+    mensagens = None
+    enviadas = 0
+    fases["calculo"] = fases["envio"] = 0
+    anterior = eventos[0][1]
+    marca = ultimo_envio = conectado
+    try:
+        for tipo, instante, _ in eventos[1:]:
+            if tipo == ENVIADO:
+                linha = await asyncio.wait_for(reader.readline(), timeout)
+                if not linha:
+                    resultados.registrar_falha()
+                    return
+                if primeira_linha is None:
+                    primeira_linha = linha.decode(errors="replace").strip()
+                    fases["primeiro_byte"] = time.perf_counter_ns() - conectado
+                    if primeira_linha.startswith(motor_async.MENSAGEM_NEGADA):
+                        resultados.registrar_negacao()
+                        return
+            elif tipo == RECEBIDO:
+                intervalo_ns = (instante - anterior) / velocidade
+                if mensagens is None:
+                    atribuicao = tarefas.interpretar_atribuicao(primeira_linha or "") if calcular else None
+                    if atribuicao is not None:
+                        # A resposta calculada vai inteira no primeiro envio; os pedaços gravados seguintes são pulados
+                        resposta, _ = await loop.run_in_executor(None, tarefas.executar_atribuicao, atribuicao)
+                        mensagens = [tarefas.codificar_resposta(resposta)]
+                    else:
+                        mensagens = montar_mensagens(primeira_linha or "", [evento[2] for evento in eventos if evento[0] == RECEBIDO])
+                if enviadas >= len(mensagens):
+                    anterior = instante
+                    marca = time.perf_counter_ns()
+                    continue
+                dados = mensagens[enviadas]
+                espera = (marca + intervalo_ns - time.perf_counter_ns()) / 1e9
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                ultimo_envio = time.perf_counter_ns()
+                fases["calculo"] += ultimo_envio - marca
+                writer.write(dados)
+                await writer.drain()
+                enviadas += 1
+                fases["envio"] += time.perf_counter_ns() - ultimo_envio
+            elif tipo == FIM:
+                break
+            anterior = instante
+            marca = time.perf_counter_ns()
+        # O servidor fecha a conexão depois de ver o fim dos dados do cliente (ou de confirmar a resposta)
+        if writer.can_write_eof():
+            writer.write_eof()
+        await asyncio.wait_for(reader.read(), timeout)
+        fim = time.perf_counter_ns()
+        fases["ack"] = fim - ultimo_envio
+        resultados.registrar_sucesso((conectado - inicio_planejado) / 1e9, (fim - ultimo_envio) / 1e9, (fim - inicio_planejado) / 1e9, fases)
+    except (OSError, asyncio.TimeoutError):
+        resultados.registrar_falha()
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+async def reproduzir_async(host, porta, conexoes, velocidade, resultados, calcular=False, timeout=30):
+    """
+    Versão assíncrona de reproduzir, para ser combinada com outras tarefas no
+    mesmo laço de eventos.
+
+    Retorna:
+        num_clientes (int): O número de conexões reproduzidas.
+    """
+    tarefas_conexoes = []
+    if not conexoes:
+        return 0
+    primeira = conexoes[0][0][1]
+    base = time.perf_counter_ns()
+    for eventos in conexoes:
+        inicio_planejado = base + int((eventos[0][1] - primeira) / velocidade)
+        espera = (inicio_planejado - time.perf_counter_ns()) / 1e9
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarefas_conexoes.append(asyncio.create_task(reproduzir_conexao(
+            host, porta, eventos, velocidade, resultados, inicio_planejado, calcular, timeout,
+        )))
+    await asyncio.gather(*tarefas_conexoes)
+    return len(tarefas_conexoes)
+
+def reproduzir(host, porta, conexoes, velocidade=1.0, calcular=False, timeout=30, resultados=None):
+    """
+    Reproduz uma gravação de tráfego (ver gravacao_trafego.GravadorTrafego)
+    contra um servidor: cada conexão começa no instante gravado, dividido por
+    velocidade, independentemente de as anteriores já terem terminado, e suas
+    mensagens mantêm os tamanhos e os intervalos gravados. As rajadas e a
+    mistura de conexões rápidas e lentas da carga real são preservadas.
+
+    Como no modo de malha aberta, os tempos são medidos a partir do instante
+    planejado, e a fase "espera" guarda o atraso do próprio reprodutor.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        conexoes (list): Conexões retornadas por carregar_trafego.
+        velocidade (float): Fator de aceleração; 1 reproduz no tempo original.
+        calcular (bool): Calcula de verdade os blocos de tarefa (ver reproduzir_conexao).
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+        resultados (motor_async.ResultadosCarga): Acumulador a ser usado; um novo é criado se omitido.
+
+    Retorna:
+        resultados (motor_async.ResultadosCarga): As medições da reprodução.
+        num_clientes (int): O número de conexões reproduzidas.
+    """
+    if velocidade <= 0:
+        raise ValueError("velocidade deve ser positiva")
+    motor_async.ajustar_limite_descritores()
+    if resultados is None:
+        resultados = motor_async.ResultadosCarga()
+    inicio = time.perf_counter()
+    num_clientes = asyncio.run(reproduzir_async(host, porta, conexoes, velocidade, resultados, calcular, timeout))
+    resultados.duracao = time.perf_counter() - inicio
+    return resultados, num_clientes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduz contra um servidor o tráfego gravado por outro (SERVIDOR_ARQUIVO_TRAFEGO ou servidor_local.py --gravar-trafego).")
+    parser.add_argument("gravacao", help="arquivo gravado pelo GravadorTrafego")
+    parser.add_argument("--alvo", help="host:porta do servidor; sem ele, sobe um servidor local (ver servidor_local.py)")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="fator de aceleração (2 reproduz duas vezes mais rápido)")
+    parser.add_argument("--calcular", action="store_true", help="calcula de verdade os blocos de tarefa em vez de responder com erro")
+    parser.add_argument("--tarefa", help="especificação JSON (ou arquivo) de um trabalho para o servidor local")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--salvar", help="grava o resumo neste arquivo JSON")
+    args = parser.parse_args()
+
+    _, conexoes = carregar_trafego(args.gravacao)
+    gravacao = resumir(conexoes)
+    print(f"Gravação: {gravacao['conexoes']} conexões em {gravacao['duracao_s']:.1f}s, pico de {gravacao['taxa_maxima_por_s']} conexões/s")
+    if args.alvo:
+        host, porta = args.alvo.rsplit(":", 1)
+        resultados, num_clientes = reproduzir(host, int(porta), conexoes, args.velocidade, args.calcular, args.timeout)
+    else:
+        from servidor_local import HOST_LOCAL, ServidorLocal
+
+        with ServidorLocal(tarefa=args.tarefa) as servidor:
+            resultados, num_clientes = reproduzir(HOST_LOCAL, servidor.porta, conexoes, args.velocidade, args.calcular, args.timeout)
+    resumo = resultados.resumo(num_clientes)
+    resumo["velocidade"] = args.velocidade
+    resumo["gravacao"] = gravacao
+    print(f"Reprodução x{args.velocidade:g}: {resumo['sucessos']}/{num_clientes} sucessos, {resumo['negacoes']} negações, "
+          f"{resumo['falhas']} falhas, p50 {resumo['tempo_total']['p50'] * 1000:.2f} ms, p99 {resumo['tempo_total']['p99'] * 1000:.2f} ms")
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
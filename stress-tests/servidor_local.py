@@ -0,0 +1,260 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import executor_cenarios
+import motor_async
+import tarefas
+from federacao import TrabalhoFederado
+from gravacao_trafego import GravadorTrafego
+from nucleo_servidor import Server
+from rastreamento import Rastreador
+
+HOST_LOCAL = "127.0.0.1"
+CENARIO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cenarios", "loopback.toml")
+
+def _descartar(*args):
+    pass
+
+def _criar_servidor(config):
+    # Retorna o servidor e o arquivo de log (ou None), a ser fechado depois de Server.stop()
+    arquivo_log = None
+    if config["arquivo_log"]:
+        arquivo_log = open(config["arquivo_log"], "a", encoding="utf-8")
+
+        def log_callback(mensagem):
+            # Handlers ainda em andamento podem registrar depois do fechamento
+            if not arquivo_log.closed:
+                arquivo_log.write(mensagem + "\n")
+    else:
+        log_callback = _descartar
+    rastreador = Rastreador(config["arquivo_trace"], "servidor", config["amostragem_trace"])
+    if config["coordenador"]:
+        trabalho = TrabalhoFederado(config["coordenador"], log_callback=log_callback)
+    else:
+        trabalho = tarefas.criar_trabalho(config["tarefa"], log_callback=log_callback) if config["tarefa"] else None
+    server = Server(HOST_LOCAL, 0, config["max_conexoes"], log_callback, _descartar, config["arquivo_metricas"],
+                  config["intervalo_metricas"], rastreador, config["trabalhadores"], trabalho, config["processos_locais"],
+                  taxa_por_ip=config["taxa_por_ip"], rajada_por_ip=config["rajada_por_ip"], conexoes_por_ip=config["conexoes_por_ip"],
+                  gravador_trafego=GravadorTrafego(config["arquivo_trafego"]), idade_retardatario=config["idade_retardatario"])
+    return server, arquivo_log
+
+def _processo_servidor(config, conexao):
+    server, arquivo_log = _criar_servidor(config)
+    threading.Thread(target=server.start, daemon=True).start()
+    server.escutando.wait()
+    conexao.send(server.port)
+    while True:
+        try:
+            comando = conexao.recv()
+        except EOFError:
+            break
+        if comando != "metricas":
+            break
+        conexao.send(server.metricas())
+    server.stop()
+    if arquivo_log:
+        arquivo_log.close()
+
+class ServidorLocal:
+    """
+    Sobe um Server sem interface gráfica em 127.0.0.1, numa porta escolhida pelo
+    sistema, e o derruba ao final (também pode ser usado com with).
+
+    No modo "processo" (padrão) o servidor roda em um processo filho e não
+    disputa o GIL com o gerador de carga; no modo "thread" ele roda no próprio
+    processo, o que permite inspecioná-lo diretamente (self.server).
+
+    Parâmetros:
+        modo (str): "processo" ou "thread".
+        max_conexoes (int): Limite repassado a Server (comparado com o total de
+            conexões aceitas desde que o servidor subiu).
+        trabalhadores (int): Threads que atendem os clientes; padrão é o número de núcleos.
+        arquivo_metricas (str): Arquivo JSON lines de métricas (ver MonitorRecursos).
+        intervalo_metricas (float): Segundos entre amostras de métricas.
+        arquivo_trace (str): Arquivo de spans do servidor (ver Rastreador).
+        amostragem_trace (float): Fração dos intervalos rastreados.
+        arquivo_log (str): Arquivo para as mensagens de log; None as descarta.
+        tarefa: Especificação de um trabalho distribuído em blocos (ver
+            tarefas.criar_trabalho); None usa o protocolo original.
+        processos_locais (int): Processos do servidor que também calculam blocos
+            da tarefa quando há poucos clientes (ver TrabalhadoresLocais).
+        coordenador (str): "host:porta" de um federacao.Coordenador; o servidor
+            vira um nó que divide o trabalho do coordenador com outros servidores
+            (no lugar de tarefa).
+        taxa_por_ip (float): Conexões por segundo admitidas de cada IP (ver AdmissaoPorIP).
+        rajada_por_ip (float): Rajada de conexões admitida de cada IP.
+        conexoes_por_ip (int): Conexões simultâneas em atendimento por IP.
+        arquivo_trafego (str): Arquivo onde o servidor grava a forma do tráfego
+            recebido (ver GravadorTrafego e reproducao_trafego.py).
+        idade_retardatario (float): Segundos a partir dos quais um bloco em
+            cálculo é cancelado e o restante redistribuído (ver Server).
+        timeout (float): Tempo máximo em segundos para o servidor subir ou parar.
+
+    Atributos:
+        porta (int): A porta em que o servidor está escutando.
+        alvo (str): "127.0.0.1:<porta>", no formato dos alvos dos cenários.
+    """
+    def __init__(self, modo="processo", max_conexoes=10000000, trabalhadores=None, arquivo_metricas=None, intervalo_metricas=5.0,
+                 arquivo_trace=None, amostragem_trace=1.0, arquivo_log=None, tarefa=None, processos_locais=0, coordenador=None,
+                 taxa_por_ip=None, rajada_por_ip=None, conexoes_por_ip=None, arquivo_trafego=None,
+                 idade_retardatario=None, timeout=10):
+        if modo not in ("processo", "thread"):
+            raise ValueError("modo deve ser processo ou thread")
+        self.modo = modo
+        self.timeout = timeout
+        self.config = {
+            "max_conexoes": max_conexoes,
+            "trabalhadores": trabalhadores,
+            "arquivo_metricas": arquivo_metricas,
+            "intervalo_metricas": intervalo_metricas,
+            "arquivo_trace": arquivo_trace,
+            "amostragem_trace": amostragem_trace,
+            "arquivo_log": arquivo_log,
+            "tarefa": tarefa,
+            "processos_locais": processos_locais,
+            "coordenador": coordenador,
+            "taxa_por_ip": taxa_por_ip,
+            "rajada_por_ip": rajada_por_ip,
+            "conexoes_por_ip": conexoes_por_ip,
+            "arquivo_trafego": arquivo_trafego,
+            "idade_retardatario": idade_retardatario,
+        }
+        self.porta = None
+        self.server = None
+        self.arquivo_log = None
+        self.processo = None
+
+    @property
+    def alvo(self):
+        return f"{HOST_LOCAL}:{self.porta}"
+
+    def iniciar(self):
+        """
+        Sobe o servidor e espera até que ele esteja escutando.
+
+        Retorna:
+            porta (int): A porta escolhida pelo sistema.
+        """
+        motor_async.ajustar_limite_descritores()
+        if self.modo == "thread":
+            self.server, self.arquivo_log = _criar_servidor(self.config)
+            threading.Thread(target=self.server.start, daemon=True).start()
+            if not self.server.escutando.wait(self.timeout):
+                raise RuntimeError("o servidor local não começou a escutar")
+            self.porta = self.server.port
+        else:
+            self.conexao, conexao_filho = multiprocessing.Pipe()
+            self.processo = multiprocessing.Process(target=_processo_servidor, args=(self.config, conexao_filho), daemon=True)
+            self.processo.start()
+            if not self.conexao.poll(self.timeout):
+                self.processo.terminate()
+                raise RuntimeError("o servidor local não começou a escutar")
+            self.porta = self.conexao.recv()
+        return self.porta
+
+    def metricas(self):
+        """
+        Retorna Server.metricas() do servidor local.
+        """
+        if self.modo == "thread":
+            return self.server.metricas()
+        self.conexao.send("metricas")
+        return self.conexao.recv()
+
+    def parar(self):
+        """
+        Para o servidor e, no modo "processo", encerra o processo filho.
+        """
+        if self.modo == "thread":
+            if self.server:
+                self.server.stop()
+                self.server = None
+            if self.arquivo_log:
+                self.arquivo_log.close()
+                self.arquivo_log = None
+            return
+        if self.processo:
+            try:
+                self.conexao.send("parar")
+            except OSError:
+                pass
+            self.processo.join(self.timeout)
+            if self.processo.is_alive():
+                self.processo.terminate()
+                self.processo.join()
+            self.processo = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *excecao):
+        self.parar()
+
+def executar_loopback(caminho_cenario=CENARIO_PADRAO, pasta_saida=None, **opcoes_servidor):
+    """
+    Executa um cenário de carga de ponta a ponta contra um servidor local: sobe
+    o servidor, aponta todas as etapas do cenário para ele, executa o cenário e
+    derruba o servidor. Além do pacote de resultados do cenário, grava
+    servidor.json com a configuração do servidor e as métricas ao final.
+
+    Parâmetros:
+        caminho_cenario (str): Arquivo de cenário (ver executor_cenarios.carregar_cenario);
+            os alvos definidos nele são ignorados.
+        pasta_saida (str): Diretório de saída; padrão é resultados/<nome>/<data-hora>.
+        opcoes_servidor: Parâmetros de ServidorLocal.
+
+    Retorna:
+        pasta_saida (str): O diretório com os resultados.
+    """
+    cenario = executor_cenarios.carregar_cenario(caminho_cenario)
+    servidor = ServidorLocal(**opcoes_servidor)
+    with servidor:
+        executor_cenarios.substituir(cenario, "alvos", [servidor.alvo])
+        pasta_saida = executor_cenarios.executar_cenario(cenario, pasta_saida)
+        metricas = servidor.metricas()
+    with open(os.path.join(pasta_saida, "servidor.json"), "w", encoding="utf-8") as arquivo:
+        json.dump({"modo": servidor.modo, "configuracao": servidor.config, "metricas_finais": metricas}, arquivo, indent=2, ensure_ascii=False)
+    return pasta_saida
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa um cenário de carga contra um servidor local sem interface, de ponta a ponta.")
+    parser.add_argument("cenario", nargs="?", default=CENARIO_PADRAO, help="arquivo de cenário (padrão: cenarios/loopback.toml)")
+    parser.add_argument("--modo", choices=("processo", "thread"), default="processo")
+    parser.add_argument("--max-conexoes", type=int, default=10000000)
+    parser.add_argument("--trabalhadores", type=int, help="threads do servidor que atendem os clientes")
+    parser.add_argument("--metricas", help="arquivo JSON lines para as métricas do servidor")
+    parser.add_argument("--trace", help="arquivo para os spans do servidor")
+    parser.add_argument("--log", help="arquivo para as mensagens de log do servidor")
+    parser.add_argument("--tarefa", help="especificação JSON (ou arquivo) de um trabalho distribuído em blocos")
+    parser.add_argument("--coordenador", help="host:porta de um coordenador (federacao.py) cujo trabalho o servidor divide com outros")
+    parser.add_argument("--taxa-por-ip", type=float, help="conexões por segundo admitidas de cada IP")
+    parser.add_argument("--rajada-por-ip", type=float, help="rajada de conexões admitida de cada IP")
+    parser.add_argument("--conexoes-por-ip", type=int, help="conexões simultâneas em atendimento por IP")
+    parser.add_argument("--gravar-trafego", help="arquivo onde o servidor grava a forma do tráfego recebido")
+    parser.add_argument("--idade-retardatario", type=float, help="segundos a partir dos quais um bloco em cálculo é cancelado e o restante redistribuído")
+    parser.add_argument("--processos-locais", type=int, default=0, help="processos do servidor que também calculam blocos da tarefa")
+    parser.add_argument("--saida", help="diretório de saída")
+    args = parser.parse_args()
+
+    pasta = executar_loopback(args.cenario, args.saida, modo=args.modo, max_conexoes=args.max_conexoes, trabalhadores=args.trabalhadores,
+                              arquivo_metricas=args.metricas, arquivo_trace=args.trace, arquivo_log=args.log, tarefa=args.tarefa,
+                              processos_locais=args.processos_locais, coordenador=args.coordenador,
+                              taxa_por_ip=args.taxa_por_ip, rajada_por_ip=args.rajada_por_ip, conexoes_por_ip=args.conexoes_por_ip,
+                              arquivo_trafego=args.gravar_trafego, idade_retardatario=args.idade_retardatario)
+    with open(os.path.join(pasta, "indice.csv"), encoding="utf-8") as arquivo:
+        for linha in csv.DictReader(arquivo):
+            if linha.get("vazao_por_s"):
+                print(f"{linha['execucao']}: {float(linha['vazao_por_s']):.1f} req/s, "
+                      f"p50 {float(linha['total_p50']) * 1000:.2f} ms, p99 {float(linha['total_p99']) * 1000:.2f} ms, "
+                      f"{linha['sucessos']}/{linha['num_clientes']} sucessos")
+            else:
+                print(f"{linha['execucao']}: taxa máxima sustentável {linha.get('taxa_maxima_sustentavel')}")
+    print(f"Resultados em {pasta}")
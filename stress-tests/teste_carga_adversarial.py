@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import malha_aberta
+import motor_async
+from executor_cenarios import gerar_resultados_falsos
+
+TIPOS_ADVERSARIOS = ("nunca_le", "gotejamento", "grande", "lixo", "abandono")
+
+async def adversario(tipo, host, porta, duracao, contagem):
+    """
+    Executa um cliente mal-comportado durante até duracao segundos.
+
+    Tipos:
+        nunca_le: conecta e não lê nem envia nada, segurando a conexão.
+        gotejamento: recebe o intervalo e envia os resultados um byte por segundo.
+        grande: envia um payload de vários megabytes sem ler as confirmações.
+        lixo: envia bytes aleatórios (UTF-8 inválido).
+        abandono: recebe o intervalo, envia metade dos resultados e fecha a conexão.
+
+    Parâmetros:
+        tipo (str): Um dos TIPOS_ADVERSARIOS.
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        duracao (float): Tempo máximo em segundos que o adversário mantém a conexão.
+        contagem (dict): Contador de conexões estabelecidas por tipo.
+    """
+    fim = time.monotonic() + duracao
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, porta), duracao)
+    except (OSError, asyncio.TimeoutError):
+        return
+    contagem[tipo] = contagem.get(tipo, 0) + 1
+    try:
+        if tipo == "nunca_le":
+            await asyncio.sleep(max(0, fim - time.monotonic()))
+        elif tipo == "gotejamento":
+            await asyncio.wait_for(reader.readline(), duracao)
+            mensagem = motor_async.formatar_resultados(0, 0, 0.0)
+            for indice in range(len(mensagem)):
+                if time.monotonic() >= fim:
+                    break
+                writer.write(mensagem[indice:indice + 1])
+                await writer.drain()
+                await asyncio.sleep(1)
+        elif tipo == "grande":
+            await asyncio.wait_for(reader.readline(), duracao)
+            bloco = b"9" * 65536
+            while time.monotonic() < fim:
+                writer.write(bloco)
+                await asyncio.wait_for(writer.drain(), max(0.01, fim - time.monotonic()))
+        elif tipo == "lixo":
+            await asyncio.wait_for(reader.readline(), duracao)
+            writer.write(bytes(random.getrandbits(8) for _ in range(4096)))
+            await writer.drain()
+            await asyncio.sleep(max(0, fim - time.monotonic()))
+        elif tipo == "abandono":
+            await asyncio.wait_for(reader.readline(), duracao)
+            mensagem = motor_async.formatar_resultados(0, 0, 0.0)
+            writer.write(mensagem[:len(mensagem) // 2])
+            await writer.drain()
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        # Fecha sem esperar o esvaziamento do buffer de envio, que pode nunca
+        # acontecer se o servidor tiver parado de ler.
+        writer.transport.abort()
+
+async def _executar_misto(host, porta, taxa_bons, duracao, adversarios, resultados, contagem):
+    tarefas = [
+        asyncio.create_task(adversario(tipo, host, porta, duracao + 5, contagem))
+        for tipo, quantidade in adversarios.items()
+        for _ in range(quantidade)
+    ]
+    # Dá tempo para os adversários ocuparem o servidor antes dos clientes normais
+    await asyncio.sleep(0.5 if tarefas else 0)
+    inicio = time.perf_counter()
+    num_clientes = await malha_aberta.executar_perfil_async(
+        host, porta, malha_aberta.perfil_constante(taxa_bons, duracao), resultados, gerar_resultados_falsos,
+    )
+    resultados.duracao = time.perf_counter() - inicio
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    return num_clientes
+
+def executar_misto(host, porta, taxa_bons, duracao, adversarios):
+    """
+    Executa clientes normais em malha aberta junto com clientes mal-comportados.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        taxa_bons (float): Conexões por segundo dos clientes normais.
+        duracao (float): Duração da carga normal em segundos.
+        adversarios (dict): Quantidade de adversários por tipo.
+
+    Retorna:
+        Dicionário com o resumo dos clientes normais e as conexões adversárias abertas.
+    """
+    motor_async.ajustar_limite_descritores()
+    resultados = motor_async.ResultadosCarga()
+    contagem = {}
+    num_clientes = asyncio.run(_executar_misto(host, porta, taxa_bons, duracao, adversarios, resultados, contagem))
+    resumo = resultados.resumo(num_clientes)
+    resumo["adversarios"] = dict(adversarios)
+    resumo["conexoes_adversarias"] = contagem
+    return resumo
+
+def degradacao(base, misto):
+    """
+    Compara a vazão e o p99 dos clientes normais com e sem adversários.
+
+    Retorna:
+        Dicionário com as razões vazão_misto/vazão_base e p99_misto/p99_base e a
+        fração de clientes normais que não concluíram o protocolo.
+    """
+    p99_base = base["tempo_total"]["p99"]
+    p99_misto = misto["tempo_total"]["p99"]
+    return {
+        "razao_vazao": misto["vazao_por_s"] / base["vazao_por_s"] if base["vazao_por_s"] else 0.0,
+        "razao_p99": p99_misto / p99_base if p99_base else 0.0,
+        "fracao_falhas": 1 - misto["sucessos"] / misto["num_clientes"] if misto["num_clientes"] else 0.0,
+    }
+
+def main(host, porta, taxa_bons, duracao, quantidade_adversarios):
+    """
+    Mede a resiliência do servidor: executa a carga normal sozinha (linha de base)
+    e depois junto com cada tipo de adversário e com todos eles misturados, e
+    salva adversarial/relatorio.json com a degradação de vazão e p99.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        taxa_bons (float): Conexões por segundo dos clientes normais.
+        duracao (float): Duração de cada cenário em segundos.
+        quantidade_adversarios (int): Número de adversários de cada tipo.
+    """
+    base = executar_misto(host, porta, taxa_bons, duracao, {})
+    print(f"Linha de base: {base['vazao_por_s']:.1f} req/s, p99 {base['tempo_total']['p99']:.4f}s")
+
+    cenarios = {tipo: {tipo: quantidade_adversarios} for tipo in TIPOS_ADVERSARIOS}
+    cenarios["todos"] = {tipo: quantidade_adversarios for tipo in TIPOS_ADVERSARIOS}
+
+    relatorio = {"linha_de_base": base, "cenarios": {}}
+    for nome, adversarios in cenarios.items():
+        misto = executar_misto(host, porta, taxa_bons, duracao, adversarios)
+        misto["degradacao"] = degradacao(base, misto)
+        relatorio["cenarios"][nome] = misto
+        print(f"{nome}: vazão x{misto['degradacao']['razao_vazao']:.2f}, p99 x{misto['degradacao']['razao_p99']:.2f}, "
+              f"falhas {misto['degradacao']['fracao_falhas']:.1%}")
+
+    pasta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "adversarial")
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, "relatorio.json"), "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cenários com clientes mal-comportados (slowloris, conexões ociosas, payloads inválidos).")
+    parser.add_argument("host")
+    parser.add_argument("--porta", type=int, default=12345)
+    parser.add_argument("--taxa", type=float, default=50, help="conexões por segundo dos clientes normais")
+    parser.add_argument("--duracao", type=float, default=20, help="segundos por cenário")
+    parser.add_argument("--adversarios", type=int, default=8, help="adversários de cada tipo")
+    args = parser.parse_args()
+    main(args.host, args.porta, args.taxa, args.duracao, args.adversarios)
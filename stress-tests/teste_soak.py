@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import time
+
+import malha_aberta
+import motor_async
+from executor_cenarios import gerar_resultados_falsos
+
+# Métricas do servidor (ver Server.metricas) analisadas em busca de vazamentos
+METRICAS_TENDENCIA = (
+    "rss_bytes",
+    "fds_abertos",
+    "threads",
+    "backlog_executor",
+    "handlers_ativos",
+    "intervalos_utilizados",
+    "gc_nao_coletaveis",
+)
+
+def ler_metricas(caminho, desde=None):
+    """
+    Lê as amostras gravadas pelo MonitorRecursos do servidor.
+
+    Parâmetros:
+        caminho (str): Arquivo JSON lines com as métricas.
+        desde (float): Descarta amostras anteriores a este instante (time.time).
+
+    Retorna:
+        amostras (list): Lista de dicionários, em ordem de tempo.
+    """
+    amostras = []
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            linha = linha.strip()
+            if not linha:
+                continue
+            amostra = json.loads(linha)
+            if desde is None or amostra["t"] >= desde:
+                amostras.append(amostra)
+    return amostras
+
+def regressao_linear(xs, ys):
+    """
+    Ajusta y = a + b*x por mínimos quadrados.
+
+    Retorna:
+        inclinacao (float): O coeficiente b.
+        r2 (float): O coeficiente de determinação do ajuste.
+    """
+    n = len(xs)
+    media_x = sum(xs) / n
+    media_y = sum(ys) / n
+    sxx = sum((x - media_x) ** 2 for x in xs)
+    syy = sum((y - media_y) ** 2 for y in ys)
+    sxy = sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys))
+    if sxx == 0:
+        return 0.0, 0.0
+    inclinacao = sxy / sxx
+    r2 = (sxy * sxy) / (sxx * syy) if syy else 0.0
+    return inclinacao, r2
+
+def analisar_tendencias(amostras, limiar_relativo=0.1, r2_minimo=0.8):
+    """
+    Calcula a tendência de cada métrica ao longo do soak.
+
+    Uma métrica é marcada como suspeita de vazamento quando cresce de forma
+    consistente (r2 >= r2_minimo) e o crescimento previsto pela reta ao longo do
+    teste passa de limiar_relativo do valor inicial (ou de 1, se ele for zero).
+
+    Parâmetros:
+        amostras (list): Amostras lidas com ler_metricas.
+        limiar_relativo (float): Crescimento relativo mínimo para suspeita.
+        r2_minimo (float): Qualidade mínima do ajuste para suspeita.
+
+    Retorna:
+        Dicionário {métrica: {inicio, fim, inclinacao_por_hora, r2, crescimento_relativo, suspeita}}.
+    """
+    if len(amostras) < 3:
+        return {}
+    t0 = amostras[0]["t"]
+    horas = [(amostra["t"] - t0) / 3600 for amostra in amostras]
+    duracao_horas = horas[-1] - horas[0]
+    tendencias = {}
+    for metrica in METRICAS_TENDENCIA:
+        valores = [amostra.get(metrica) for amostra in amostras]
+        pontos = [(h, v) for h, v in zip(horas, valores) if v is not None]
+        if len(pontos) < 3:
+            continue
+        xs, ys = zip(*pontos)
+        inclinacao, r2 = regressao_linear(xs, ys)
+        crescimento = inclinacao * duracao_horas / max(abs(ys[0]), 1)
+        tendencias[metrica] = {
+            "inicio": ys[0],
+            "fim": ys[-1],
+            "inclinacao_por_hora": inclinacao,
+            "r2": r2,
+            "crescimento_relativo": crescimento,
+            "suspeita": inclinacao > 0 and r2 >= r2_minimo and crescimento >= limiar_relativo,
+        }
+    return tendencias
+
+def salvar_serie(caminho, linhas):
+    """
+    Grava uma série temporal (lista de dicionários) em CSV, expandindo listas
+    em colunas numeradas (ex.: gc_coletas_0, gc_coletas_1, ...).
+    """
+    planas = []
+    for linha in linhas:
+        plana = {}
+        for chave, valor in linha.items():
+            if isinstance(valor, (list, tuple)):
+                for indice, item in enumerate(valor):
+                    plana[f"{chave}_{indice}"] = item
+            elif not isinstance(valor, dict):
+                plana[chave] = valor
+        planas.append(plana)
+    colunas = []
+    for plana in planas:
+        for chave in plana:
+            if chave not in colunas:
+                colunas.append(chave)
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        escritor.writerows(planas)
+
+async def carga_continua(host, porta, taxa, duracao, janela, serie_carga, timeout=30):
+    """
+    Mantém uma carga de malha aberta de taxa conexões por segundo durante
+    duracao segundos num único laço de eventos e, a cada janela, acrescenta a
+    serie_carga a vazão e o p99 dos clientes iniciados na janela anterior. Os
+    clientes de uma janela são resumidos uma janela depois do fim dela, para
+    que os que ainda estavam em andamento tenham tempo de terminar; as últimas
+    janelas são resumidas quando todos os clientes terminam.
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        taxa (float): Conexões por segundo.
+        duracao (float): Duração total em segundos.
+        janela (float): Duração de cada janela de amostragem em segundos.
+        serie_carga (list): Recebe um dicionário por janela.
+        timeout (float): Tempo máximo em segundos para cada etapa de E/S.
+    """
+    num_janelas = max(1, math.ceil(duracao / janela))
+    # Só as medições agregadas são guardadas: o soak dura horas
+    janelas = [{"resultados": motor_async.ResultadosCarga(guardar_amostras=False), "clientes": 0} for _ in range(num_janelas)]
+    pendentes = set()
+    inicio = time.time()
+    base = time.perf_counter_ns()
+
+    def registrar(indice):
+        resultados = janelas[indice]["resultados"]
+        resultados.duracao = min(janela, duracao - indice * janela)
+        serie_carga.append({
+            "t": inicio + indice * janela + resultados.duracao,
+            "clientes": janelas[indice]["clientes"],
+            "sucessos": resultados.success_count,
+            "negacoes": resultados.denial_count,
+            "falhas": resultados.failure_count,
+            "vazao_por_s": resultados.success_count / resultados.duracao if resultados.duracao else 0.0,
+            "p99_total": resultados.hist_total.percentil(99),
+        })
+        print(f"Janela {indice + 1}: {serie_carga[-1]['sucessos']}/{serie_carga[-1]['clientes']} sucessos, p99 {serie_carga[-1]['p99_total']:.4f}s")
+
+    def finalizado(tarefa, resultados):
+        pendentes.discard(tarefa)
+        # Como em motor_async.aguardar_clientes, uma exceção inesperada conta como falha
+        if not tarefa.cancelled() and tarefa.exception() is not None:
+            resultados.registrar_falha()
+
+    async def amostrar():
+        for indice in range(num_janelas - 1):
+            espera = (base + (indice + 2) * janela * 1e9 - time.perf_counter_ns()) / 1e9
+            if espera > 0:
+                await asyncio.sleep(espera)
+            registrar(indice)
+
+    amostrador = asyncio.create_task(amostrar())
+    for instante in malha_aberta.perfil_constante(taxa, duracao):
+        indice = min(int(instante // janela), num_janelas - 1)
+        inicio_planejado = base + int(instante * 1e9)
+        espera = (inicio_planejado - time.perf_counter_ns()) / 1e9
+        if espera > 0:
+            await asyncio.sleep(espera)
+        resultados = janelas[indice]["resultados"]
+        janelas[indice]["clientes"] += 1
+        tarefa = asyncio.create_task(motor_async.cliente_async(
+            host, porta, resultados, gerar_resultados_falsos, False, timeout, inicio_planejado,
+        ))
+        pendentes.add(tarefa)
+        tarefa.add_done_callback(lambda tarefa, resultados=resultados: finalizado(tarefa, resultados))
+
+    while pendentes:
+        await asyncio.wait(list(pendentes))
+    amostrador.cancel()
+    await asyncio.wait([amostrador])
+    for indice in range(len(serie_carga), num_janelas):
+        registrar(indice)
+
+def main(host, porta, arquivo_metricas, taxa, duracao_horas, janela=60):
+    """
+    Mantém uma carga constante de taxa conexões por segundo contra o servidor
+    durante duracao_horas e, ao final, analisa a série de métricas gravada pelo
+    servidor (SERVIDOR_ARQUIVO_METRICAS) em busca de crescimento sustentado.
+
+    A carga não é interrompida entre as janelas (ver carga_continua), então
+    nenhuma pausa periódica do gerador aparece nas métricas do servidor.
+
+    Os resultados são salvos em soak/: serie_servidor.csv, serie_carga.csv
+    (vazão e p99 por janela) e resumo_soak.json (tendências e suspeitas).
+
+    Parâmetros:
+        host (str): O endereço IP do servidor.
+        porta (int): A porta do servidor.
+        arquivo_metricas (str): Arquivo de métricas gravado pelo servidor.
+        taxa (float): Conexões por segundo.
+        duracao_horas (float): Duração total do soak.
+        janela (float): Duração de cada janela de amostragem da carga em segundos.
+    """
+    motor_async.ajustar_limite_descritores()
+    inicio = time.time()
+    serie_carga = []
+    asyncio.run(carga_continua(host, porta, taxa, duracao_horas * 3600, janela, serie_carga))
+
+    pasta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "soak")
+    os.makedirs(pasta, exist_ok=True)
+    amostras = ler_metricas(arquivo_metricas, desde=inicio)
+    tendencias = analisar_tendencias(amostras)
+    salvar_serie(os.path.join(pasta, "serie_servidor.csv"), amostras)
+    salvar_serie(os.path.join(pasta, "serie_carga.csv"), serie_carga)
+    with open(os.path.join(pasta, "resumo_soak.json"), "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "taxa": taxa,
+            "duracao_horas": (time.time() - inicio) / 3600,
+            "amostras_servidor": len(amostras),
+            "tendencias": tendencias,
+            "suspeitas": [metrica for metrica, dados in tendencias.items() if dados["suspeita"]],
+        }, arquivo, indent=2, ensure_ascii=False)
+
+    for metrica, dados in tendencias.items():
+        if dados["suspeita"]:
+            print(f"Possível vazamento em {metrica}: {dados['inclinacao_por_hora']:.2f}/h (r2={dados['r2']:.2f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de soak: carga constante por horas com acompanhamento de recursos do servidor.")
+    parser.add_argument("host")
+    parser.add_argument("arquivo_metricas", help="arquivo definido em SERVIDOR_ARQUIVO_METRICAS ao iniciar o servidor")
+    parser.add_argument("--porta", type=int, default=12345)
+    parser.add_argument("--taxa", type=float, default=50, help="conexões por segundo")
+    parser.add_argument("--horas", type=float, default=4)
+    parser.add_argument("--janela", type=float, default=60, help="segundos por janela de amostragem da carga")
+    args = parser.parse_args()
+    main(args.host, args.porta, args.arquivo_metricas, args.taxa, args.horas, args.janela)
@@ -0,0 +1,832 @@
+import collections
+import json
+import math
+import os
+import random
+import select
+import threading
+import time
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# Prefixo que distingue uma atribuição de tarefa (uma linha JSON) do intervalo
+# simples "a b" do protocolo original.
+PREFIXO_TAREFA = "{"
+
+# Mensagem de controle com que o servidor pede ao cliente que pare o cálculo e
+# devolva o que já tiver, e a linha com que o cliente do protocolo original
+# informa até onde calculou
+CONTROLE_CANCELAR = "cancelar"
+PREFIXO_CONCLUIDO = "Intervalo concluído:"
+
+# Situações com que Trabalho.concluir responde a um resultado: aceito (o bloco
+# inteiro ou o que faltava dele), prefixo aceito (o restante volta para a fila),
+# duplicado (o bloco já estava concluído) ou antigo (resposta a uma atribuição
+# que já foi retomada ou devolvida); os dois últimos são ignorados
+CONCLUSAO_ACEITA = "aceita"
+CONCLUSAO_PREFIXO = "prefixo"
+CONCLUSAO_DUPLICADA = "duplicada"
+CONCLUSAO_ANTIGA = "antiga"
+
+# Duração aproximada de cada etapa entre dois pontos de verificação de cancelamento
+DURACAO_ETAPA = 0.05
+
+Tarefa = collections.namedtuple("Tarefa", ["nome", "versao", "kernel", "reducao", "descricao", "decodificar", "finalizacao", "dimensionar", "codificar"],
+                                defaults=(None, None, None, None))
+
+REGISTRO = {}
+
+def _somar(a, b):
+    if isinstance(a, list):
+        return [_somar(x, y) for x, y in zip(a, b)]
+    return a + b
+
+def _combinar_chudnovsky(esquerda, direita):
+    # (P, Q, T) de [a, m) e de [m, b) -> (P, Q, T) de [a, b)
+    p1, q1, t1 = esquerda
+    p2, q2, t2 = direita
+    return (p1 * p2, q1 * q2, q2 * t1 + p1 * t2)
+
+# Reduções usadas tanto para declarar como os resultados parciais de uma tarefa
+# se combinam quanto para combiná-los no servidor. Todas são associativas, mas
+# não necessariamente comutativas ("concatenar", "chudnovsky"): a ordem dos
+# blocos é sempre preservada.
+REDUCOES = {
+    "soma": _somar,
+    "min": min,
+    "max": max,
+    "concatenar": lambda a, b: a + b,
+    "chudnovsky": _combinar_chudnovsky,
+}
+
+def _forma(valor):
+    # Estrutura de um parcial numérico: "n" para um número, tupla para uma lista
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return "n"
+    if isinstance(valor, (list, tuple)):
+        return tuple(_forma(item) for item in valor)
+    raise ValueError(f"valor não numérico no resultado parcial: {valor!r}")
+
+def validar_parcial(reducao, valor, referencia=None):
+    """
+    Confere se um resultado parcial pode ser combinado pela redução, para que
+    uma resposta malformada seja recusada ao chegar, e não só ao combinar
+    todos os parciais no fim do trabalho.
+
+    Parâmetros:
+        reducao (str): Uma das chaves de REDUCOES.
+        valor: O resultado parcial (já decodificado).
+        referencia: Outro parcial já aceito da mesma tarefa, ou None. Nas
+            reduções numéricas, valor deve ter a mesma estrutura.
+
+    Levanta ValueError se o parcial for inválido.
+    """
+    if reducao == "concatenar":
+        if not isinstance(valor, list):
+            raise ValueError(f"resultado parcial deveria ser uma lista: {valor!r}")
+    elif reducao == "chudnovsky":
+        # Os inteiros (int ou gmpy2.mpz) já foram conferidos por _decodificar_chudnovsky
+        if not (isinstance(valor, (list, tuple)) and len(valor) == 3):
+            raise ValueError(f"resultado parcial deveria ser a tripla (P, Q, T): {valor!r}")
+    elif referencia is not None and _forma(valor) != _forma(referencia):
+        raise ValueError(f"resultado parcial com estrutura diferente dos demais: {valor!r}")
+    else:
+        _forma(valor)
+
+def registrar_tarefa(nome, versao, reducao, descricao="", decodificar=None, finalizacao=None, dimensionar=None, codificar=None):
+    """
+    Decorador que registra um kernel como tarefa distribuível.
+
+    O kernel recebe (params, inicio, fim) e calcula o resultado parcial sobre os
+    índices do intervalo semiaberto [inicio, fim). O resultado precisa ser
+    serializável em JSON e combinável pela redução declarada.
+
+    Parâmetros:
+        nome (str): Nome da tarefa no protocolo.
+        versao (int): Versão do kernel; clientes só executam versões que conhecem.
+        reducao (str): Uma das chaves de REDUCOES.
+        descricao (str): Texto livre exibido nos logs.
+        decodificar (callable): Converte o resultado parcial recebido em JSON no
+            valor combinado pela redução; levanta ValueError se for inválido.
+        finalizacao (callable): Recebe (params, valor, caminho_resultado) e
+            retorna o que é gravado como resultado final, no lugar do valor reduzido.
+        dimensionar (callable): Recebe params e retorna o fim do intervalo quando
+            a especificação do trabalho não o informa.
+        codificar (callable): Inverso de decodificar; converte um valor
+            combinado de volta para JSON (ex.: o parcial que um nó da federação
+            devolve ao coordenador).
+    """
+    if reducao not in REDUCOES:
+        raise ValueError(f"redução desconhecida: {reducao}")
+
+    def decorador(kernel):
+        REGISTRO[(nome, versao)] = Tarefa(nome, versao, kernel, reducao, descricao, decodificar, finalizacao, dimensionar, codificar)
+        return kernel
+    return decorador
+
+def obter_tarefa(nome, versao=None):
+    """
+    Procura uma tarefa no registro.
+
+    Parâmetros:
+        nome (str): Nome da tarefa.
+        versao (int): Versão desejada; None escolhe a mais recente.
+
+    Retorna:
+        A Tarefa, ou None se não estiver registrada.
+    """
+    if versao is not None:
+        return REGISTRO.get((nome, versao))
+    versoes = [tarefa for (nome_tarefa, _), tarefa in REGISTRO.items() if nome_tarefa == nome]
+    return max(versoes, key=lambda tarefa: tarefa.versao) if versoes else None
+
+def reduzir(reducao, parciais):
+    """
+    Combina resultados parciais, na ordem dada, com uma das REDUCOES.
+
+    A combinação é feita em árvore balanceada (vizinhos dois a dois, nível a
+    nível): com inteiros grandes, como em "chudnovsky", os operandos de cada
+    nível têm tamanhos parecidos, o que é bem mais barato que acumular da
+    esquerda para a direita.
+    """
+    combinar = REDUCOES[reducao]
+    nivel = list(parciais)
+    while len(nivel) > 1:
+        proximo = [combinar(nivel[i], nivel[i + 1]) for i in range(0, len(nivel) - 1, 2)]
+        if len(nivel) % 2:
+            proximo.append(nivel[-1])
+        nivel = proximo
+    return nivel[0]
+
+# Kernels embutidos
+
+@registrar_tarefa("soma_pares", 1, "soma", "Soma dos números pares")
+def _soma_pares(params, inicio, fim):
+    return sum(range(inicio + inicio % 2, fim, 2))
+
+@registrar_tarefa("soma_impares", 1, "soma", "Soma dos números ímpares")
+def _soma_impares(params, inicio, fim):
+    return sum(range(inicio + 1 - inicio % 2, fim, 2))
+
+@registrar_tarefa("pi_leibniz", 1, "soma", "PI pela série de Leibniz")
+def _pi_leibniz(params, inicio, fim):
+    return 4 * math.fsum((-1.0 if i % 2 else 1.0) / (2 * i + 1) for i in range(inicio, fim))
+
+FUNCOES_INTEGRAVEIS = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "exp": math.exp,
+    "sqrt": math.sqrt,
+    "log1p": math.log1p,
+    # 4 * integral de 0 a 1 de sqrt(1 - x²) = PI
+    "quarto_circulo": lambda x: math.sqrt(max(0.0, 1.0 - x * x)),
+}
+
+@registrar_tarefa("integracao", 1, "soma", "Integral numérica pela regra do ponto médio")
+def _integracao(params, inicio, fim):
+    # params: funcao (chave de FUNCOES_INTEGRAVEIS), x0, x1 e n subintervalos;
+    # cada índice é um subintervalo
+    funcao = FUNCOES_INTEGRAVEIS[params["funcao"]]
+    x0 = params["x0"]
+    passo = (params["x1"] - x0) / params["n"]
+    return math.fsum(funcao(x0 + (i + 0.5) * passo) for i in range(inicio, fim)) * passo
+
+@registrar_tarefa("monte_carlo_pi", 1, "soma", "Estimativa de PI por Monte Carlo")
+def _monte_carlo_pi(params, inicio, fim):
+    # Cada índice tem sua própria semente, então o resultado não depende de como
+    # o intervalo foi dividido. Retorna [acertos, sorteios].
+    amostras = params.get("amostras_por_indice", 1000)
+    semente = params.get("semente", 0)
+    acertos = 0
+    for i in range(inicio, fim):
+        gerador = random.Random(semente * 1000003 + i)
+        sortear = gerador.random
+        for _ in range(amostras):
+            x = sortear()
+            y = sortear()
+            if x * x + y * y <= 1.0:
+                acertos += 1
+    return [acertos, (fim - inicio) * amostras]
+
+@registrar_tarefa("max_collatz", 1, "max", "Número com a maior trajetória de Collatz")
+def _max_collatz(params, inicio, fim):
+    melhor = [0, 0]
+    for n in range(max(inicio, 1), fim):
+        passos, x = 0, n
+        while x != 1:
+            x = x // 2 if x % 2 == 0 else 3 * x + 1
+            passos += 1
+        if passos >= melhor[0]:
+            melhor = [passos, n]
+    return melhor
+
+@registrar_tarefa("primos", 1, "concatenar", "Lista dos números primos")
+def _primos(params, inicio, fim):
+    inicio = max(inicio, 2)
+    if fim <= inicio:
+        return []
+    limite = math.isqrt(fim - 1)
+    base = bytearray([1]) * (limite + 1)
+    base[:2] = b"\x00\x00"
+    for p in range(2, math.isqrt(limite) + 1):
+        if base[p]:
+            base[p * p::p] = bytearray(len(base[p * p::p]))
+    segmento = bytearray([1]) * (fim - inicio)
+    for p in range(2, limite + 1):
+        if base[p]:
+            primeiro = max(p * p, (inicio + p - 1) // p * p)
+            segmento[primeiro - inicio::p] = bytearray(len(segmento[primeiro - inicio::p]))
+    return [inicio + i for i, primo in enumerate(segmento) if primo]
+
+# PI pela série de Chudnovsky, com divisão binária: cada bloco de termos
+# [a, b) vira a tripla (P, Q, T) de inteiros e o servidor combina as triplas com
+# _combinar_chudnovsky. Os inteiros viajam em hexadecimal, já que a conversão
+# para decimal é quadrática (e limitada por sys.set_int_max_str_digits).
+
+C3_SOBRE_24 = 640320 ** 3 // 24
+DIGITOS_POR_TERMO = math.log10(640320 ** 3 / 12 ** 3)  # ≈ 14,18
+DIGITOS_GUARDA = 10
+
+def _inteiro(valor):
+    return gmpy2.mpz(valor) if gmpy2 else valor
+
+def _dividir_chudnovsky(a, b):
+    if b - a == 1:
+        if a == 0:
+            p = q = _inteiro(1)
+        else:
+            p = _inteiro((6 * a - 5) * (2 * a - 1) * (6 * a - 1))
+            q = _inteiro(a * a * a * C3_SOBRE_24)
+        t = p * (13591409 + 545140134 * a)
+        return p, q, -t if a % 2 else t
+    meio = (a + b) // 2
+    return _combinar_chudnovsky(_dividir_chudnovsky(a, meio), _dividir_chudnovsky(meio, b))
+
+def _codificar_chudnovsky(valor):
+    return [format(int(componente), "x") for componente in valor]
+
+def _decodificar_chudnovsky(parcial):
+    if not isinstance(parcial, list) or len(parcial) != 3 or not all(isinstance(valor, str) for valor in parcial):
+        raise ValueError("esperada a tripla [P, Q, T] em hexadecimal")
+    if gmpy2:
+        return tuple(gmpy2.mpz(valor, 16) for valor in parcial)
+    return tuple(int(valor, 16) for valor in parcial)
+
+def _termos_chudnovsky(params):
+    return int(params["digitos"] / DIGITOS_POR_TERMO) + 2
+
+def escrever_digitos(arquivo, numero, largura, potencias=None):
+    """
+    Escreve numero em decimal, com exatamente largura dígitos (zeros à
+    esquerda), sem montar a string inteira em memória: o número é dividido ao
+    meio por potências de 10 até os pedaços caberem em str().
+
+    Parâmetros:
+        arquivo: arquivo de texto aberto para escrita.
+        numero (int): Inteiro não negativo.
+        largura (int): Número de dígitos a escrever.
+        potencias (dict): Cache {expoente: 10 ** expoente} compartilhado entre as chamadas.
+    """
+    if gmpy2:
+        texto = gmpy2.mpz(numero).digits(10).zfill(largura)
+        for i in range(0, largura, 1 << 20):
+            arquivo.write(texto[i:i + (1 << 20)])
+        return
+    if largura <= 2000:
+        arquivo.write(str(numero).zfill(largura))
+        return
+    if potencias is None:
+        potencias = {}
+    metade = largura // 2
+    if metade not in potencias:
+        potencias[metade] = 10 ** metade
+    alto, baixo = divmod(numero, potencias[metade])
+    escrever_digitos(arquivo, alto, largura - metade, potencias)
+    escrever_digitos(arquivo, baixo, metade, potencias)
+
+def _finalizar_chudnovsky(params, valor, caminho_resultado):
+    # params: digitos (casas decimais) e, opcionalmente, arquivo_digitos
+    _, q, t = valor
+    inicio = time.perf_counter()
+    termos = params.get("termos") or _termos_chudnovsky(params)
+    digitos = min(params["digitos"], int(termos * DIGITOS_POR_TERMO) - 1)
+    escala = _inteiro(10) ** (digitos + DIGITOS_GUARDA)
+    raiz = gmpy2.isqrt(10005 * escala * escala) if gmpy2 else math.isqrt(10005 * escala * escala)
+    pi = (q * 426880 * raiz // t) // _inteiro(10) ** DIGITOS_GUARDA
+
+    caminho = params.get("arquivo_digitos")
+    if caminho is None:
+        caminho = os.path.splitext(caminho_resultado)[0] + "_digitos.txt" if caminho_resultado else f"pi_{digitos}.txt"
+    with open(caminho, "w", encoding="ascii") as arquivo:
+        arquivo.write("3.")
+        escrever_digitos(arquivo, pi - 3 * _inteiro(10) ** digitos, digitos)
+        arquivo.write("\n")
+    with open(caminho, encoding="ascii") as arquivo:
+        amostra = arquivo.read(52)
+    return {"digitos": digitos, "arquivo": caminho, "inicio": amostra, "duracao_finalizacao_s": time.perf_counter() - inicio}
+
+@registrar_tarefa("pi_chudnovsky", 1, "chudnovsky", "PI com precisão arbitrária pela série de Chudnovsky",
+                  decodificar=_decodificar_chudnovsky, finalizacao=_finalizar_chudnovsky, dimensionar=_termos_chudnovsky,
+                  codificar=_codificar_chudnovsky)
+def _pi_chudnovsky(params, inicio, fim):
+    # Cada índice é um termo da série; retorna [P, Q, T] em hexadecimal
+    if fim <= inicio:
+        raise ValueError("intervalo de termos vazio")
+    return _codificar_chudnovsky(_dividir_chudnovsky(inicio, fim))
+
+# Protocolo
+
+def montar_atribuicao(trabalho, bloco, trace_id=None):
+    """
+    Monta a atribuição de um bloco de uma tarefa.
+
+    Retorna:
+        Dicionário com tarefa, versao, params, bloco, intervalo e, opcionalmente,
+        trace_id (o mesmo retornado por interpretar_atribuicao).
+    """
+    atribuicao = {
+        "tarefa": trabalho.tarefa.nome,
+        "versao": trabalho.tarefa.versao,
+        "params": trabalho.params,
+        "bloco": bloco["indice"],
+        "intervalo": [bloco["inicio"], bloco["fim"]],
+    }
+    if trace_id:
+        atribuicao["trace_id"] = trace_id
+    return atribuicao
+
+def codificar_atribuicao(trabalho, bloco, trace_id=None):
+    """
+    Monta a linha enviada pelo servidor para atribuir um bloco de uma tarefa.
+
+    Retorna:
+        A mensagem codificada (bytes), uma linha JSON com a atribuição (ver montar_atribuicao).
+    """
+    return (json.dumps(montar_atribuicao(trabalho, bloco, trace_id), separators=(",", ":")) + "\n").encode()
+
+def interpretar_atribuicao(mensagem):
+    """
+    Interpreta uma atribuição de tarefa recebida do servidor.
+
+    Parâmetros:
+        mensagem (str): A linha recebida.
+
+    Retorna:
+        Dicionário da atribuição, ou None se a mensagem não for uma atribuição válida.
+    """
+    if not mensagem.startswith(PREFIXO_TAREFA):
+        return None
+    try:
+        atribuicao = json.loads(mensagem)
+    except ValueError:
+        return None
+    if not isinstance(atribuicao, dict) or not {"tarefa", "versao", "bloco", "intervalo"} <= atribuicao.keys():
+        return None
+    return atribuicao
+
+def etapas(inicio, fim, cancelado=None, duracao=DURACAO_ETAPA):
+    """
+    Divide [inicio, fim) em etapas consecutivas para um cálculo que pode ser
+    cancelado entre elas. A primeira etapa tem um índice e o tamanho dobra
+    enquanto cada etapa leva menos da metade de duracao, então o custo dos
+    pontos de verificação não depende do kernel.
+
+    Parâmetros:
+        inicio (int): Primeiro índice.
+        fim (int): Índice final (exclusivo).
+        cancelado (callable): Consultado antes de cada etapa; se retornar True,
+            as etapas param (o prefixo calculado é [inicio, fim da última etapa)).
+        duracao (float): Segundos desejados por etapa.
+
+    Retorna:
+        Iterador de (inicio_etapa, fim_etapa).
+    """
+    passo = 1
+    atual = inicio
+    while atual < fim:
+        if cancelado is not None and cancelado():
+            return
+        proximo = min(fim, atual + passo)
+        marca = time.perf_counter()
+        yield atual, proximo
+        if time.perf_counter() - marca < duracao / 2:
+            passo *= 2
+        atual = proximo
+
+def _executar_em_etapas(tarefa, params, inicio, fim, cancelado):
+    # Os parciais das etapas são combinados com a redução da tarefa, como os dos blocos no servidor
+    partes = []
+    concluido = inicio
+    for inicio_etapa, fim_etapa in etapas(inicio, fim, cancelado):
+        parte = tarefa.kernel(params, inicio_etapa, fim_etapa)
+        partes.append(tarefa.decodificar(parte) if tarefa.decodificar else parte)
+        concluido = fim_etapa
+    if not partes:
+        return None, inicio
+    valor = reduzir(tarefa.reducao, partes)
+    return (tarefa.codificar(valor) if tarefa.decodificar else valor), concluido
+
+def executar_atribuicao(atribuicao, cancelado=None):
+    """
+    Executa o kernel registrado para uma atribuição.
+
+    Com cancelado, o intervalo é calculado em etapas (ver etapas) e, se o
+    cálculo for cancelado no meio, a resposta traz o resultado do prefixo já
+    calculado e esse prefixo em "intervalo"; o servidor credita o prefixo e
+    redistribui só o restante do bloco. Tarefas que decodificam o parcial mas
+    não sabem codificá-lo de volta são calculadas de uma vez.
+
+    Parâmetros:
+        atribuicao (dict): Retornado por interpretar_atribuicao.
+        cancelado (callable): Consultado entre as etapas (ver vigiar_cancelamento).
+
+    Retorna:
+        resposta (dict): tarefa, versao, bloco e resultado (ou erro, se o kernel
+            não estiver registrado, falhar ou for cancelado antes da primeira
+            etapa), além do trace_id recebido.
+        duracao (int): Tempo de cálculo em nanossegundos.
+    """
+    resposta = {"tarefa": atribuicao["tarefa"], "versao": atribuicao["versao"], "bloco": atribuicao["bloco"]}
+    if atribuicao.get("trace_id"):
+        resposta["trace_id"] = atribuicao["trace_id"]
+    inicio = time.perf_counter_ns()
+    tarefa = obter_tarefa(atribuicao["tarefa"], atribuicao["versao"])
+    if tarefa is None:
+        resposta["erro"] = f"tarefa desconhecida: {atribuicao['tarefa']} v{atribuicao['versao']}"
+    else:
+        params = atribuicao.get("params") or {}
+        inicio_intervalo, fim_intervalo = atribuicao["intervalo"]
+        try:
+            if cancelado is None or (tarefa.decodificar and not tarefa.codificar):
+                resposta["resultado"] = tarefa.kernel(params, inicio_intervalo, fim_intervalo)
+            else:
+                resultado, concluido = _executar_em_etapas(tarefa, params, inicio_intervalo, fim_intervalo, cancelado)
+                if concluido == inicio_intervalo:
+                    resposta["erro"] = "cancelado antes de calcular"
+                else:
+                    resposta["resultado"] = resultado
+                    if concluido < fim_intervalo:
+                        resposta["intervalo"] = [inicio_intervalo, concluido]
+        except Exception as e:
+            resposta["erro"] = f"{type(e).__name__}: {e}"
+    return resposta, time.perf_counter_ns() - inicio
+
+def codificar_cancelamento(bloco=None):
+    """
+    Monta a mensagem de controle com que o servidor cancela o cálculo em
+    andamento na conexão.
+
+    Parâmetros:
+        bloco (int): Índice do bloco cancelado; None no protocolo original.
+
+    Retorna:
+        A mensagem codificada (bytes), uma linha JSON.
+    """
+    controle = {"controle": CONTROLE_CANCELAR}
+    if bloco is not None:
+        controle["bloco"] = bloco
+    return (json.dumps(controle, separators=(",", ":")) + "\n").encode()
+
+def interpretar_controle(mensagem):
+    """
+    Interpreta uma mensagem de controle do servidor.
+
+    Retorna:
+        Dicionário da mensagem (com a chave "controle"), ou None se a mensagem
+        não for de controle.
+    """
+    if not mensagem.startswith(PREFIXO_TAREFA):
+        return None
+    try:
+        controle = json.loads(mensagem)
+    except ValueError:
+        return None
+    return controle if isinstance(controle, dict) and "controle" in controle else None
+
+def vigiar_cancelamento(conexao):
+    """
+    Cria a função consultada entre as etapas de um cálculo: verifica, sem
+    bloquear, se o servidor enviou um cancelamento pela conexão. Uma conexão
+    fechada pelo servidor também conta como cancelamento, já que ninguém mais
+    espera o resultado completo.
+
+    Parâmetros:
+        conexao: socket conectado ao servidor.
+
+    Retorna:
+        Função sem argumentos que retorna True depois que o cancelamento chegou.
+    """
+    estado = {"cancelado": False, "dados": b""}
+
+    def cancelado():
+        while not estado["cancelado"] and select.select([conexao], [], [], 0)[0]:
+            try:
+                dados = conexao.recv(1024)
+            except OSError:
+                dados = b""
+            if not dados:
+                estado["cancelado"] = True
+                break
+            estado["dados"] += dados
+            *linhas, estado["dados"] = estado["dados"].split(b"\n")
+            for linha in linhas:
+                controle = interpretar_controle(linha.decode(errors="replace").strip())
+                if controle is not None and controle["controle"] == CONTROLE_CANCELAR:
+                    estado["cancelado"] = True
+        return estado["cancelado"]
+    return cancelado
+
+def receber_confirmacao(conexao):
+    """
+    Espera a confirmação do servidor depois do envio dos resultados. Um
+    cancelamento que chegou depois do fim do cálculo (ver vigiar_cancelamento)
+    não é a confirmação e é descartado.
+
+    Parâmetros:
+        conexao: socket conectado ao servidor.
+
+    Retorna:
+        A linha de confirmação, sem espaços nas pontas; "" se o servidor fechou
+        a conexão antes de confirmar.
+    """
+    dados = b""
+    while True:
+        while b"\n" not in dados:
+            recebido = conexao.recv(1024)
+            if not recebido:
+                return dados.decode().strip()
+            dados += recebido
+        linha, dados = dados.split(b"\n", 1)
+        controle = interpretar_controle(linha.decode(errors="replace").strip())
+        if controle is None or controle["controle"] != CONTROLE_CANCELAR:
+            return linha.decode().strip()
+
+def codificar_resposta(resposta):
+    """
+    Codifica a resposta do cliente como uma linha JSON (bytes).
+    """
+    return (json.dumps(resposta, separators=(",", ":")) + "\n").encode()
+
+def interpretar_resposta(texto):
+    """
+    Interpreta a resposta de um cliente a uma atribuição.
+
+    Retorna:
+        Dicionário da resposta, ou None se o texto não for uma resposta válida.
+    """
+    try:
+        resposta = json.loads(texto)
+    except ValueError:
+        return None
+    return resposta if isinstance(resposta, dict) and "bloco" in resposta else None
+
+# Lado do servidor
+
+class Trabalho:
+    """
+    Um trabalho distribuído: uma tarefa aplicada ao intervalo [inicio, fim),
+    dividido em blocos atribuídos aos clientes.
+
+    Blocos devolvidos (cliente desconectou, respondeu com erro ou com uma
+    resposta inválida) voltam para a frente da fila. Um cliente cancelado no
+    meio do bloco pode entregar o resultado do prefixo que calculou: o prefixo
+    é creditado e só o restante do bloco volta para a fila. Os resultados parciais
+    ficam guardados por bloco e são combinados na ordem do intervalo, com a
+    redução declarada pela tarefa, quando o último bloco chega; se a tarefa
+    declara uma finalização, é o retorno dela que vira o resultado final.
+
+    Parâmetros:
+        tarefa (str): Nome da tarefa registrada.
+        params (dict): Parâmetros repassados ao kernel.
+        inicio (int): Primeiro índice.
+        fim (int): Índice final (exclusivo).
+        tamanho_bloco (int): Índices por bloco.
+        versao (int): Versão do kernel; None escolhe a mais recente.
+        caminho_resultado (str): Arquivo JSON onde o resultado final é gravado.
+        log_callback (callable): Recebe mensagens de progresso.
+        parcial (bool): O trabalho é só uma parte de outro maior (ver
+            federacao.py): os blocos são combinados, mas sem a finalização da
+            tarefa, e o resultado fica codificado em JSON para ser repassado.
+
+    Métodos:
+        proximo_bloco(): Reserva o próximo bloco pendente.
+        concluir(bloco, resultado, fim_parcial): Registra o resultado de um bloco ou de um prefixo dele.
+        devolver(bloco): Devolve um bloco não concluído à fila.
+        progresso(): Contagem de blocos por situação.
+        resultado(): O resultado final combinado.
+    """
+    def __init__(self, tarefa, params, inicio, fim, tamanho_bloco, versao=None, caminho_resultado=None, log_callback=None, parcial=False):
+        self.tarefa = obter_tarefa(tarefa, versao)
+        if self.tarefa is None:
+            raise ValueError(f"tarefa desconhecida: {tarefa}")
+        if fim <= inicio or tamanho_bloco <= 0:
+            raise ValueError("o intervalo do trabalho e o tamanho do bloco devem ser positivos")
+        self.params = params or {}
+        self.inicio = inicio
+        self.fim = fim
+        self.tamanho_bloco = tamanho_bloco
+        self.caminho_resultado = caminho_resultado
+        self.log_callback = log_callback
+        self.parcial = parcial
+        self.total_blocos = -(-(fim - inicio) // tamanho_bloco)
+        self.proximo_indice = 0
+        self.devolvidos = collections.deque()
+        self.em_andamento = set()
+        self.parciais = {}
+        # indice -> [início do restante, valores dos prefixos já creditados]
+        self.retomadas = {}
+        self.inicio_relogio = time.perf_counter()
+        self.duracao = None
+        self.valor = None
+        self.terminado = threading.Event()
+        self.lock = threading.Lock()
+
+    def bloco(self, indice):
+        """
+        Retorna o bloco de índice dado como {"indice", "inicio", "fim"}; se
+        parte do bloco já foi creditada, inicio é o começo do restante.
+        """
+        inicio = self.inicio + indice * self.tamanho_bloco
+        fim = min(inicio + self.tamanho_bloco, self.fim)
+        retomada = self.retomadas.get(indice)
+        return {"indice": indice, "inicio": retomada[0] if retomada else inicio, "fim": fim}
+
+    def proximo_bloco(self):
+        """
+        Reserva o próximo bloco pendente (devolvidos primeiro).
+
+        Retorna:
+            O bloco, ou None se todos já foram atribuídos.
+        """
+        with self.lock:
+            # Um bloco devolvido pode ter sido concluído depois (ex.: entregue por
+            # um nó da federação que reconectou)
+            while self.devolvidos and self.devolvidos[0] in self.parciais:
+                self.devolvidos.popleft()
+            if self.devolvidos:
+                indice = self.devolvidos.popleft()
+            elif self.proximo_indice < self.total_blocos:
+                indice = self.proximo_indice
+                self.proximo_indice += 1
+            else:
+                return None
+            self.em_andamento.add(indice)
+        return self.bloco(indice)
+
+    def devolver(self, bloco):
+        """
+        Devolve à fila um bloco atribuído que não foi concluído.
+        """
+        with self.lock:
+            if bloco["indice"] in self.em_andamento:
+                self.em_andamento.discard(bloco["indice"])
+                self.devolvidos.appendleft(bloco["indice"])
+
+    def concluir(self, bloco, resultado, fim_parcial=None):
+        """
+        Registra o resultado parcial de um bloco. Quando o último bloco chega,
+        combina os parciais e grava o resultado final.
+
+        Com fim_parcial antes do fim do bloco, o resultado é só do prefixo
+        [bloco["inicio"], fim_parcial) (cálculo cancelado): ele é guardado e o
+        restante do bloco volta para a frente da fila.
+
+        Levanta ValueError se a tarefa não conseguir decodificar o resultado, se
+        ele não puder ser combinado com os demais (ver validar_parcial) ou se
+        fim_parcial estiver fora do bloco.
+
+        Retorna:
+            CONCLUSAO_ACEITA ou CONCLUSAO_PREFIXO se o resultado foi registrado;
+            CONCLUSAO_DUPLICADA ou CONCLUSAO_ANTIGA se foi ignorado.
+        """
+        if self.tarefa.decodificar:
+            resultado = self.tarefa.decodificar(resultado)
+        with self.lock:
+            referencia = next(iter(self.parciais.values()), None)
+        validar_parcial(self.tarefa.reducao, resultado, referencia)
+        prefixo = fim_parcial is not None and fim_parcial < bloco["fim"]
+        if prefixo and fim_parcial <= bloco["inicio"]:
+            raise ValueError(f"prefixo [{bloco['inicio']}, {fim_parcial}) vazio ou fora do bloco")
+        indice = bloco["indice"]
+        with self.lock:
+            if indice in self.parciais:
+                self.em_andamento.discard(indice)
+                return CONCLUSAO_DUPLICADA
+            retomada = self.retomadas.get(indice)
+            if retomada and retomada[0] != bloco["inicio"]:
+                # Resposta a uma atribuição anterior à última retomada
+                return CONCLUSAO_ANTIGA
+            if prefixo:
+                if indice not in self.em_andamento:
+                    return CONCLUSAO_ANTIGA
+                self.em_andamento.discard(indice)
+                self.retomadas[indice] = [fim_parcial, (retomada[1] if retomada else []) + [resultado]]
+                self.devolvidos.appendleft(indice)
+                return CONCLUSAO_PREFIXO
+            self.em_andamento.discard(indice)
+            if retomada:
+                del self.retomadas[indice]
+                resultado = reduzir(self.tarefa.reducao, retomada[1] + [resultado])
+            self.parciais[indice] = resultado
+            if len(self.parciais) < self.total_blocos:
+                return CONCLUSAO_ACEITA
+            self.duracao = time.perf_counter() - self.inicio_relogio
+        self.finalizar()
+        return CONCLUSAO_ACEITA
+
+    def finalizar(self):
+        """
+        Combina os resultados parciais e grava o resultado final.
+        """
+        self.valor = reduzir(self.tarefa.reducao, (self.parciais[indice] for indice in range(self.total_blocos)))
+        if self.parcial:
+            if self.tarefa.codificar:
+                self.valor = self.tarefa.codificar(self.valor)
+            self.terminado.set()
+            return
+        if self.tarefa.finalizacao:
+            # Os termos da série vão de 0 a fim (criar_trabalho recusa outro início)
+            self.valor = self.tarefa.finalizacao(dict(self.params, termos=self.fim), self.valor, self.caminho_resultado)
+        if self.caminho_resultado:
+            with open(self.caminho_resultado, "w", encoding="utf-8") as arquivo:
+                json.dump({
+                    "tarefa": self.tarefa.nome,
+                    "versao": self.tarefa.versao,
+                    "params": self.params,
+                    "intervalo": [self.inicio, self.fim],
+                    "blocos": self.total_blocos,
+                    "duracao_s": self.duracao,
+                    "resultado": self.valor,
+                }, arquivo, ensure_ascii=False)
+        self.terminado.set()
+        if self.log_callback:
+            self.log_callback(f"Trabalho {self.tarefa.nome} concluído em {self.duracao:.2f}s ({self.total_blocos} blocos).")
+
+    def progresso(self):
+        """
+        Retorna a contagem de blocos: total, concluidos, em_andamento,
+        pendentes e retomados (com um prefixo creditado e o restante por calcular).
+        """
+        with self.lock:
+            concluidos = len(self.parciais)
+            em_andamento = len(self.em_andamento)
+            retomados = len(self.retomadas)
+        return {
+            "total": self.total_blocos,
+            "concluidos": concluidos,
+            "em_andamento": em_andamento,
+            "pendentes": self.total_blocos - concluidos - em_andamento,
+            "retomados": retomados,
+        }
+
+    def resultado(self):
+        """
+        Retorna o resultado final combinado, ou None se o trabalho não terminou.
+        """
+        return self.valor
+
+    def fechar(self):
+        """
+        Nada a liberar; existe para que o Server encerre da mesma forma um
+        Trabalho local e um federacao.TrabalhoFederado.
+        """
+
+def criar_trabalho(especificacao, caminho_resultado=None, log_callback=None):
+    """
+    Cria um Trabalho a partir de uma especificação (dicionário, texto JSON ou
+    caminho de um arquivo JSON) com as chaves tarefa, params, inicio, fim,
+    tamanho_bloco e, opcionalmente, versao e resultado (arquivo de saída).
+
+    fim pode ser omitido nas tarefas que sabem se dimensionar a partir dos
+    params, como pi_chudnovsky: {"tarefa": "pi_chudnovsky", "params":
+    {"digitos": 100000}, "tamanho_bloco": 500}. Nelas inicio, se informado,
+    precisa ser 0.
+
+    Levanta ValueError se a especificação não informar fim e a tarefa não
+    souber se dimensionar, ou se uma tarefa dimensionável não começar em 0.
+    """
+    if isinstance(especificacao, str):
+        if especificacao.lstrip().startswith(PREFIXO_TAREFA):
+            especificacao = json.loads(especificacao)
+        else:
+            with open(especificacao, encoding="utf-8") as arquivo:
+                especificacao = json.load(arquivo)
+    tarefa = obter_tarefa(especificacao["tarefa"], especificacao.get("versao"))
+    inicio = especificacao.get("inicio", 0)
+    # A série dessas tarefas só converge somada desde o primeiro termo, e a
+    # finalização conta os termos a partir de zero (ver Trabalho.finalizar)
+    if tarefa is not None and tarefa.dimensionar is not None and inicio != 0:
+        raise ValueError(f"a tarefa {tarefa.nome} precisa começar no termo 0, não em {inicio}")
+    fim = especificacao.get("fim")
+    if fim is None:
+        if tarefa is None or tarefa.dimensionar is None:
+            raise ValueError("a especificação do trabalho precisa informar fim")
+        fim = tarefa.dimensionar(especificacao.get("params") or {})
+    return Trabalho(
+        especificacao["tarefa"], especificacao.get("params"), inicio, fim,
+        especificacao["tamanho_bloco"], especificacao.get("versao"),
+        caminho_resultado or especificacao.get("resultado"), log_callback,
+    )